@@ -10,6 +10,7 @@ import json
 
 from models import Alert, AlertSeverity
 from config import CONFIG, LOGGER
+from technician_identity import TECHNICIANS
 
 class AlertManager:
     """Gestione centralizzata alert sistema BAIT"""
@@ -28,8 +29,9 @@ class AlertManager:
         return [alert for alert in self.alerts if alert.severity == severity]
     
     def get_alerts_by_technician(self, tecnico: str) -> List[Alert]:
-        """Filtra alert per tecnico"""
-        return [alert for alert in self.alerts if alert.tecnico == tecnico]
+        """Filtra alert per tecnico (qualsiasi grafia del nome)"""
+        tecnico_id = TECHNICIANS.resolve(tecnico)
+        return [alert for alert in self.alerts if alert.tecnico_id == tecnico_id]
     
     def get_alerts_by_category(self, categoria: str) -> List[Alert]:
         """Filtra alert per categoria"""
@@ -4,6 +4,7 @@ Sistema completo di controllo automatico attività tecnici
 Controller principale che orchestrera tutti i moduli del sistema
 """
 
+import argparse
 import os
 import json
 from datetime import datetime
@@ -17,15 +18,31 @@ from business_rules import BusinessRulesEngine
 from business_rules_advanced import AdvancedBusinessRulesEngine
 from alert_system import AlertManager, AlertFormatter
 from kpi_calculator import KPICalculator
+from incremental_rules import AlertDelta, IncrementalRuleEngine
+from rule_cache import RuleResultCache
+from technician_identity import TECHNICIANS
+from history_store import add_date_range_arguments, resolve_date_range
 
 class BAITActivityController:
     """Controller principale sistema BAIT"""
     
-    def __init__(self, base_path: str = '.'):
+    def __init__(self, base_path: str = '.', date_range: Optional[tuple] = None,
+                 archive: Optional[bool] = None):
         self.base_path = base_path
+        # Intervallo (inizio, fine) da analizzare dallo storico; None = upload correnti
+        self.date_range = date_range
+        # Archiviazione nello storico degli upload caricati (None = CONFIG.HISTORY_ARCHIVE_ON_LOAD)
+        self.archive = archive
         self.ingestion_engine = DataIngestionEngine(base_path)
         self.business_rules = BusinessRulesEngine()
         self.advanced_rules = AdvancedBusinessRulesEngine()
+        # Stato delle regole tra un caricamento e l'altro (rivalutazione incrementale) e
+        # risultati per partizione riusati tra esecuzioni
+        result_cache = RuleResultCache(
+            os.path.join(base_path, CONFIG.CACHE_DIR, 'rules')
+        ) if CONFIG.ENABLE_RULE_CACHE else None
+        self.incremental_rules = IncrementalRuleEngine(self.business_rules, self.advanced_rules,
+                                                       result_cache=result_cache)
         self.alert_manager = AlertManager()
         self.kpi_calculator = KPICalculator()
         
@@ -44,7 +61,7 @@ class BAITActivityController:
             LOGGER.info("🚀 Avvio caricamento dati...")
             
             # Caricamento dati raw
-            self.raw_data = self.ingestion_engine.load_all_data()
+            self.raw_data = self.ingestion_engine.load_data(self.date_range, archive=self.archive)
             
             if not self.raw_data:
                 LOGGER.error("❌ Nessun dato caricato, impossibile continuare")
@@ -81,17 +98,30 @@ class BAITActivityController:
                     self.raw_data['teamviewer_gruppo'], is_bait=False
                 )
             
-            # Altri dati (implementazione semplificata per ora)
-            self.processed_data['permessi'] = []
-            self.processed_data['utilizzo_veicoli'] = []
-            self.processed_data['calendario'] = []
+            # Permessi
+            self.processed_data['permessi'] = DataModelFactory.create_permessi_from_df(
+                self.raw_data['permessi']
+            ) if 'permessi' in self.raw_data else []
+            
+            # Utilizzo veicoli
+            self.processed_data['utilizzo_veicoli'] = DataModelFactory.create_veicoli_from_df(
+                self.raw_data['auto']
+            ) if 'auto' in self.raw_data else []
+            
+            # Calendario
+            self.processed_data['calendario'] = DataModelFactory.create_calendario_from_df(
+                self.raw_data['calendario']
+            ) if 'calendario' in self.raw_data else []
             
             # Statistiche caricamento
             stats = {
                 'attivita': len(self.processed_data.get('attivita', [])),
                 'timbrature': len(self.processed_data.get('timbrature', [])),
                 'sessioni_bait': len(self.processed_data.get('sessioni_bait', [])),
-                'sessioni_gruppo': len(self.processed_data.get('sessioni_gruppo', []))
+                'sessioni_gruppo': len(self.processed_data.get('sessioni_gruppo', [])),
+                'permessi': len(self.processed_data.get('permessi', [])),
+                'utilizzo_veicoli': len(self.processed_data.get('utilizzo_veicoli', [])),
+                'calendario': len(self.processed_data.get('calendario', []))
             }
             
             LOGGER.info("✅ Dati processati con successo:")
@@ -109,26 +139,11 @@ class BAITActivityController:
         try:
             LOGGER.info("🔍 Avvio validazioni Business Rules...")
             
-            # Validazioni core (Regole 1-4)
-            core_results = self.business_rules.execute_core_validations(
-                self.processed_data.get('attivita', []),
-                self.processed_data.get('timbrature', []),
-                self.processed_data.get('sessioni_bait', []),
-                self.processed_data.get('sessioni_gruppo', []),
-                self.processed_data.get('permessi', [])
-            )
-            
-            # Validazioni avanzate (Regole 5-7)
-            advanced_results = self.advanced_rules.execute_advanced_validations(
-                self.processed_data.get('attivita', []),
-                self.processed_data.get('timbrature', []),
-                self.processed_data.get('calendario', []),
-                self.processed_data.get('utilizzo_veicoli', []),
-                self.processed_data.get('permessi', [])
-            )
-            
-            # Combina risultati
-            self.validation_results = core_results + advanced_results
+            # Timeline per tecnico costruita una volta: regole core (1-4) e avanzate (5-7)
+            # come visitatori di un'unica scansione, ciascuna con gli ID alert del proprio engine;
+            # la valutazione resta la base per refresh_business_validations
+            self.validation_results = self.incremental_rules.evaluate(self.processed_data)
+            BusinessRulesEngine.log_results(self.validation_results)
             
             # Raccoglie tutti gli alert
             all_alerts = []
@@ -154,6 +169,26 @@ class BAITActivityController:
             LOGGER.error(f"❌ Errore nelle validazioni: {e}")
             return False
     
+    def refresh_business_validations(self) -> Optional[AlertDelta]:
+        """
+        Ricarica i dati e rivaluta solo i giorni tecnico cambiati dall'ultima validazione
+        (es. nuova riga in teamviewer_bait.csv); restituisce alert aggiunti, rimossi e invariati
+        """
+        try:
+            if not self.load_and_process_data():
+                return None
+
+            delta = self.incremental_rules.update(self.processed_data)
+            self.validation_results = self.incremental_rules.results()
+
+            self.alert_manager.clear_alerts()
+            self.alert_manager.add_alerts(self.incremental_rules.alerts())
+            return delta
+
+        except Exception as e:
+            LOGGER.error(f"❌ Errore nell'aggiornamento validazioni: {e}")
+            return None
+    
     def calculate_kpis(self) -> bool:
         """Calcola KPI e metriche business intelligence"""
         try:
@@ -170,13 +205,13 @@ class BAITActivityController:
             
             # KPI per tecnico
             tecnici = set()
-            tecnici.update(a.tecnico for a in self.processed_data.get('attivita', []) if a.tecnico)
-            tecnici.update(t.nome_completo for t in self.processed_data.get('timbrature', []) if t.nome_completo != "Unknown")
+            tecnici.update(a.tecnico_id for a in self.processed_data.get('attivita', []) if a.tecnico_id)
+            tecnici.update(t.tecnico_id for t in self.processed_data.get('timbrature', []) if t.tecnico_id)
             
             self.technician_kpis = []
-            for tecnico in tecnici:
+            for tecnico_id in sorted(tecnici):
                 tech_kpi = self.kpi_calculator.calculate_technician_kpis(
-                    tecnico,
+                    TECHNICIANS.name(tecnico_id),
                     self.processed_data.get('attivita', []),
                     self.processed_data.get('timbrature', []),
                     self.processed_data.get('sessioni_bait', []) + self.processed_data.get('sessioni_gruppo', []),
@@ -227,21 +262,7 @@ class BAITActivityController:
                 LOGGER.info(f"✅ KPI report salvato: {kpi_file}")
             
             # 3. JSON Export per Dashboard
-            json_export = {
-                'alerts': self.alert_manager.export_alerts_json(),
-                'kpis': self.kpi_calculator.export_kpis_json(self.system_kpi, self.technician_kpis) if self.system_kpi else {},
-                'system_metadata': {
-                    'generation_time': datetime.now().isoformat(),
-                    'data_files_processed': list(self.raw_data.keys()),
-                    'validation_rules_executed': len(self.validation_results),
-                    'total_processing_time_ms': sum(r.execution_time_ms for r in self.validation_results)
-                }
-            }
-            
-            json_file = os.path.join(output_dir, f"bait_dashboard_data_{datetime.now().strftime('%Y%m%d_%H%M')}.json")
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(json_export, f, indent=2, ensure_ascii=False, default=str)
-            
+            json_file = self.export_dashboard_json(output_dir)
             reports_generated['json_export'] = json_file
             LOGGER.info(f"✅ JSON dashboard export salvato: {json_file}")
             
@@ -262,6 +283,27 @@ class BAITActivityController:
             LOGGER.error(f"❌ Errore nella generazione report: {e}")
             return {}
     
+    def export_dashboard_json(self, output_dir: str = None) -> str:
+        """Salva alert e KPI correnti nel JSON per la dashboard e ne restituisce il percorso"""
+        if output_dir is None:
+            output_dir = self.base_path
+        
+        json_export = {
+            'alerts': self.alert_manager.export_alerts_json(),
+            'kpis': self.kpi_calculator.export_kpis_json(self.system_kpi, self.technician_kpis) if self.system_kpi else {},
+            'system_metadata': {
+                'generation_time': datetime.now().isoformat(),
+                'data_files_processed': list(self.raw_data.keys()),
+                'validation_rules_executed': len(self.validation_results),
+                'total_processing_time_ms': sum(r.execution_time_ms for r in self.validation_results)
+            }
+        }
+        
+        json_file = os.path.join(output_dir, f"bait_dashboard_data_{datetime.now().strftime('%Y%m%d_%H%M')}.json")
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(json_export, f, indent=2, ensure_ascii=False, default=str)
+        return json_file
+    
     def print_executive_summary(self):
         """Stampa riepilogo esecutivo a console"""
         print("\n" + "=" * 60)
@@ -354,8 +396,15 @@ def main():
     print("Sistema di controllo automatico attività tecnici")
     print("-" * 50)
     
+    parser = argparse.ArgumentParser(description="BAIT Activity Controller")
+    add_date_range_arguments(parser)
+    args = parser.parse_args()
+    
     # Inizializza controller
-    controller = BAITActivityController()
+    controller = BAITActivityController(
+        date_range=resolve_date_range(args.dal, args.al, args.periodo, args.ultimi_giorni),
+        archive=args.archivia
+    )
     
     # Esegui analisi completa
     success = controller.run_full_analysis()
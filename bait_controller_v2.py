@@ -11,6 +11,7 @@ Miglioramenti v2.0:
 - Sistema scoring preciso CRITICO/ALTO/MEDIO/BASSO
 """
 
+import argparse
 import sys
 import os
 import pandas as pd
@@ -25,6 +26,7 @@ from business_rules_v2 import AdvancedBusinessRulesEngine
 from alert_system import AlertManager
 from kpi_calculator import KPICalculator
 from models import *
+from history_store import add_date_range_arguments, resolve_date_range
 
 class BaitControllerV2:
     def __init__(self, config_path: str = "config.py"):
@@ -60,10 +62,19 @@ class BaitControllerV2:
         
         self.logger.info("✅ BAIT Controller v2.0 inizializzato con successo!")
     
-    def process_daily_activities(self, file_paths: Optional[Dict[str, str]] = None) -> Dict:
+    def process_daily_activities(self, file_paths: Optional[Dict[str, str]] = None,
+                                 date_range: Optional[tuple] = None,
+                                 rule_ids: Optional[List[str]] = None,
+                                 archive: Optional[bool] = None) -> Dict:
         """
         Processa le attività giornaliere con Business Rules Engine v2.0
         
+        Args:
+            date_range: (inizio, fine) da leggere dallo storico; None = upload correnti
+            rule_ids: regole v2.0 da eseguire (None = tutte); vengono caricate solo
+                le fonti e le colonne che dichiarano
+            archive: archivia nello storico gli upload caricati (None = configurazione)
+        
         Returns:
             Dict: Risultati completi con alert, KPI e metriche miglioramento
         """
@@ -77,14 +88,16 @@ class BaitControllerV2:
             if file_paths is None:
                 file_paths = self._get_default_file_paths()
             
-            # Caricamento dati con parsing migliorato
-            data_frames = self.data_ingestion.load_all_data()
+            # Caricamento dati con parsing migliorato: solo fonti e colonne lette dalle regole
+            data_frames = self.data_ingestion.load_data(
+                date_range, self.business_rules_v2.required_sources(rule_ids), archive=archive
+            )
             self._log_data_ingestion_stats(data_frames)
             
             # FASE 2: BUSINESS RULES ENGINE v2.0
             self.logger.info("🧠 FASE 2: Business Rules Engine v2.0 con confidence scoring...")
             
-            alerts_v2 = self.business_rules_v2.validate_all_rules(data_frames)
+            alerts_v2 = self.business_rules_v2.validate_all_rules(data_frames, rule_ids)
             
             self.logger.info(f"✅ Business Rules v2.0: {len(alerts_v2)} alert generati")
             
@@ -417,12 +430,19 @@ def main():
     print("🚀 BAIT SERVICE ACTIVITY CONTROLLER v2.0")
     print("="*50)
     
+    parser = argparse.ArgumentParser(description="BAIT Controller v2.0")
+    add_date_range_arguments(parser)
+    args = parser.parse_args()
+    
     try:
         # Inizializza controller v2.0
         controller = BaitControllerV2()
         
         # Processa attività
-        results = controller.process_daily_activities()
+        results = controller.process_daily_activities(
+            date_range=resolve_date_range(args.dal, args.al, args.periodo, args.ultimi_giorni),
+            archive=args.archivia
+        )
         
         # Summary risultati
         improvement = results['metadata']['improvement_metrics']
@@ -3,18 +3,32 @@ BAIT Activity Controller - Business Rules Engine
 Sistema di validazione regole business per controllo attività tecnici
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import pandas as pd
-from collections import defaultdict
 
 from models import (
-    AttivitaTecnico, TimbraturaTecnico, SessioneTeamViewer, 
+    AttivitaTecnico, TimbraturaTecnico, SessioneTeamViewer,
     PermessoTecnico, UtilizzoVeicolo, AppuntamentoCalendario,
-    Alert, AlertSeverity, TipologiaAttivita, StatoPermesso
+    Alert, AlertSeverity, TipologiaAttivita, StatoPermesso, DataModelFactory
 )
 from config import CONFIG, LOGGER
+from client_identity import CLIENTS
+from technician_identity import TECHNICIANS
+from interval_overlap import overlapping_pairs
+from session_index import SessionIndex
+from event_timeline import EventTimeline, TechnicianDay, TimelineEvent
+from rule_scheduler import RuleScheduler
+from rule_sources import RuleSources, sources_for_rules
+
+# Fonti lette da ciascuna regola (le regole lavorano sui modelli costruiti dal controller)
+RULE_SOURCES: Dict[str, RuleSources] = {
+    'BR001': DataModelFactory.model_sources('attivita', 'teamviewer_bait', 'teamviewer_gruppo'),
+    'BR002': DataModelFactory.model_sources('attivita'),
+    'BR003': DataModelFactory.model_sources('attivita', 'timbrature'),
+    'BR004': DataModelFactory.model_sources('attivita', 'timbrature', 'permessi')
+}
 
 @dataclass
 class ValidationResult:
@@ -25,85 +39,141 @@ class ValidationResult:
     stats: Dict[str, Any]
     execution_time_ms: int
 
-class BusinessRulesEngine:
-    """Engine per validazione regole business BAIT"""
-    
-    def __init__(self):
-        self.alert_counter = 0
-    
-    def generate_alert_id(self) -> str:
-        """Genera ID univoco per alert"""
-        self.alert_counter += 1
-        return f"BAIT_{datetime.now().strftime('%Y%m%d')}_{self.alert_counter:04d}"
-    
-    def create_alert(self, severity: AlertSeverity, tecnico: str, messaggio: str, 
-                    categoria: str, dettagli: Dict[str, Any] = None) -> Alert:
-        """Factory per creazione alert"""
-        return Alert(
-            id_alert=self.generate_alert_id(),
-            severity=severity,
-            tecnico=tecnico,
-            messaggio=messaggio,
-            timestamp=datetime.now(),
-            dettagli=dettagli or {},
-            categoria=categoria
-        )
-    
-    # REGOLA 1: Validazione Tipo Attività vs Sessioni TeamViewer
-    def validate_activity_type_vs_teamviewer(self, 
-                                           attivita: List[AttivitaTecnico],
-                                           sessioni_bait: List[SessioneTeamViewer],
-                                           sessioni_gruppo: List[SessioneTeamViewer]) -> ValidationResult:
+class RuleVisitor:
+    """
+    Regola business come visitatore della timeline per tecnico (scan_timeline).
+    Gli alert sono raccolti con una chiave di ordinamento e creati dall'engine a fine
+    scansione: gli ID progressivi non dipendono dall'ordine di visita.
+    """
+
+    rule_id = ''
+    rule_name = ''
+    # Fonti della timeline che attivano visit_day/visit_undated
+    sources: Tuple[str, ...] = ()
+    # Dipendenza degli alert dalle partizioni (tecnico, giorno) per la rivalutazione
+    # incrementale: 'day' (giorno dell'alert ± partition_halo giorni) o 'technician'
+    partition_scope = 'day'
+    partition_halo = 0
+    # Versione della logica e parametri CONFIG letti: con i dati, impronta dei risultati
+    # in cache (RuleResultCache); incrementare rule_version a ogni modifica della regola
+    rule_version = 1
+    thresholds: Tuple[str, ...] = ()
+
+    def __init__(self, engine: 'BusinessRulesEngine'):
+        self.engine = engine
+        self.timeline: Optional[EventTimeline] = None
+        self.stats: Dict[str, Any] = {}
+        self.pending: List[Tuple[tuple, tuple, Tuple[str, Optional[date]]]] = []
+        # Contributo di ogni partizione ai contatori delle stats (riuso dalla cache dei risultati)
+        self.partition_stats: Dict[Tuple[str, Optional[date]], Dict[str, int]] = {}
+
+    def parameters(self) -> Dict[str, Any]:
+        """Versione e soglie correnti della regola"""
+        return {'rule_version': self.rule_version, **{name: getattr(CONFIG, name) for name in self.thresholds}}
+
+    def begin(self, timeline: EventTimeline):
+        self.timeline = timeline
+        self.partition_stats = {}
+
+    def start_technician(self, tecnico_id: str):
+        pass
+
+    def visit_day(self, day: TechnicianDay):
+        pass
+
+    def visit_undated(self, event: TimelineEvent):
+        pass
+
+    def end_technician(self, tecnico_id: str):
+        pass
+
+    def finish(self):
+        pass
+
+    def alert(self, sort_key: tuple, *alert_args, partition: Tuple[str, Optional[date]]):
         """
-        Regola 1: Attività Remote devono avere sessioni TeamViewer corrispondenti
-        Attività On-Site NON dovrebbero avere sessioni remote eccessive
+        Alert da creare con gli argomenti di create_alert, in ordine di sort_key;
+        partition (ID tecnico, giorno) è la partizione che lo genera (giorno None se senza orario)
         """
-        start_time = datetime.now()
-        alerts = []
-        stats = {'remote_activities': 0, 'onsite_activities': 0, 'missing_teamviewer': 0, 'excess_teamviewer': 0}
-        
-        # Combina sessioni TeamViewer
-        all_sessioni = sessioni_bait + sessioni_gruppo
-        
-        # Raggruppa sessioni per tecnico e data
-        sessioni_per_tecnico = defaultdict(list)
-        for sessione in all_sessioni:
-            if sessione.tecnico and sessione.data_sessione:
-                key = (sessione.tecnico, sessione.data_sessione.date())
-                sessioni_per_tecnico[key].append(sessione)
-        
-        for attivita_item in attivita:
-            if not attivita_item.tecnico or not attivita_item.iniziata_il:
-                continue
-                
-            tecnico = attivita_item.tecnico
-            data_attivita = attivita_item.iniziata_il.date()
-            
+        self.pending.append((sort_key, alert_args, partition))
+
+    def count(self, name: str, partition: Tuple[str, Optional[date]], amount: int = 1):
+        """Incrementa il contatore delle stats attribuendolo alla partizione che lo genera"""
+        self.stats[name] += amount
+        counts = self.partition_stats.setdefault(partition, {})
+        counts[name] = counts.get(name, 0) + amount
+
+    def result(self, execution_time_ms: int) -> ValidationResult:
+        """Crea gli alert (e i loro ID progressivi) nell'ordine delle chiavi"""
+        self.pending.sort(key=lambda item: item[0])
+        alerts = [self.engine.create_alert(*alert_args) for _, alert_args, _ in self.pending]
+        return ValidationResult(
+            rule_id=self.rule_id,
+            rule_name=self.rule_name,
+            alerts=alerts,
+            stats=self.stats,
+            execution_time_ms=execution_time_ms
+        )
+
+# REGOLA 1: Validazione Tipo Attività vs Sessioni TeamViewer
+class ActivityTypeVisitor(RuleVisitor):
+    """
+    Regola 1: Attività Remote devono avere sessioni TeamViewer corrispondenti
+    Attività On-Site NON dovrebbero avere sessioni remote eccessive
+    """
+
+    rule_id = 'BR001'
+    rule_name = "Validazione Tipo Attività vs TeamViewer"
+    sources = ('attivita', 'sessioni_bait', 'sessioni_gruppo')
+    # Le sessioni valide per un'attività cadono nella finestra attorno al suo intervallo
+    partition_halo = 1
+    thresholds = ('TEAMVIEWER_MATCH_WINDOW_MINUTES', 'MIN_TEAMVIEWER_SESSION_MINUTES', 'ALERT_TEMPLATES')
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.stats = {'remote_activities': 0, 'onsite_activities': 0, 'missing_teamviewer': 0, 'excess_teamviewer': 0}
+        self._attivita: List[TimelineEvent] = []
+        self._sessioni: Dict[str, List[TimelineEvent]] = {'sessioni_bait': [], 'sessioni_gruppo': []}
+
+    def visit_day(self, day: TechnicianDay):
+        self._attivita.extend(day.of('attivita'))
+        for source, sessioni in self._sessioni.items():
+            sessioni.extend(day.of(source))
+
+    def finish(self):
+        # Indice per tecnico delle sessioni dei due export (doppioni rimossi), nell'ordine delle fonti
+        sessioni = SessionIndex.from_sessions(*(
+            [event.record for event in sorted(events, key=lambda event: event.posizione)]
+            for events in self._sessioni.values()
+        ))
+        self.stats['duplicate_sessions'] = 0
+        for partition, duplicates in sessioni.duplicates_by_day.items():
+            self.count('duplicate_sessions', partition, duplicates)
+        finestra = timedelta(minutes=CONFIG.TEAMVIEWER_MATCH_WINDOW_MINUTES)
+
+        for event in self._attivita:
+            attivita_item = event.record
+            tecnico = TECHNICIANS.name(attivita_item.tecnico_id)
+            partition = (attivita_item.tecnico_id, event.giorno)
+
             if attivita_item.tipologia == TipologiaAttivita.REMOTO:
-                stats['remote_activities'] += 1
-                
-                # Cerca sessioni TeamViewer corrispondenti
-                key = (tecnico, data_attivita)
-                sessioni_giorno = sessioni_per_tecnico.get(key, [])
-                
-                # Filtra sessioni nell'intervallo attività (±30 min)
-                sessioni_correlate = []
-                if attivita_item.iniziata_il and attivita_item.conclusa_il:
-                    start_window = attivita_item.iniziata_il - timedelta(minutes=30)
-                    end_window = attivita_item.conclusa_il + timedelta(minutes=30)
-                    
-                    for sessione in sessioni_giorno:
-                        if sessione.data_sessione:
-                            if start_window <= sessione.data_sessione <= end_window:
-                                sessioni_correlate.append(sessione)
-                
+                self.count('remote_activities', partition)
+
+                # Sessioni che intersecano l'intervallo attività (± finestra) e loro durata totale
+                sessioni_trovate, durata_totale = 0, 0
+                if attivita_item.conclusa_il:
+                    sessioni_trovate, durata_totale = sessioni.query(
+                        attivita_item.tecnico_id,
+                        attivita_item.iniziata_il - finestra,
+                        attivita_item.conclusa_il + finestra
+                    )
+
                 # Verifica durata minima sessioni
-                durata_totale = sum(s.durata_minuti for s in sessioni_correlate if s.durata_minuti)
-                
-                if not sessioni_correlate or durata_totale < CONFIG.MIN_TEAMVIEWER_SESSION_MINUTES:
-                    stats['missing_teamviewer'] += 1
-                    
-                    alert = self.create_alert(
+                if not sessioni_trovate or durata_totale < CONFIG.MIN_TEAMVIEWER_SESSION_MINUTES:
+                    self.count('missing_teamviewer', partition)
+
+                    self.alert(
+                        (event.posizione,),
                         AlertSeverity.ALTO,
                         tecnico,
                         CONFIG.ALERT_TEMPLATES['no_teamviewer'].format(
@@ -115,274 +185,324 @@ class BusinessRulesEngine:
                             'attivita_id': attivita_item.id_ticket,
                             'cliente': attivita_item.azienda,
                             'orario_attivita': f"{attivita_item.iniziata_il} - {attivita_item.conclusa_il}",
-                            'sessioni_trovate': len(sessioni_correlate),
-                            'durata_totale_minuti': durata_totale
-                        }
+                            'sessioni_trovate': sessioni_trovate,
+                            'durata_totale_minuti': int(durata_totale)
+                        },
+                        partition=partition
                     )
-                    alerts.append(alert)
-            
+
             elif attivita_item.tipologia == TipologiaAttivita.ONSITE:
-                stats['onsite_activities'] += 1
+                self.count('onsite_activities', partition)
                 # Per ora non implementiamo controllo eccesso TeamViewer per On-Site
                 # Può essere aggiunto se richiesto dal business
-        
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        
-        return ValidationResult(
-            rule_id="BR001",
-            rule_name="Validazione Tipo Attività vs TeamViewer",
-            alerts=alerts,
-            stats=stats,
-            execution_time_ms=execution_time
+
+# REGOLA 2: Rilevamento Sovrapposizioni Temporali
+class TemporalOverlapVisitor(RuleVisitor):
+    """
+    Regola 2: Rileva attività sovrapposte dello stesso tecnico con clienti diversi
+    """
+
+    rule_id = 'BR002'
+    rule_name = "Rilevamento Sovrapposizioni Temporali"
+    sources = ('attivita',)
+    # Coppie confrontate su tutte le attività del tecnico (anche a cavallo di giorni)
+    partition_scope = 'technician'
+    thresholds = ('ALERT_TEMPLATES',)
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.stats = {'total_activities': len(timeline.records('attivita')), 'overlaps_detected': 0,
+                      'technicians_checked': 0}
+
+    def start_technician(self, tecnico_id: str):
+        self._attivita: List[TimelineEvent] = []
+
+    def visit_day(self, day: TechnicianDay):
+        self._attivita.extend(day.of('attivita'))
+
+    def end_technician(self, tecnico_id: str):
+        # Attività del tecnico già ordinate per inizio nella timeline
+        attivita_tecnico = [event.record for event in self._attivita if event.record.conclusa_il]
+        if not attivita_tecnico:
+            return
+        self.count('technicians_checked', (tecnico_id, None))
+        tecnico = TECHNICIANS.name(tecnico_id)
+        # Alert per tecnico in ordine di prima comparsa nella fonte
+        primo = min(event.posizione for event in self._attivita)
+        # Coppie sovrapposte in ordine di inizio (un solo ordinamento per tecnico)
+        first, second, overlap_minutes = overlapping_pairs(
+            [att.iniziata_il for att in attivita_tecnico],
+            [att.conclusa_il for att in attivita_tecnico]
         )
-    
-    # REGOLA 2: Rilevamento Sovrapposizioni Temporali
-    def detect_temporal_overlaps(self, attivita: List[AttivitaTecnico]) -> ValidationResult:
-        """
-        Regola 2: Rileva attività sovrapposte dello stesso tecnico con clienti diversi
-        """
-        start_time = datetime.now()
-        alerts = []
-        stats = {'total_activities': len(attivita), 'overlaps_detected': 0, 'technicians_checked': 0}
-        
-        # Raggruppa attività per tecnico
-        attivita_per_tecnico = defaultdict(list)
-        for att in attivita:
-            if att.tecnico and att.iniziata_il and att.conclusa_il:
-                attivita_per_tecnico[att.tecnico].append(att)
-        
-        stats['technicians_checked'] = len(attivita_per_tecnico)
-        
-        for tecnico, attivita_tecnico in attivita_per_tecnico.items():
-            # Ordina attività per orario inizio
-            attivita_tecnico.sort(key=lambda x: x.iniziata_il)
-            
-            # Confronta ogni attività con le successive
-            for i, att1 in enumerate(attivita_tecnico):
-                for att2 in attivita_tecnico[i+1:]:
-                    # Verifica sovrapposizione temporale
-                    if (att1.iniziata_il < att2.conclusa_il and 
-                        att2.iniziata_il < att1.conclusa_il):
-                        
-                        # Verifica clienti diversi
-                        if att1.azienda != att2.azienda:
-                            stats['overlaps_detected'] += 1
-                            
-                            alert = self.create_alert(
-                                AlertSeverity.CRITICO,
-                                tecnico,
-                                CONFIG.ALERT_TEMPLATES['temporal_overlap'].format(
-                                    tecnico=tecnico,
-                                    cliente_a=att1.azienda or 'Unknown',
-                                    cliente_b=att2.azienda or 'Unknown'
-                                ),
-                                'temporal_overlap',
-                                {
-                                    'attivita_1': {
-                                        'id': att1.id_ticket,
-                                        'cliente': att1.azienda,
-                                        'orario': f"{att1.iniziata_il} - {att1.conclusa_il}"
-                                    },
-                                    'attivita_2': {
-                                        'id': att2.id_ticket,
-                                        'cliente': att2.azienda,
-                                        'orario': f"{att2.iniziata_il} - {att2.conclusa_il}"
-                                    }
-                                }
-                            )
-                            alerts.append(alert)
-        
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        
-        return ValidationResult(
-            rule_id="BR002",
-            rule_name="Rilevamento Sovrapposizioni Temporali",
-            alerts=alerts,
-            stats=stats,
-            execution_time_ms=execution_time
+
+        for coppia, (i, j, minutes) in enumerate(zip(first, second, overlap_minutes)):
+            att1, att2 = attivita_tecnico[i], attivita_tecnico[j]
+
+            # Verifica clienti diversi
+            if not CLIENTS.same_client(att1.azienda, att2.azienda):
+                self.count('overlaps_detected', (tecnico_id, att1.iniziata_il.date()))
+
+                self.alert(
+                    (primo, coppia),
+                    AlertSeverity.CRITICO,
+                    tecnico,
+                    CONFIG.ALERT_TEMPLATES['temporal_overlap'].format(
+                        tecnico=tecnico,
+                        cliente_a=att1.azienda or 'Unknown',
+                        cliente_b=att2.azienda or 'Unknown'
+                    ),
+                    'temporal_overlap',
+                    {
+                        'attivita_1': {
+                            'id': att1.id_ticket,
+                            'cliente': att1.azienda,
+                            'orario': f"{att1.iniziata_il} - {att1.conclusa_il}"
+                        },
+                        'attivita_2': {
+                            'id': att2.id_ticket,
+                            'cliente': att2.azienda,
+                            'orario': f"{att2.iniziata_il} - {att2.conclusa_il}"
+                        },
+                        'minuti_sovrapposizione': int(minutes)
+                    },
+                    partition=(tecnico_id, att1.iniziata_il.date())
+                )
+
+# REGOLA 3: Coerenza Geografica e Tempi di Viaggio
+class TravelTimeVisitor(RuleVisitor):
+    """
+    Regola 3: Valida coerenza geografica e tempi di viaggio tra appuntamenti
+    """
+
+    rule_id = 'BR003'
+    rule_name = "Validazione Tempi di Viaggio"
+    sources = ('attivita',)
+    thresholds = ('MAX_TRAVEL_TIME_MINUTES',)
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.stats = {'travel_validations': 0, 'impossible_travels': 0}
+
+    def visit_day(self, day: TechnicianDay):
+        # Attività del tecnico nel giorno, ordinate per orario
+        eventi = day.of('attivita')
+        if not eventi:
+            return
+        attivita_giorno = [event.record for event in eventi]
+        primo = min(event.posizione for event in eventi)
+        tecnico = TECHNICIANS.name(day.tecnico_id)
+
+        # Controlla tempi di viaggio tra attività consecutive
+        for i in range(len(attivita_giorno) - 1):
+            att_corrente = attivita_giorno[i]
+            att_successiva = attivita_giorno[i + 1]
+
+            if (att_corrente.conclusa_il and att_successiva.iniziata_il and
+                not CLIENTS.same_client(att_corrente.azienda, att_successiva.azienda)):
+
+                # Calcola tempo disponibile per viaggio
+                tempo_viaggio = att_successiva.iniziata_il - att_corrente.conclusa_il
+                tempo_viaggio_minuti = int(tempo_viaggio.total_seconds() / 60)
+
+                self.count('travel_validations', (day.tecnico_id, day.giorno))
+
+                # Se tempo viaggio < soglia configurata, genera alert
+                if tempo_viaggio_minuti < CONFIG.MAX_TRAVEL_TIME_MINUTES and tempo_viaggio_minuti >= 0:
+                    self.count('impossible_travels', (day.tecnico_id, day.giorno))
+
+                    self.alert(
+                        (primo, i),
+                        AlertSeverity.MEDIO,
+                        tecnico,
+                        f"{tecnico}: tempo viaggio insufficiente tra {att_corrente.azienda} e {att_successiva.azienda} ({tempo_viaggio_minuti} min)",
+                        'insufficient_travel_time',
+                        {
+                            'attivita_precedente': {
+                                'cliente': att_corrente.azienda,
+                                'fine': att_corrente.conclusa_il.isoformat(),
+                                'id': att_corrente.id_ticket
+                            },
+                            'attivita_successiva': {
+                                'cliente': att_successiva.azienda,
+                                'inizio': att_successiva.iniziata_il.isoformat(),
+                                'id': att_successiva.id_ticket
+                            },
+                            'tempo_viaggio_minuti': tempo_viaggio_minuti
+                        },
+                        partition=(day.tecnico_id, day.giorno)
+                    )
+
+# REGOLA 4: Rilevamento Report Mancanti
+class MissingReportsVisitor(RuleVisitor):
+    """
+    Regola 4: Rileva tecnici attivi senza rapportini giornalieri
+    """
+
+    rule_id = 'BR004'
+    rule_name = "Rilevamento Report Mancanti"
+    sources = ('attivita', 'timbrature', 'permessi')
+    thresholds = ('ALERT_TEMPLATES',)
+
+    def __init__(self, engine: 'BusinessRulesEngine', target_date: datetime = None):
+        super().__init__(engine)
+        self.target_date = datetime.now().date() if target_date is None else target_date.date()
+
+    def parameters(self) -> Dict[str, Any]:
+        return {**super().parameters(), 'target_date': self.target_date.isoformat()}
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.stats = {'target_date': self.target_date.isoformat(), 'active_technicians': 0, 'missing_reports': 0}
+
+    def visit_day(self, day: TechnicianDay):
+        # Solo tecnici con timbrature nella data target (confronto per ID tecnico)
+        if day.giorno != self.target_date or not day.of('timbrature'):
+            return
+        self.count('active_technicians', (day.tecnico_id, day.giorno))
+
+        # Attività reportate nella data target o permesso approvato (indicizzato su ogni giorno coperto)
+        if day.of('attivita') or any(
+            event.record.stato == StatoPermesso.APPROVATO and event.record.data_fine
+            for event in day.of('permessi')
+        ):
+            return
+
+        self.count('missing_reports', (day.tecnico_id, day.giorno))
+        tecnico = TECHNICIANS.name(day.tecnico_id)
+        self.alert(
+            (day.tecnico_id,),
+            AlertSeverity.ALTO,
+            tecnico,
+            CONFIG.ALERT_TEMPLATES['missing_reports'].format(tecnico=tecnico),
+            'missing_daily_report',
+            {
+                'data_controllo': self.target_date.isoformat(),
+                'ha_timbrature': True,
+                'ha_permessi': False
+            },
+            partition=(day.tecnico_id, day.giorno)
         )
-    
-    # REGOLA 3: Coerenza Geografica e Tempi di Viaggio
-    def validate_travel_times(self, attivita: List[AttivitaTecnico], 
-                             timbrature: List[TimbraturaTecnico]) -> ValidationResult:
+
+class BusinessRulesEngine:
+    """Engine per validazione regole business BAIT"""
+
+    # Dichiarazione fonti delle regole dell'engine
+    RULE_SOURCES = RULE_SOURCES
+
+    def __init__(self):
+        self.alert_counter = 0
+
+    @classmethod
+    def required_sources(cls, rule_ids: Optional[List[str]] = None) -> RuleSources:
+        """Fonti e colonne da caricare per eseguire le regole indicate (tutte se None)"""
+        return sources_for_rules(cls.RULE_SOURCES, rule_ids)
+
+    @staticmethod
+    def event_timeline(timeline: Optional[EventTimeline] = None, **sources: List) -> EventTimeline:
+        """Timeline per tecnico condivisa dal controller o costruita sulle fonti della regola"""
+        return timeline if timeline is not None else EventTimeline.from_models(sources)
+
+    @staticmethod
+    def run_visitors(timeline: EventTimeline, visitors: List[RuleVisitor],
+                     executor: Optional[str] = None, max_workers: Optional[int] = None) -> List[ValidationResult]:
         """
-        Regola 3: Valida coerenza geografica e tempi di viaggio tra appuntamenti
+        Esegue le regole sulla timeline in parallelo (RuleScheduler; executor
+        'sequential', 'thread' o 'process', default CONFIG.RULES_EXECUTOR), poi crea gli
+        alert nell'ordine dei visitatori (ognuno con l'engine, e il contatore ID, che lo ha creato)
         """
-        start_time = datetime.now()
-        alerts = []
-        stats = {'travel_validations': 0, 'impossible_travels': 0}
-        
-        # Raggruppa attività per tecnico e data
-        attivita_per_tecnico_data = defaultdict(list)
-        for att in attivita:
-            if att.tecnico and att.iniziata_il:
-                key = (att.tecnico, att.iniziata_il.date())
-                attivita_per_tecnico_data[key].append(att)
-        
-        for (tecnico, data), attivita_giorno in attivita_per_tecnico_data.items():
-            # Ordina attività per orario
-            attivita_giorno.sort(key=lambda x: x.iniziata_il)
-            
-            # Controlla tempi di viaggio tra attività consecutive
-            for i in range(len(attivita_giorno) - 1):
-                att_corrente = attivita_giorno[i]
-                att_successiva = attivita_giorno[i + 1]
-                
-                if (att_corrente.conclusa_il and att_successiva.iniziata_il and
-                    att_corrente.azienda != att_successiva.azienda):
-                    
-                    # Calcola tempo disponibile per viaggio
-                    tempo_viaggio = att_successiva.iniziata_il - att_corrente.conclusa_il
-                    tempo_viaggio_minuti = int(tempo_viaggio.total_seconds() / 60)
-                    
-                    stats['travel_validations'] += 1
-                    
-                    # Se tempo viaggio < soglia configurata, genera alert
-                    if tempo_viaggio_minuti < CONFIG.MAX_TRAVEL_TIME_MINUTES and tempo_viaggio_minuti >= 0:
-                        stats['impossible_travels'] += 1
-                        
-                        alert = self.create_alert(
-                            AlertSeverity.MEDIO,
-                            tecnico,
-                            f"{tecnico}: tempo viaggio insufficiente tra {att_corrente.azienda} e {att_successiva.azienda} ({tempo_viaggio_minuti} min)",
-                            'insufficient_travel_time',
-                            {
-                                'attivita_precedente': {
-                                    'cliente': att_corrente.azienda,
-                                    'fine': att_corrente.conclusa_il.isoformat(),
-                                    'id': att_corrente.id_ticket
-                                },
-                                'attivita_successiva': {
-                                    'cliente': att_successiva.azienda,
-                                    'inizio': att_successiva.iniziata_il.isoformat(),
-                                    'id': att_successiva.id_ticket
-                                },
-                                'tempo_viaggio_minuti': tempo_viaggio_minuti
-                            }
-                        )
-                        alerts.append(alert)
-        
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        
-        return ValidationResult(
-            rule_id="BR003", 
-            rule_name="Validazione Tempi di Viaggio",
-            alerts=alerts,
-            stats=stats,
-            execution_time_ms=execution_time
+        return RuleScheduler(executor, max_workers).run(timeline, visitors)
+
+    @staticmethod
+    def log_results(results: List[ValidationResult]):
+        for result in results:
+            LOGGER.info(f"✓ {result.rule_name}: {len(result.alerts)} alert generati ({result.execution_time_ms}ms)")
+
+    def generate_alert_id(self) -> str:
+        """Genera ID univoco per alert"""
+        self.alert_counter += 1
+        return f"BAIT_{datetime.now().strftime('%Y%m%d')}_{self.alert_counter:04d}"
+
+    def create_alert(self, severity: AlertSeverity, tecnico: str, messaggio: str,
+                    categoria: str, dettagli: Dict[str, Any] = None) -> Alert:
+        """Factory per creazione alert"""
+        return Alert(
+            id_alert=self.generate_alert_id(),
+            severity=severity,
+            tecnico=tecnico,
+            messaggio=messaggio,
+            timestamp=datetime.now(),
+            dettagli=dettagli or {},
+            categoria=categoria
         )
-    
+
+    def core_visitors(self, target_date: datetime = None) -> List[RuleVisitor]:
+        """Visitatori delle regole core (BR001-BR004), alert con ID di questo engine"""
+        return [
+            ActivityTypeVisitor(self),
+            TemporalOverlapVisitor(self),
+            TravelTimeVisitor(self),
+            MissingReportsVisitor(self, target_date)
+        ]
+
+    # REGOLA 1: Validazione Tipo Attività vs Sessioni TeamViewer
+    def validate_activity_type_vs_teamviewer(self,
+                                           attivita: List[AttivitaTecnico],
+                                           sessioni_bait: List[SessioneTeamViewer],
+                                           sessioni_gruppo: List[SessioneTeamViewer],
+                                           timeline: Optional[EventTimeline] = None) -> ValidationResult:
+        """Regola 1 su una timeline dedicata (o quella condivisa): vedi ActivityTypeVisitor"""
+        timeline = self.event_timeline(timeline, attivita=attivita, sessioni_bait=sessioni_bait,
+                                       sessioni_gruppo=sessioni_gruppo)
+        return self.run_visitors(timeline, [ActivityTypeVisitor(self)])[0]
+
+    # REGOLA 2: Rilevamento Sovrapposizioni Temporali
+    def detect_temporal_overlaps(self, attivita: List[AttivitaTecnico],
+                                 timeline: Optional[EventTimeline] = None) -> ValidationResult:
+        """Regola 2 su una timeline dedicata (o quella condivisa): vedi TemporalOverlapVisitor"""
+        timeline = self.event_timeline(timeline, attivita=attivita)
+        return self.run_visitors(timeline, [TemporalOverlapVisitor(self)])[0]
+
+    # REGOLA 3: Coerenza Geografica e Tempi di Viaggio
+    def validate_travel_times(self, attivita: List[AttivitaTecnico],
+                             timbrature: List[TimbraturaTecnico],
+                             timeline: Optional[EventTimeline] = None) -> ValidationResult:
+        """Regola 3 su una timeline dedicata (o quella condivisa): vedi TravelTimeVisitor"""
+        timeline = self.event_timeline(timeline, attivita=attivita)
+        return self.run_visitors(timeline, [TravelTimeVisitor(self)])[0]
+
     # REGOLA 4: Rilevamento Report Mancanti
     def detect_missing_reports(self, attivita: List[AttivitaTecnico],
                               timbrature: List[TimbraturaTecnico],
                               permessi: List[PermessoTecnico],
-                              target_date: datetime = None) -> ValidationResult:
-        """
-        Regola 4: Rileva tecnici attivi senza rapportini giornalieri
-        """
-        start_time = datetime.now()
-        alerts = []
-        
-        if target_date is None:
-            target_date = datetime.now().date()
-        else:
-            target_date = target_date.date()
-        
-        stats = {'target_date': target_date.isoformat(), 'active_technicians': 0, 'missing_reports': 0}
-        
-        # Trova tecnici con timbrature nella data target
-        tecnici_attivi = set()
-        for timbratura in timbrature:
-            if (timbratura.ora_inizio and 
-                timbratura.ora_inizio.date() == target_date and
-                timbratura.nome_completo != "Unknown"):
-                tecnici_attivi.add(timbratura.nome_completo)
-        
-        stats['active_technicians'] = len(tecnici_attivi)
-        
-        # Trova tecnici con attività reportate nella data target
-        tecnici_con_report = set()
-        for att in attivita:
-            if (att.tecnico and att.iniziata_il and 
-                att.iniziata_il.date() == target_date):
-                tecnici_con_report.add(att.tecnico)
-        
-        # Trova tecnici in permesso nella data target
-        tecnici_in_permesso = set()
-        for permesso in permessi:
-            if (permesso.stato == StatoPermesso.APPROVATO and 
-                permesso.data_inizio and permesso.data_fine):
-                
-                if permesso.data_inizio.date() <= target_date <= permesso.data_fine.date():
-                    if permesso.dipendente:
-                        tecnici_in_permesso.add(permesso.dipendente)
-        
-        # Identifica tecnici attivi senza report (escludendo quelli in permesso)
-        tecnici_senza_report = tecnici_attivi - tecnici_con_report - tecnici_in_permesso
-        
-        stats['missing_reports'] = len(tecnici_senza_report)
-        
-        for tecnico in tecnici_senza_report:
-            alert = self.create_alert(
-                AlertSeverity.ALTO,
-                tecnico,
-                CONFIG.ALERT_TEMPLATES['missing_reports'].format(tecnico=tecnico),
-                'missing_daily_report',
-                {
-                    'data_controllo': target_date.isoformat(),
-                    'ha_timbrature': True,
-                    'ha_permessi': False
-                }
-            )
-            alerts.append(alert)
-        
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        
-        return ValidationResult(
-            rule_id="BR004",
-            rule_name="Rilevamento Report Mancanti",
-            alerts=alerts,
-            stats=stats,
-            execution_time_ms=execution_time
-        )
-    
+                              target_date: datetime = None,
+                              timeline: Optional[EventTimeline] = None) -> ValidationResult:
+        """Regola 4 su una timeline dedicata (o quella condivisa): vedi MissingReportsVisitor"""
+        timeline = self.event_timeline(timeline, attivita=attivita, timbrature=timbrature, permessi=permessi)
+        return self.run_visitors(timeline, [MissingReportsVisitor(self, target_date)])[0]
+
     def execute_core_validations(self,
                                 attivita: List[AttivitaTecnico],
                                 timbrature: List[TimbraturaTecnico],
                                 sessioni_bait: List[SessioneTeamViewer],
                                 sessioni_gruppo: List[SessioneTeamViewer],
-                                permessi: List[PermessoTecnico]) -> List[ValidationResult]:
+                                permessi: List[PermessoTecnico],
+                                timeline: Optional[EventTimeline] = None) -> List[ValidationResult]:
         """Esegue le prime 4 validazioni core del sistema"""
-        
+
         LOGGER.info("Avvio validazioni core Business Rules Engine...")
-        
-        results = []
-        
-        # Regola 1: Validazione tipo attività vs TeamViewer
-        result1 = self.validate_activity_type_vs_teamviewer(attivita, sessioni_bait, sessioni_gruppo)
-        results.append(result1)
-        LOGGER.info(f"✓ {result1.rule_name}: {len(result1.alerts)} alert generati ({result1.execution_time_ms}ms)")
-        
-        # Regola 2: Sovrapposizioni temporali
-        result2 = self.detect_temporal_overlaps(attivita)
-        results.append(result2)
-        LOGGER.info(f"✓ {result2.rule_name}: {len(result2.alerts)} alert generati ({result2.execution_time_ms}ms)")
-        
-        # Regola 3: Tempi di viaggio
-        result3 = self.validate_travel_times(attivita, timbrature)
-        results.append(result3)
-        LOGGER.info(f"✓ {result3.rule_name}: {len(result3.alerts)} alert generati ({result3.execution_time_ms}ms)")
-        
-        # Regola 4: Report mancanti
-        result4 = self.detect_missing_reports(attivita, timbrature, permessi)
-        results.append(result4)
-        LOGGER.info(f"✓ {result4.rule_name}: {len(result4.alerts)} alert generati ({result4.execution_time_ms}ms)")
-        
+
+        # Una sola timeline per tecnico e una sola scansione per tutte le regole
+        timeline = self.event_timeline(timeline, attivita=attivita, timbrature=timbrature,
+                                       sessioni_bait=sessioni_bait, sessioni_gruppo=sessioni_gruppo,
+                                       permessi=permessi)
+        results = self.run_visitors(timeline, self.core_visitors())
+        self.log_results(results)
+
         total_alerts = sum(len(r.alerts) for r in results)
         total_time = sum(r.execution_time_ms for r in results)
-        
+
         LOGGER.info(f"Validazioni core completate: {total_alerts} alert totali in {total_time}ms")
-        
+
         return results
 
 if __name__ == "__main__":
@@ -393,4 +513,4 @@ if __name__ == "__main__":
     print("- BR001: Validazione Tipo Attività vs TeamViewer")  
     print("- BR002: Rilevamento Sovrapposizioni Temporali")
     print("- BR003: Validazione Tempi di Viaggio")
-    print("- BR004: Rilevamento Report Mancanti")
\ No newline at end of file
+    print("- BR004: Rilevamento Report Mancanti")
\ No newline at end of file
@@ -3,352 +3,399 @@ BAIT Activity Controller - Advanced Business Rules
 Regole business avanzate per controllo coerenza calendario, veicoli e permessi
 """
 
-from datetime import datetime, timedelta
+import pandas as pd
 from typing import List, Dict, Any, Optional
-from collections import defaultdict
 
 from models import (
-    AttivitaTecnico, TimbraturaTecnico, UtilizzoVeicolo, 
-    AppuntamentoCalendario, PermessoTecnico, Alert, AlertSeverity, 
-    TipologiaAttivita, StatoPermesso
+    AttivitaTecnico, TimbraturaTecnico, UtilizzoVeicolo,
+    AppuntamentoCalendario, PermessoTecnico, Alert, AlertSeverity,
+    TipologiaAttivita, StatoPermesso, DataModelFactory
 )
-from business_rules import ValidationResult, BusinessRulesEngine
+from business_rules import ValidationResult, BusinessRulesEngine, RuleVisitor
 from config import CONFIG, LOGGER
+from client_identity import CLIENTS
+from technician_identity import TECHNICIANS
+from rule_sources import RuleSources
+from event_timeline import EventTimeline, TechnicianDay, TimelineEvent, events_frame
+from interval_overlap import interval_join
 
-class AdvancedBusinessRulesEngine(BusinessRulesEngine):
-    """Engine per regole business avanzate"""
-    
-    # REGOLA 5: Coerenza Calendario vs Timbrature vs Attività
-    def validate_schedule_coherence(self,
-                                   attivita: List[AttivitaTecnico],
-                                   timbrature: List[TimbraturaTecnico], 
-                                   calendario: List[AppuntamentoCalendario]) -> ValidationResult:
-        """
-        Regola 5: Confronta orari pianificati vs time tracking vs attività reportate
-        """
-        start_time = datetime.now()
-        alerts = []
-        stats = {
-            'calendar_appointments': len(calendario),
+# Fonti lette da ciascuna regola avanzata
+RULE_SOURCES: Dict[str, RuleSources] = {
+    'BR005': DataModelFactory.model_sources('attivita', 'timbrature', 'calendario'),
+    'BR006': DataModelFactory.model_sources('attivita', 'auto'),
+    'BR007': DataModelFactory.model_sources('attivita', 'permessi')
+}
+
+def _pair_records(frame: pd.DataFrame, labels: pd.Series):
+    """Coppie (record, posizione originale) delle righe indicate, in un solo accesso vettoriale"""
+    selected = frame.loc[labels, ['record', 'posizione']]
+    return zip(selected['record'].values, selected['posizione'].values)
+
+class JoinRuleVisitor(RuleVisitor):
+    """
+    Regola basata su join tra fonti: durante la scansione raccoglie gli eventi delle sue
+    fonti (per tecnico, giorno e orario), a fine scansione li confronta con un'unica
+    join vettoriale (interval_join) per (tecnico, giorno)
+    """
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.events: Dict[str, List[TimelineEvent]] = {source: [] for source in self.sources}
+
+    def visit_day(self, day: TechnicianDay):
+        for source, events in self.events.items():
+            events.extend(day.of(source))
+
+# REGOLA 5: Coerenza Calendario vs Timbrature vs Attività
+class ScheduleCoherenceVisitor(JoinRuleVisitor):
+    """
+    Regola 5: Confronta orari pianificati vs time tracking vs attività reportate
+    """
+
+    rule_id = 'BR005'
+    rule_name = "Coerenza Calendario vs Timbrature vs Attività"
+    sources = ('calendario', 'timbrature', 'attivita')
+    thresholds = ('MAX_TIME_DISCREPANCY_MINUTES', 'ALERT_TEMPLATES')
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.stats = {
+            'calendar_appointments': len(timeline.records('calendario')),
             'coherence_checks': 0,
             'schedule_discrepancies': 0,
             'missing_activities': 0
         }
-        
-        for appuntamento in calendario:
-            if not appuntamento.tecnico or not appuntamento.data_inizio:
+
+    def finish(self):
+        # Join per (ID tecnico, data) sugli eventi raccolti: nessuna scansione per appuntamento
+        appuntamenti = events_frame(self.events['calendario'], 'data_inizio', 'cliente')
+        timbrature_df = events_frame(self.events['timbrature'], 'ora_inizio', 'cliente_nome')
+        attivita_df = events_frame(self.events['attivita'], 'iniziata_il', 'azienda')
+        giorni = appuntamenti.groupby([appuntamenti['tecnico_id'], appuntamenti['giorno'].dt.date], sort=False).size()
+        for partition, appuntamenti_giorno in giorni.items():
+            self.count('coherence_checks', partition, int(appuntamenti_giorno))
+
+        # Alert in ordine di appuntamento: discrepanze orarie (fase 0), attività mancante (fase 1)
+        # Verifica coerenza orari calendario vs timbrature dello stesso cliente
+        coppie = interval_join(
+            appuntamenti, timbrature_df, ['tecnico_id', 'giorno'],
+            ('data_inizio', 'data_inizio'), ('ora_inizio', 'ora_inizio'), how='any'
+        )
+        coppie = coppie[coppie['start_gap_minutes'].abs() > CONFIG.MAX_TIME_DISCREPANCY_MINUTES]
+        for (appuntamento, posizione), (timbratura, _), right, gap in zip(
+                _pair_records(appuntamenti, coppie['left']),
+                _pair_records(timbrature_df, coppie['right']),
+                coppie['right'], coppie['start_gap_minutes']):
+            if not CLIENTS.same_client(timbratura.cliente_nome, appuntamento.cliente):
                 continue
-                
-            tecnico = appuntamento.tecnico
-            data_app = appuntamento.data_inizio.date()
-            stats['coherence_checks'] += 1
-            
-            # Trova timbrature corrispondenti
-            timbrature_tecnico = [
-                t for t in timbrature 
-                if (t.nome_completo == tecnico and t.ora_inizio and 
-                    t.ora_inizio.date() == data_app)
-            ]
-            
-            # Trova attività corrispondenti  
-            attivita_tecnico = [
-                a for a in attivita
-                if (a.tecnico == tecnico and a.iniziata_il and 
-                    a.iniziata_il.date() == data_app and
-                    a.azienda == appuntamento.cliente)
-            ]
-            
-            # Verifica coerenza orari calendario vs timbrature
-            for timbratura in timbrature_tecnico:
-                if timbratura.cliente_nome == appuntamento.cliente:
-                    discrepanza_inizio = abs(
-                        (appuntamento.data_inizio - timbratura.ora_inizio).total_seconds() / 60
-                    )
-                    
-                    if discrepanza_inizio > CONFIG.MAX_TIME_DISCREPANCY_MINUTES:
-                        stats['schedule_discrepancies'] += 1
-                        
-                        alert = self.create_alert(
-                            AlertSeverity.MEDIO,
-                            tecnico,
-                            CONFIG.ALERT_TEMPLATES['calendar_vs_tracking'].format(
-                                tecnico=tecnico,
-                                calendario_ora=appuntamento.data_inizio.strftime('%H:%M'),
-                                timbratura_ora=timbratura.ora_inizio.strftime('%H:%M')
-                            ),
-                            'schedule_discrepancy',
-                            {
-                                'cliente': appuntamento.cliente,
-                                'calendario_orario': appuntamento.data_inizio.isoformat(),
-                                'timbratura_orario': timbratura.ora_inizio.isoformat(),
-                                'discrepanza_minuti': int(discrepanza_inizio)
-                            }
-                        )
-                        alerts.append(alert)
-            
-            # Verifica presenza attività per appuntamento calendario
-            if not attivita_tecnico:
-                stats['missing_activities'] += 1
-                
-                alert = self.create_alert(
-                    AlertSeverity.ALTO,
-                    tecnico,
-                    f"{tecnico}: appuntamento calendario {appuntamento.cliente} senza attività reportata",
-                    'missing_activity_for_appointment',
-                    {
-                        'cliente': appuntamento.cliente,
-                        'calendario_orario': appuntamento.data_inizio.isoformat(),
-                        'luogo': appuntamento.luogo
-                    }
-                )
-                alerts.append(alert)
-        
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        
-        return ValidationResult(
-            rule_id="BR005",
-            rule_name="Coerenza Calendario vs Timbrature vs Attività",
-            alerts=alerts,
-            stats=stats,
-            execution_time_ms=execution_time
+
+            discrepanza_inizio = abs(gap)
+            self.count('schedule_discrepancies', (appuntamento.tecnico_id, appuntamento.data_inizio.date()))
+            tecnico = TECHNICIANS.name(appuntamento.tecnico_id)
+            self.alert(
+                (posizione, 0, right),
+                AlertSeverity.MEDIO,
+                tecnico,
+                CONFIG.ALERT_TEMPLATES['calendar_vs_tracking'].format(
+                    tecnico=tecnico,
+                    calendario_ora=appuntamento.data_inizio.strftime('%H:%M'),
+                    timbratura_ora=timbratura.ora_inizio.strftime('%H:%M')
+                ),
+                'schedule_discrepancy',
+                {
+                    'cliente': appuntamento.cliente,
+                    'calendario_orario': appuntamento.data_inizio.isoformat(),
+                    'timbratura_orario': timbratura.ora_inizio.isoformat(),
+                    'discrepanza_minuti': int(discrepanza_inizio)
+                },
+                partition=(appuntamento.tecnico_id, appuntamento.data_inizio.date())
+            )
+
+        # Verifica presenza attività dello stesso cliente per appuntamento calendario
+        coppie = interval_join(
+            appuntamenti, attivita_df, ['tecnico_id', 'giorno'],
+            ('data_inizio', 'data_inizio'), ('iniziata_il', 'iniziata_il'), how='any'
         )
-    
-    # REGOLA 6: Validazione Utilizzo Veicoli
-    def validate_vehicle_usage(self,
-                              attivita: List[AttivitaTecnico],
-                              utilizzo_veicoli: List[UtilizzoVeicolo]) -> ValidationResult:
-        """
-        Regola 6: Validazioni utilizzo veicoli aziendali
-        - Auto utilizzata deve avere cliente associato
-        - Attività remote NON devono avere utilizzo auto
-        - Coerenza orari presa/riconsegna vs attività
-        """
-        start_time = datetime.now()
-        alerts = []
-        stats = {
-            'vehicle_usages': len(utilizzo_veicoli),
+        con_attivita = {
+            left for left, azienda, cliente in zip(
+                coppie['left'],
+                attivita_df['azienda'].reindex(coppie['right']).values,
+                appuntamenti['cliente'].reindex(coppie['left']).values
+            )
+            if CLIENTS.same_client(azienda, cliente)
+        }
+        senza_attivita = appuntamenti.index.difference(list(con_attivita))
+        for appuntamento, posizione in _pair_records(appuntamenti, senza_attivita):
+            self.count('missing_activities', (appuntamento.tecnico_id, appuntamento.data_inizio.date()))
+            tecnico = TECHNICIANS.name(appuntamento.tecnico_id)
+            self.alert(
+                (posizione, 1, 0),
+                AlertSeverity.ALTO,
+                tecnico,
+                f"{tecnico}: appuntamento calendario {appuntamento.cliente} senza attività reportata",
+                'missing_activity_for_appointment',
+                {
+                    'cliente': appuntamento.cliente,
+                    'calendario_orario': appuntamento.data_inizio.isoformat(),
+                    'luogo': appuntamento.luogo
+                },
+                partition=(appuntamento.tecnico_id, appuntamento.data_inizio.date())
+            )
+
+# REGOLA 6: Validazione Utilizzo Veicoli
+class VehicleUsageVisitor(JoinRuleVisitor):
+    """
+    Regola 6: Validazioni utilizzo veicoli aziendali
+    - Auto utilizzata deve avere cliente associato
+    - Attività remote NON devono avere utilizzo auto
+    - Coerenza orari presa/riconsegna vs attività
+    """
+
+    rule_id = 'BR006'
+    rule_name = "Validazione Utilizzo Veicoli"
+    sources = ('utilizzo_veicoli', 'attivita')
+    thresholds = ('ALERT_TEMPLATES',)
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.stats = {
+            'vehicle_usages': len(timeline.records('utilizzo_veicoli')),
             'vehicles_without_client': 0,
             'remote_with_vehicle': 0,
             'time_mismatches': 0
         }
-        
-        # Validazione veicoli senza cliente
-        for veicolo in utilizzo_veicoli:
-            if not veicolo.dipendente:
-                continue
-                
-            tecnico = veicolo.dipendente
-            
-            # Veicolo senza cliente associato
-            if not veicolo.cliente:
-                stats['vehicles_without_client'] += 1
-                
-                alert = self.create_alert(
-                    AlertSeverity.ALTO,
-                    tecnico,
-                    CONFIG.ALERT_TEMPLATES['vehicle_no_client'].format(tecnico=tecnico),
-                    'vehicle_no_client',
-                    {
-                        'auto': veicolo.auto,
-                        'ora_presa': veicolo.ora_presa.isoformat() if veicolo.ora_presa else None,
-                        'ora_riconsegna': veicolo.ora_riconsegna.isoformat() if veicolo.ora_riconsegna else None
-                    }
-                )
-                alerts.append(alert)
-                continue
-            
-            # Verifica attività remote con utilizzo veicolo
-            if veicolo.ora_presa:
-                data_utilizzo = veicolo.ora_presa.date()
-                
-                # Trova attività remote dello stesso tecnico nella stessa data
-                attivita_remote = [
-                    a for a in attivita
-                    if (a.tecnico == tecnico and 
-                        a.tipologia == TipologiaAttivita.REMOTO and
-                        a.iniziata_il and a.iniziata_il.date() == data_utilizzo)
-                ]
-                
-                for att_remota in attivita_remote:
-                    # Verifica sovrapposizione temporale
-                    if (veicolo.ora_presa and veicolo.ora_riconsegna and
-                        att_remota.iniziata_il and att_remota.conclusa_il):
-                        
-                        # Controllo sovrapposizione
-                        if (veicolo.ora_presa < att_remota.conclusa_il and
-                            att_remota.iniziata_il < veicolo.ora_riconsegna):
-                            
-                            stats['remote_with_vehicle'] += 1
-                            
-                            alert = self.create_alert(
-                                AlertSeverity.CRITICO,
-                                tecnico,
-                                CONFIG.ALERT_TEMPLATES['remote_with_vehicle'].format(tecnico=tecnico),
-                                'remote_activity_with_vehicle',
-                                {
-                                    'attivita_id': att_remota.id_ticket,
-                                    'cliente_attivita': att_remota.azienda,
-                                    'auto': veicolo.auto,
-                                    'cliente_auto': veicolo.cliente,
-                                    'orario_attivita': f"{att_remota.iniziata_il} - {att_remota.conclusa_il}",
-                                    'orario_auto': f"{veicolo.ora_presa} - {veicolo.ora_riconsegna}"
-                                }
-                            )
-                            alerts.append(alert)
-            
-            # Validazione coerenza orari auto vs attività cliente
-            attivita_cliente = [
-                a for a in attivita
-                if (a.tecnico == tecnico and a.azienda == veicolo.cliente and
-                    a.iniziata_il and veicolo.ora_presa and
-                    a.iniziata_il.date() == veicolo.ora_presa.date())
-            ]
-            
-            for att in attivita_cliente:
-                if (veicolo.ora_presa and veicolo.ora_riconsegna and 
-                    att.iniziata_il and att.conclusa_il):
-                    
-                    # L'auto dovrebbe essere presa prima dell'inizio attività
-                    # e riconsegnata dopo la fine attività
-                    if (veicolo.ora_presa > att.iniziata_il or 
-                        veicolo.ora_riconsegna < att.conclusa_il):
-                        
-                        stats['time_mismatches'] += 1
-                        
-                        alert = self.create_alert(
-                            AlertSeverity.MEDIO,
-                            tecnico,
-                            CONFIG.ALERT_TEMPLATES['vehicle_time_mismatch'].format(
-                                tecnico=tecnico, 
-                                cliente=veicolo.cliente
-                            ),
-                            'vehicle_time_mismatch',
-                            {
-                                'attivita_id': att.id_ticket,
-                                'cliente': veicolo.cliente,
-                                'auto': veicolo.auto,
-                                'orario_attivita': f"{att.iniziata_il} - {att.conclusa_il}",
-                                'orario_auto': f"{veicolo.ora_presa} - {veicolo.ora_riconsegna}"
-                            }
-                        )
-                        alerts.append(alert)
-        
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        
-        return ValidationResult(
-            rule_id="BR006",
-            rule_name="Validazione Utilizzo Veicoli",
-            alerts=alerts,
-            stats=stats,
-            execution_time_ms=execution_time
+
+    def visit_day(self, day: TechnicianDay):
+        super().visit_day(day)
+        for event in day.of('utilizzo_veicoli'):
+            self._check_client(event)
+
+    def visit_undated(self, event: TimelineEvent):
+        # Validazione veicoli senza cliente anche senza orario di presa
+        if event.source == 'utilizzo_veicoli':
+            self._check_client(event)
+
+    def _check_client(self, event: TimelineEvent):
+        # Alert in ordine di utilizzo: senza cliente (fase 0), attività remota (1), orari incoerenti (2)
+        veicolo = event.record
+        if veicolo.cliente:
+            return
+
+        self.count('vehicles_without_client', (veicolo.tecnico_id, event.giorno))
+        tecnico = TECHNICIANS.name(veicolo.tecnico_id)
+        self.alert(
+            (event.posizione, 0, 0),
+            AlertSeverity.ALTO,
+            tecnico,
+            CONFIG.ALERT_TEMPLATES['vehicle_no_client'].format(tecnico=tecnico),
+            'vehicle_no_client',
+            {
+                'auto': veicolo.auto,
+                'ora_presa': veicolo.ora_presa.isoformat() if veicolo.ora_presa else None,
+                'ora_riconsegna': veicolo.ora_riconsegna.isoformat() if veicolo.ora_riconsegna else None
+            },
+            partition=(veicolo.tecnico_id, event.giorno)
         )
-    
-    # REGOLA 7: Validazione Permessi vs Attività
-    def validate_permits_vs_activities(self,
-                                      attivita: List[AttivitaTecnico],
-                                      permessi: List[PermessoTecnico]) -> ValidationResult:
-        """
-        Regola 7: Validazioni permessi vs attività
-        - Nessuna attività durante permessi approvati
-        - Controllo ore lavorate vs ore pianificate
-        """
-        start_time = datetime.now()
-        alerts = []
-        stats = {
+
+    def finish(self):
+        # Utilizzi con cliente e intervallo completo vs attività dello stesso tecnico nel giorno di presa
+        veicoli_df = events_frame(self.events['utilizzo_veicoli'], 'ora_presa', 'ora_riconsegna', 'cliente')
+        veicoli_df = veicoli_df[veicoli_df['cliente'].map(bool) & veicoli_df['ora_riconsegna'].notna()]
+        attivita_df = events_frame(self.events['attivita'], 'iniziata_il', 'conclusa_il', 'azienda', 'tipologia')
+        attivita_df = attivita_df[attivita_df['conclusa_il'].notna()]
+
+        # Verifica attività remote sovrapposte all'utilizzo veicolo
+        remote_df = attivita_df[attivita_df['tipologia'] == TipologiaAttivita.REMOTO]
+        coppie = interval_join(
+            remote_df, veicoli_df, ['tecnico_id', 'giorno'],
+            ('iniziata_il', 'conclusa_il'), ('ora_presa', 'ora_riconsegna'), how='overlap'
+        )
+        for (att_remota, _), (veicolo, posizione), left in zip(
+                _pair_records(remote_df, coppie['left']),
+                _pair_records(veicoli_df, coppie['right']),
+                coppie['left']):
+            self.count('remote_with_vehicle', (veicolo.tecnico_id, veicolo.ora_presa.date()))
+            tecnico = TECHNICIANS.name(veicolo.tecnico_id)
+            self.alert(
+                (posizione, 1, left),
+                AlertSeverity.CRITICO,
+                tecnico,
+                CONFIG.ALERT_TEMPLATES['remote_with_vehicle'].format(tecnico=tecnico),
+                'remote_activity_with_vehicle',
+                {
+                    'attivita_id': att_remota.id_ticket,
+                    'cliente_attivita': att_remota.azienda,
+                    'auto': veicolo.auto,
+                    'cliente_auto': veicolo.cliente,
+                    'orario_attivita': f"{att_remota.iniziata_il} - {att_remota.conclusa_il}",
+                    'orario_auto': f"{veicolo.ora_presa} - {veicolo.ora_riconsegna}"
+                },
+                partition=(veicolo.tecnico_id, veicolo.ora_presa.date())
+            )
+
+        # Attività del cliente dell'auto: presa prima dell'inizio e riconsegna dopo la fine
+        coppie = interval_join(
+            attivita_df, veicoli_df, ['tecnico_id', 'giorno'],
+            ('iniziata_il', 'conclusa_il'), ('ora_presa', 'ora_riconsegna'), how='any'
+        )
+        coppie = coppie[~coppie['contained']]
+        for (att, _), (veicolo, posizione), left in zip(
+                _pair_records(attivita_df, coppie['left']),
+                _pair_records(veicoli_df, coppie['right']),
+                coppie['left']):
+            if not CLIENTS.same_client(att.azienda, veicolo.cliente):
+                continue
+
+            self.count('time_mismatches', (veicolo.tecnico_id, veicolo.ora_presa.date()))
+            tecnico = TECHNICIANS.name(veicolo.tecnico_id)
+            self.alert(
+                (posizione, 2, left),
+                AlertSeverity.MEDIO,
+                tecnico,
+                CONFIG.ALERT_TEMPLATES['vehicle_time_mismatch'].format(
+                    tecnico=tecnico,
+                    cliente=veicolo.cliente
+                ),
+                'vehicle_time_mismatch',
+                {
+                    'attivita_id': att.id_ticket,
+                    'cliente': veicolo.cliente,
+                    'auto': veicolo.auto,
+                    'orario_attivita': f"{att.iniziata_il} - {att.conclusa_il}",
+                    'orario_auto': f"{veicolo.ora_presa} - {veicolo.ora_riconsegna}"
+                },
+                partition=(veicolo.tecnico_id, veicolo.ora_presa.date())
+            )
+
+# REGOLA 7: Validazione Permessi vs Attività
+class PermitsVisitor(JoinRuleVisitor):
+    """
+    Regola 7: Validazioni permessi vs attività
+    - Nessuna attività durante permessi approvati
+    - Controllo ore lavorate vs ore pianificate
+    """
+
+    rule_id = 'BR007'
+    rule_name = "Validazione Permessi vs Attività"
+    sources = ('permessi', 'attivita')
+    thresholds = ('ALERT_TEMPLATES',)
+
+    def begin(self, timeline: EventTimeline):
+        super().begin(timeline)
+        self.stats = {
             'approved_permits': 0,
             'activities_during_permit': 0,
             'hour_discrepancies': 0
         }
-        
-        # Filtra permessi approvati
-        permessi_approvati = [
-            p for p in permessi 
+
+        self.stats['approved_permits'] = sum(
+            1 for p in timeline.records('permessi')
             if p.stato == StatoPermesso.APPROVATO and p.data_inizio and p.data_fine
-        ]
-        
-        stats['approved_permits'] = len(permessi_approvati)
-        
-        for permesso in permessi_approvati:
-            if not permesso.dipendente:
-                continue
-                
-            tecnico = permesso.dipendente
-            
-            # Cerca attività durante il periodo di permesso
-            for attivita_item in attivita:
-                if (attivita_item.tecnico == tecnico and 
-                    attivita_item.iniziata_il):
-                    
-                    data_attivita = attivita_item.iniziata_il.date()
-                    
-                    # Verifica se attività cade nel periodo di permesso
-                    if permesso.data_inizio.date() <= data_attivita <= permesso.data_fine.date():
-                        stats['activities_during_permit'] += 1
-                        
-                        alert = self.create_alert(
-                            AlertSeverity.CRITICO,
-                            tecnico,
-                            CONFIG.ALERT_TEMPLATES['activity_during_permit'].format(tecnico=tecnico),
-                            'activity_during_permit',
-                            {
-                                'attivita_id': attivita_item.id_ticket,
-                                'cliente': attivita_item.azienda,
-                                'data_attivita': data_attivita.isoformat(),
-                                'tipo_permesso': permesso.tipo_permesso,
-                                'periodo_permesso': f"{permesso.data_inizio.date()} - {permesso.data_fine.date()}"
-                            }
-                        )
-                        alerts.append(alert)
-        
-        execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
-        
-        return ValidationResult(
-            rule_id="BR007",
-            rule_name="Validazione Permessi vs Attività", 
-            alerts=alerts,
-            stats=stats,
-            execution_time_ms=execution_time
         )
-    
+
+    def finish(self):
+        # I permessi su più giorni compaiono in ogni giorno coperto: uno solo per permesso
+        visti = set()
+        permessi = [event for event in self.events['permessi']
+                    if event.posizione not in visti and not visti.add(event.posizione)]
+
+        # "Cestone, Davide" nei permessi e "Davide Cestone" nelle attività hanno lo stesso ID
+        permessi_df = events_frame(permessi, 'stato', 'data_inizio', 'data_fine')
+        permessi_df = permessi_df[(permessi_df['stato'] == StatoPermesso.APPROVATO) & permessi_df['data_fine'].notna()]
+        permessi_df = permessi_df.assign(
+            periodo_inizio=pd.to_datetime(permessi_df['data_inizio']).dt.normalize(),
+            periodo_fine=pd.to_datetime(permessi_df['data_fine']).dt.normalize()
+        )
+        attivita_df = events_frame(self.events['attivita'])
+
+        # Attività con giorno compreso nel periodo di permesso (estremi inclusi)
+        coppie = interval_join(
+            attivita_df, permessi_df, 'tecnico_id',
+            ('giorno', 'giorno'), ('periodo_inizio', 'periodo_fine'), how='within'
+        )
+
+        # Alert in ordine di permesso, poi per giorno e orario dell'attività
+        for (attivita_item, _), (permesso, posizione), left in zip(
+                _pair_records(attivita_df, coppie['left']),
+                _pair_records(permessi_df, coppie['right']),
+                coppie['left']):
+            data_attivita = attivita_item.iniziata_il.date()
+            self.count('activities_during_permit', (attivita_item.tecnico_id, data_attivita))
+            tecnico = TECHNICIANS.name(permesso.tecnico_id)
+            self.alert(
+                (posizione, data_attivita, left),
+                AlertSeverity.CRITICO,
+                tecnico,
+                CONFIG.ALERT_TEMPLATES['activity_during_permit'].format(tecnico=tecnico),
+                'activity_during_permit',
+                {
+                    'attivita_id': attivita_item.id_ticket,
+                    'cliente': attivita_item.azienda,
+                    'data_attivita': data_attivita.isoformat(),
+                    'tipo_permesso': permesso.tipo_permesso,
+                    'periodo_permesso': f"{permesso.data_inizio.date()} - {permesso.data_fine.date()}"
+                },
+                partition=(attivita_item.tecnico_id, data_attivita)
+            )
+
+class AdvancedBusinessRulesEngine(BusinessRulesEngine):
+    """Engine per regole business avanzate"""
+
+    RULE_SOURCES = RULE_SOURCES
+
+    def advanced_visitors(self) -> List[RuleVisitor]:
+        """Visitatori delle regole avanzate (BR005-BR007), alert con ID di questo engine"""
+        return [ScheduleCoherenceVisitor(self), VehicleUsageVisitor(self), PermitsVisitor(self)]
+
+    # REGOLA 5: Coerenza Calendario vs Timbrature vs Attività
+    def validate_schedule_coherence(self,
+                                   attivita: List[AttivitaTecnico],
+                                   timbrature: List[TimbraturaTecnico],
+                                   calendario: List[AppuntamentoCalendario],
+                                   timeline: Optional[EventTimeline] = None) -> ValidationResult:
+        """Regola 5 su una timeline dedicata (o quella condivisa): vedi ScheduleCoherenceVisitor"""
+        timeline = self.event_timeline(timeline, attivita=attivita, timbrature=timbrature, calendario=calendario)
+        return self.run_visitors(timeline, [ScheduleCoherenceVisitor(self)])[0]
+
+    # REGOLA 6: Validazione Utilizzo Veicoli
+    def validate_vehicle_usage(self,
+                              attivita: List[AttivitaTecnico],
+                              utilizzo_veicoli: List[UtilizzoVeicolo],
+                              timeline: Optional[EventTimeline] = None) -> ValidationResult:
+        """Regola 6 su una timeline dedicata (o quella condivisa): vedi VehicleUsageVisitor"""
+        timeline = self.event_timeline(timeline, attivita=attivita, utilizzo_veicoli=utilizzo_veicoli)
+        return self.run_visitors(timeline, [VehicleUsageVisitor(self)])[0]
+
+    # REGOLA 7: Validazione Permessi vs Attività
+    def validate_permits_vs_activities(self,
+                                      attivita: List[AttivitaTecnico],
+                                      permessi: List[PermessoTecnico],
+                                      timeline: Optional[EventTimeline] = None) -> ValidationResult:
+        """Regola 7 su una timeline dedicata (o quella condivisa): vedi PermitsVisitor"""
+        timeline = self.event_timeline(timeline, attivita=attivita, permessi=permessi)
+        return self.run_visitors(timeline, [PermitsVisitor(self)])[0]
+
     def execute_advanced_validations(self,
                                     attivita: List[AttivitaTecnico],
                                     timbrature: List[TimbraturaTecnico],
                                     calendario: List[AppuntamentoCalendario],
                                     utilizzo_veicoli: List[UtilizzoVeicolo],
-                                    permessi: List[PermessoTecnico]) -> List[ValidationResult]:
+                                    permessi: List[PermessoTecnico],
+                                    timeline: Optional[EventTimeline] = None) -> List[ValidationResult]:
         """Esegue le validazioni avanzate del sistema"""
-        
+
         LOGGER.info("Avvio validazioni avanzate Business Rules Engine...")
-        
-        results = []
-        
-        # Regola 5: Coerenza calendario
-        result5 = self.validate_schedule_coherence(attivita, timbrature, calendario)
-        results.append(result5)
-        LOGGER.info(f"✓ {result5.rule_name}: {len(result5.alerts)} alert generati ({result5.execution_time_ms}ms)")
-        
-        # Regola 6: Utilizzo veicoli
-        result6 = self.validate_vehicle_usage(attivita, utilizzo_veicoli)
-        results.append(result6)
-        LOGGER.info(f"✓ {result6.rule_name}: {len(result6.alerts)} alert generati ({result6.execution_time_ms}ms)")
-        
-        # Regola 7: Permessi vs attività
-        result7 = self.validate_permits_vs_activities(attivita, permessi)
-        results.append(result7)
-        LOGGER.info(f"✓ {result7.rule_name}: {len(result7.alerts)} alert generati ({result7.execution_time_ms}ms)")
-        
+
+        # Una sola timeline per tecnico e una sola scansione per tutte le regole
+        timeline = self.event_timeline(timeline, attivita=attivita, timbrature=timbrature, calendario=calendario,
+                                       utilizzo_veicoli=utilizzo_veicoli, permessi=permessi)
+        results = self.run_visitors(timeline, self.advanced_visitors())
+        self.log_results(results)
+
         total_alerts = sum(len(r.alerts) for r in results)
         total_time = sum(r.execution_time_ms for r in results)
-        
+
         LOGGER.info(f"Validazioni avanzate completate: {total_alerts} alert totali in {total_time}ms")
-        
+
         return results
 
-if __name__ == "__main__":
-    # Test delle regole avanzate
-    engine = AdvancedBusinessRulesEngine()
-    print("Advanced Business Rules Engine implementato con successo!")
-    print("Regole avanzate implementate:")
-    print("- BR005: Coerenza Calendario vs Timbrature vs Attività")
-    print("- BR006: Validazione Utilizzo Veicoli") 
-    print("- BR007: Validazione Permessi vs Attività")
\ No newline at end of file
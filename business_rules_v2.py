@@ -16,10 +16,22 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 import json
 import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from client_identity import CLIENTS
+from config import CONFIG
+from interval_overlap import overlapping_pairs
+from parsers import parse_italian_datetime_series
+from session_index import SessionIndex
+from technician_identity import TECHNICIANS
+from rule_sources import RuleSources, sources_for_rules
+from vocabulary import VOCABULARY
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -52,11 +64,69 @@ class Alert:
     suggested_actions: List[str]
     data_sources: List[str]  # Fonti che confermano l'anomalia
     timestamp: datetime
+    # Codici interi dal vocabolario condiviso
+    tecnico_code: Optional[int] = field(default=None, repr=False)
+    category_code: Optional[int] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        self.tecnico_code = VOCABULARY.code('tecnico', self.tecnico)
+        self.category_code = VOCABULARY.code('categoria', self.category)
+
+_ATTIVITA_TIMELINE = ('Creato da', 'Id Ticket', 'Iniziata il', 'Conclusa il', 'Azienda')
+
+# Fonti e colonne lette da ciascuna regola v2.0
+RULE_SOURCES: Dict[str, RuleSources] = {
+    'temporal_overlap': {'attivita': _ATTIVITA_TIMELINE},
+    'travel_time': {'attivita': _ATTIVITA_TIMELINE},
+    'activity_type': {
+        'attivita': _ATTIVITA_TIMELINE + ('Tipologia Attivit',),
+        'teamviewer_bait': ('Assegnatario', 'Inizio', 'Fine'),
+        'teamviewer_gruppo': ('Utente', 'Inizio', 'Fine')
+    },
+    # Regole ancora stub: nessuna fonte letta finché non implementate
+    'time_consistency': {},
+    'vehicle_usage': {}
+}
+
+# Ordine di esecuzione delle regole: numerazione alert identica tra esecuzione seriale e a shard
+RULE_ORDER = ('temporal_overlap', 'travel_time', 'activity_type', 'time_consistency', 'vehicle_usage')
+
+# Colonne tecnico (in ordine di preferenza) delle fonti partizionate per tecnico;
+# le altre fonti sono condivise per intero da tutti gli shard
+SHARD_TECHNICIAN_COLUMNS = {
+    'attivita': ('Creato da', 'Assegnatario'),
+    'teamviewer_bait': ('Assegnatario',),
+    'teamviewer_gruppo': ('Utente',)
+}
+
+# Input condivisi in sola lettura dai processi worker (ereditati con fork)
+_SHARD_INPUTS: Dict[str, Any] = {}
+
+def _init_shard_worker(data_frames: Dict[str, pd.DataFrame], shard_of: Dict[str, np.ndarray]):
+    _SHARD_INPUTS['data_frames'] = data_frames
+    _SHARD_INPUTS['shard_of'] = shard_of
+    # Log di avanzamento delle regole solo dal processo principale
+    logger.setLevel(logging.WARNING)
+
+def _validate_shard(shard: int, selected: List[str]) -> List[Tuple[tuple, 'Alert']]:
+    """Regole sui soli tecnici dello shard: coppie (chiave di ordinamento, alert)"""
+    shard_of = _SHARD_INPUTS['shard_of']
+    data_frames = {
+        name: df[shard_of[name] == shard] if name in shard_of else df
+        for name, df in _SHARD_INPUTS['data_frames'].items()
+    }
+    engine = AdvancedBusinessRulesEngine()
+    engine._run_rules(data_frames, set(selected))
+    return list(zip(engine._alert_order, engine.alerts))
 
 class AdvancedBusinessRulesEngine:
+    RULE_SOURCES = RULE_SOURCES
+    
     def __init__(self):
         self.alerts = []
         self.alert_counter = 0
+        # Chiave di ordinamento di ogni alert (regola, tecnico, progressivo) per il merge degli shard
+        self._alert_order: List[tuple] = []
         
         # Configurazioni intelligenti
         self.bait_service_whitelist = [
@@ -65,12 +135,8 @@ class AdvancedBusinessRulesEngine:
             "BAIT"
         ]
         
-        # Database clienti stesso gruppo (da espandere)
-        self.same_group_clients = {
-            'ELECTRALINE': ['ELECTRALINE 3PMARK SPA'],
-            'SPOLIDORO': ['SPOLIDORO STUDIO AVVOCATO'],
-            'ISOTERMA_GROUP': ['ISOTERMA SRL', 'GARIBALDINA SRL']
-        }
+        # Database clienti stesso gruppo (da espandere in CONFIG.CLIENT_GROUPS)
+        self.same_group_clients = CONFIG.CLIENT_GROUPS
         
         # Matrice distanze Milano (km approssimativi)
         self.distance_matrix = {
@@ -89,39 +155,132 @@ class AdvancedBusinessRulesEngine:
             25: 30     # Periferia
         }
     
-    def validate_all_rules(self, data_frames: Dict[str, pd.DataFrame]) -> List[Alert]:
-        """Esegue tutte le validazioni business con confidence scoring avanzato"""
+    @classmethod
+    def required_sources(cls, rule_ids: Optional[List[str]] = None) -> RuleSources:
+        """Fonti e colonne da caricare per eseguire le regole indicate (tutte se None)"""
+        return sources_for_rules(cls.RULE_SOURCES, rule_ids)
+    
+    def validate_all_rules(self, data_frames: Dict[str, pd.DataFrame],
+                           rule_ids: Optional[List[str]] = None,
+                           workers: Optional[int] = None) -> List[Alert]:
+        """
+        Esegue le validazioni business (tutte o quelle in rule_ids) con confidence scoring avanzato.
+        workers: processi per l'esecuzione a shard per tecnico (default CONFIG.RULES_V2_WORKERS,
+        0 = tutti i core, 1 = seriale); alert e ID identici all'esecuzione seriale.
+        """
         logger.info("🚀 Avvio Business Rules Engine v2.0...")
         
         self.alerts = []
         self.alert_counter = 0
+        self._alert_order = []
+        selected = set(rule_ids) if rule_ids is not None else set(self.RULE_SOURCES)
+        
+        workers = CONFIG.RULES_V2_WORKERS if workers is None else workers
+        workers = workers or os.cpu_count() or 1
+        if workers > 1:
+            self._run_sharded(data_frames, selected, workers)
+        else:
+            self._run_rules(data_frames, selected)
         
+        logger.info(f"✅ Business Rules Engine v2.0 completato: {len(self.alerts)} alert generati")
+        return self.alerts
+    
+    def _run_rules(self, data_frames: Dict[str, pd.DataFrame], selected: set):
+        """Regole selezionate in sequenza, nell'ordine di RULE_ORDER"""
         # Regola 1: Sovrapposizioni temporali (CRITICO)
-        self._validate_temporal_overlaps_v2(data_frames.get('attivita'))
+        if 'temporal_overlap' in selected:
+            self._validate_temporal_overlaps_v2(data_frames.get('attivita'))
         
         # Regola 2: Travel time intelligente (MEDIO filtrato)
-        self._validate_travel_time_v2(data_frames.get('attivita'))
+        if 'travel_time' in selected:
+            self._validate_travel_time_v2(data_frames.get('attivita'))
         
         # Regola 3: Validazione tipo attività vs TeamViewer (ALTO)
-        self._validate_activity_type_v2(
-            data_frames.get('attivita'),
-            data_frames.get('teamviewer_bait')
-        )
+        if 'activity_type' in selected:
+            self._validate_activity_type_v2(
+                data_frames.get('attivita'),
+                data_frames.get('teamviewer_bait'),
+                data_frames.get('teamviewer_gruppo')
+            )
         
         # Regola 4: Coerenza timbrature vs attività (ALTO)
-        self._validate_time_consistency_v2(
-            data_frames.get('attivita'),
-            data_frames.get('timbrature')
-        )
+        if 'time_consistency' in selected:
+            self._validate_time_consistency_v2(
+                data_frames.get('attivita'),
+                data_frames.get('timbrature')
+            )
         
         # Regola 5: Validazione veicoli intelligente (MEDIO)
-        self._validate_vehicle_usage_v2(
-            data_frames.get('attivita'),
-            data_frames.get('auto')
-        )
-        
-        logger.info(f"✅ Business Rules Engine v2.0 completato: {len(self.alerts)} alert generati")
-        return self.alerts
+        if 'vehicle_usage' in selected:
+            self._validate_vehicle_usage_v2(
+                data_frames.get('attivita'),
+                data_frames.get('auto')
+            )
+    
+    def _run_sharded(self, data_frames: Dict[str, pd.DataFrame], selected: set, workers: int):
+        """
+        Regole per gruppi di tecnici (shard) in processi separati: le regole sono
+        indipendenti tra tecnici. Gli alert sono riordinati come nell'esecuzione seriale
+        e numerati dopo il merge, al posto del contatore globale.
+        """
+        # Posizioni di riga come etichette: ordine delle attività confrontabile tra shard
+        data_frames = {
+            name: df.reset_index(drop=True) if name in SHARD_TECHNICIAN_COLUMNS else df
+            for name, df in data_frames.items() if df is not None
+        }
+        shard_of = self._assign_shards(data_frames, workers * 4)
+        shards = sorted({int(shard) for codes in shard_of.values() for shard in np.unique(codes)})
+        
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards) or 1), mp_context=context,
+                                 initializer=_init_shard_worker, initargs=(data_frames, shard_of)) as pool:
+            futures = [pool.submit(_validate_shard, shard, sorted(selected)) for shard in shards]
+            ordered = [item for future in futures for item in future.result()]
+        
+        # Gruppi tecnico nell'ordine del groupby seriale
+        attivita_df = data_frames.get('attivita')
+        ranks = {}
+        if attivita_df is not None and not attivita_df.empty:
+            tecnico_col = 'Creato da' if 'Creato da' in attivita_df.columns else 'Assegnatario'
+            ranks = {name: rank for rank, name in enumerate(attivita_df.groupby(tecnico_col, observed=True).size().index)}
+        ordered.sort(key=lambda item: (item[0][0], ranks.get(item[0][1], -1), item[0][2]))
+        
+        for order, alert in ordered:
+            alert.id = self._next_alert_id()
+            # Codici del vocabolario del processo principale (i worker ne hanno una copia)
+            alert.tecnico_code = VOCABULARY.code('tecnico', alert.tecnico)
+            alert.category_code = VOCABULARY.code('categoria', alert.category)
+            self._add_alert(alert, order)
+        logger.info(f"Regole v2.0 eseguite su {len(shards)} shard per tecnico ({workers} processi)")
+    
+    @staticmethod
+    def _assign_shards(data_frames: Dict[str, pd.DataFrame], shards: int) -> Dict[str, np.ndarray]:
+        """
+        Shard di ogni riga delle fonti partizionabili: tecnici (ID risolto, tutte le fonti)
+        assegnati al gruppo meno carico in ordine di righe decrescenti. Righe senza tecnico
+        nello shard 0.
+        """
+        technicians = {}
+        for name, columns in SHARD_TECHNICIAN_COLUMNS.items():
+            df = data_frames.get(name)
+            column = next((column for column in columns if df is not None and column in df.columns), None)
+            if column is None:
+                continue
+            names = df[column].astype(object)
+            technicians[name] = names.map({raw: TECHNICIANS.resolve(raw) for raw in names.dropna().unique()})
+        
+        loads = pd.concat(technicians.values()).value_counts() if technicians else pd.Series(dtype=int)
+        shard_load = [0] * shards
+        shard_of_technician = {}
+        for tecnico_id, rows in sorted(loads.items(), key=lambda item: (-item[1], item[0])):
+            shard = min(range(shards), key=lambda candidate: (shard_load[candidate], candidate))
+            shard_of_technician[tecnico_id] = shard
+            shard_load[shard] += rows
+        
+        return {
+            name: ids.map(shard_of_technician).fillna(0).astype(int).values
+            for name, ids in technicians.items()
+        }
     
     def _validate_temporal_overlaps_v2(self, attivita_df: pd.DataFrame):
         """Validazione sovrapposizioni temporali con confidence scoring avanzato"""
@@ -132,59 +291,37 @@ class AdvancedBusinessRulesEngine:
         
         # Raggruppa per tecnico (colonna corretta)
         tecnico_col = 'Creato da' if 'Creato da' in attivita_df.columns else 'Assegnatario'
-        for tecnico, gruppo in attivita_df.groupby(tecnico_col):
+        for tecnico, gruppo in attivita_df.groupby(tecnico_col, observed=True):
             if pd.isna(tecnico) or tecnico in ['nan', '00:45']:
                 continue
             
-            # Ordina per orario inizio (colonna corretta)
+            # Orari convertiti una volta per gruppo (righe non interpretabili escluse)
             inizio_col = 'Iniziata il' if 'Iniziata il' in attivita_df.columns else 'Inizio'
-            gruppo_sorted = gruppo.sort_values(inizio_col)
+            fine_col = 'Conclusa il' if 'Conclusa il' in attivita_df.columns else 'Fine'
+            starts = parse_italian_datetime_series(gruppo[inizio_col], report=False)
+            ends = parse_italian_datetime_series(gruppo[fine_col], report=False)
             
-            for i, (idx1, att1) in enumerate(gruppo_sorted.iterrows()):
-                for idx2, att2 in gruppo_sorted.iloc[i+1:].iterrows():
-                    overlap_info = self._calculate_overlap(att1, att2)
-                    
-                    if overlap_info['has_overlap']:
-                        confidence_score = self._calculate_overlap_confidence(
-                            overlap_info, att1, att2
-                        )
-                        
-                        # Solo alert con confidence alta per evitare falsi positivi
-                        if confidence_score >= 70:
-                            self._create_temporal_overlap_alert(
-                                tecnico, att1, att2, overlap_info, confidence_score
-                            )
-    
-    def _calculate_overlap(self, att1: pd.Series, att2: pd.Series) -> Dict:
-        """Calcola informazioni dettagliate su sovrapposizione"""
-        try:
-            # Usa i nomi colonne corretti
-            inizio_col = 'Iniziata il' if 'Iniziata il' in att1.index else 'Inizio'
-            fine_col = 'Conclusa il' if 'Conclusa il' in att1.index else 'Fine'
-            
-            start1 = pd.to_datetime(att1[inizio_col])
-            end1 = pd.to_datetime(att1[fine_col])
-            start2 = pd.to_datetime(att2[inizio_col])
-            end2 = pd.to_datetime(att2[fine_col])
-            
-            # Verifica sovrapposizione
-            has_overlap = not (end1 <= start2 or end2 <= start1)
-            
-            if has_overlap:
-                overlap_start = max(start1, start2)
-                overlap_end = min(end1, end2)
-                overlap_minutes = (overlap_end - overlap_start).total_seconds() / 60
-            else:
-                overlap_minutes = 0
-            
-            return {
-                'has_overlap': has_overlap,
-                'overlap_minutes': overlap_minutes,
-                'start1': start1, 'end1': end1,
-                'start2': start2, 'end2': end2
-            }
-        except:
-            return {'has_overlap': False, 'overlap_minutes': 0}
+            # Coppie sovrapposte in ordine cronologico di inizio
+            first, second, overlap_minutes = overlapping_pairs(starts, ends)
+            for seq, (i, j, minutes) in enumerate(zip(first, second, overlap_minutes)):
+                att1, att2 = gruppo.iloc[i], gruppo.iloc[j]
+                overlap_info = {
+                    'has_overlap': True,
+                    'overlap_minutes': float(minutes),
+                    'start1': starts.iloc[i], 'end1': ends.iloc[i],
+                    'start2': starts.iloc[j], 'end2': ends.iloc[j]
+                }
+                
+                confidence_score = self._calculate_overlap_confidence(
+                    overlap_info, att1, att2
+                )
+                
+                # Solo alert con confidence alta per evitare falsi positivi
+                if confidence_score >= 70:
+                    self._create_temporal_overlap_alert(
+                        tecnico, att1, att2, overlap_info, confidence_score,
+                        (RULE_ORDER.index('temporal_overlap'), tecnico, seq)
+                    )
     
     def _calculate_overlap_confidence(self, overlap_info: Dict, att1: pd.Series, att2: pd.Series) -> float:
         """Calcola confidence score per sovrapposizione temporale"""
@@ -203,7 +340,7 @@ class AdvancedBusinessRulesEngine:
         
         # Fattore 2: Clienti diversi (critico per fatturazione)
         azienda_col = 'Azienda' if 'Azienda' in att1.index else 'Cliente'
-        if att1[azienda_col] != att2[azienda_col]:
+        if not CLIENTS.same_client(att1[azienda_col], att2[azienda_col]):
             base_confidence += 20
         
         # Fattore 3: Stesso giorno (più problematico)
@@ -224,18 +361,25 @@ class AdvancedBusinessRulesEngine:
         logger.info("🚗 Validando tempi viaggio v2.0 (intelligente)...")
         
         tecnico_col = 'Creato da' if 'Creato da' in attivita_df.columns else 'Assegnatario'
-        for tecnico, gruppo in attivita_df.groupby(tecnico_col):
+        for tecnico, gruppo in attivita_df.groupby(tecnico_col, observed=True):
             if pd.isna(tecnico) or tecnico in ['nan', '00:45']:
                 continue
             
+            # Orari convertiti una volta per gruppo, attività in ordine cronologico di inizio
             inizio_col = 'Iniziata il' if 'Iniziata il' in attivita_df.columns else 'Inizio'
-            gruppo_sorted = gruppo.sort_values(inizio_col)
+            fine_col = 'Conclusa il' if 'Conclusa il' in attivita_df.columns else 'Fine'
+            starts = parse_italian_datetime_series(gruppo[inizio_col], report=False)
+            ends = parse_italian_datetime_series(gruppo[fine_col], report=False)
+            order = np.argsort(starts.values, kind='stable')
             
-            for i in range(len(gruppo_sorted) - 1):
-                att_prev = gruppo_sorted.iloc[i]
-                att_next = gruppo_sorted.iloc[i + 1]
+            for i in range(len(order) - 1):
+                prev, following = order[i], order[i + 1]
+                att_prev = gruppo.iloc[prev]
+                att_next = gruppo.iloc[following]
                 
-                travel_analysis = self._analyze_travel_requirement(att_prev, att_next)
+                travel_analysis = self._analyze_travel_requirement(
+                    att_prev, att_next, ends.iloc[prev], starts.iloc[following]
+                )
                 
                 if travel_analysis['requires_travel'] and travel_analysis['insufficient_time']:
                     confidence_score = travel_analysis['confidence_score']
@@ -243,19 +387,17 @@ class AdvancedBusinessRulesEngine:
                     # Solo alert con confidence media-alta (filtra falsi positivi)
                     if confidence_score >= 60:
                         self._create_travel_time_alert(
-                            tecnico, att_prev, att_next, travel_analysis
+                            tecnico, att_prev, att_next, travel_analysis,
+                            (RULE_ORDER.index('travel_time'), tecnico, i)
                         )
     
-    def _analyze_travel_requirement(self, att_prev: pd.Series, att_next: pd.Series) -> Dict:
-        """Analizza intelligentemente se è richiesto viaggio tra attività"""
+    def _analyze_travel_requirement(self, att_prev: pd.Series, att_next: pd.Series,
+                                    end_prev: pd.Timestamp, start_next: pd.Timestamp) -> Dict:
+        """Analizza intelligentemente se è richiesto viaggio tra attività (fine e inizio già convertiti)"""
         try:
             # Usa nomi colonne corretti
-            fine_col = 'Conclusa il' if 'Conclusa il' in att_prev.index else 'Fine'
-            inizio_col = 'Iniziata il' if 'Iniziata il' in att_next.index else 'Inizio'
             azienda_col = 'Azienda' if 'Azienda' in att_prev.index else 'Cliente'
             
-            end_prev = pd.to_datetime(att_prev[fine_col])
-            start_next = pd.to_datetime(att_next[inizio_col])
             travel_minutes = (start_next - end_prev).total_seconds() / 60
             
             client_prev = att_prev[azienda_col]
@@ -272,7 +414,7 @@ class AdvancedBusinessRulesEngine:
                 }
             
             # Stesso cliente = no travel required
-            if client_prev == client_next:
+            if CLIENTS.same_client(client_prev, client_next):
                 return {
                     'requires_travel': False,
                     'insufficient_time': False,
@@ -333,7 +475,8 @@ class AdvancedBusinessRulesEngine:
         
         return min(base_confidence, 85)  # Max 85% per travel time alerts
     
-    def _validate_activity_type_v2(self, attivita_df: pd.DataFrame, teamviewer_df: pd.DataFrame):
+    def _validate_activity_type_v2(self, attivita_df: pd.DataFrame, teamviewer_df: pd.DataFrame,
+                                   teamviewer_gruppo_df: Optional[pd.DataFrame] = None):
         """Validazione tipo attività vs sessioni TeamViewer"""
         if attivita_df is None or teamviewer_df is None:
             return
@@ -342,18 +485,30 @@ class AdvancedBusinessRulesEngine:
         
         tecnico_col = 'Creato da' if 'Creato da' in attivita_df.columns else 'Assegnatario'
         tipo_col = 'Tipologia Attività' if 'Tipologia Attività' in attivita_df.columns else 'Tipo'
+        inizio_col = 'Iniziata il' if 'Iniziata il' in attivita_df.columns else 'Inizio'
+        fine_col = 'Conclusa il' if 'Conclusa il' in attivita_df.columns else 'Fine'
+        
+        # Indice sessioni (export BAIT + gruppo senza doppioni) e orari attività convertiti una volta,
+        # con lo stesso parser delle sessioni (gg/mm/aaaa)
+        sessions = SessionIndex.from_frames(teamviewer_df, teamviewer_gruppo_df)
+        starts = parse_italian_datetime_series(attivita_df[inizio_col], report=False)
+        ends = parse_italian_datetime_series(attivita_df[fine_col], report=False)
         
-        for _, attivita in attivita_df.iterrows():
+        for position, (label, attivita) in enumerate(attivita_df.iterrows()):
             if pd.isna(attivita[tecnico_col]) or attivita[tecnico_col] in ['nan', '00:45']:
                 continue
             
             tipo_attivita = str(attivita.get(tipo_col, '')).lower()
             
             if 'remoto' in tipo_attivita:
-                confidence_score = self._validate_remote_activity(attivita, teamviewer_df)
+                confidence_score = self._validate_remote_activity(
+                    attivita, starts.iloc[position], ends.iloc[position],
+                    TECHNICIANS.resolve(attivita[tecnico_col]), sessions
+                )
                 
                 if confidence_score >= 60:  # Solo alert con confidence media-alta
-                    self._create_activity_type_alert(attivita, confidence_score, 'missing_teamviewer')
+                    self._create_activity_type_alert(attivita, confidence_score, 'missing_teamviewer',
+                                                     (RULE_ORDER.index('activity_type'), None, label))
     
     def _validate_time_consistency_v2(self, attivita_df: pd.DataFrame, timbrature_df: pd.DataFrame):
         """Validazione coerenza tempi attività vs timbrature"""
@@ -385,12 +540,8 @@ class AdvancedBusinessRulesEngine:
         return (9 <= hour <= 13) or (14 <= hour <= 18)
     
     def _are_same_group_clients(self, client1: str, client2: str) -> bool:
-        """Verifica se due clienti appartengono allo stesso gruppo"""
-        for group, clients in self.same_group_clients.items():
-            if any(c in str(client1) for c in clients) and \
-               any(c in str(client2) for c in clients):
-                return True
-        return False
+        """Verifica se due clienti appartengono allo stesso gruppo (lookup su indice clienti)"""
+        return CLIENTS.same_group(client1, client2)
     
     def _estimate_distance(self, client1: str, client2: str) -> float:
         """Stima distanza tra due clienti (km)"""
@@ -411,11 +562,39 @@ class AdvancedBusinessRulesEngine:
         travel_time = (distance_km / 20) * 60  # minuti
         return max(travel_time, 15)  # Minimo 15 minuti
     
-    def _validate_remote_activity(self, attivita: pd.Series, teamviewer_df: pd.DataFrame) -> float:
-        """Valida attività remota contro sessioni TeamViewer"""
-        # Implementazione semplificata
-        # TODO: Implementare matching intelligente con TeamViewer
-        return 50  # Default confidence media
+    def _validate_remote_activity(self, attivita: pd.Series, start: pd.Timestamp, end: pd.Timestamp,
+                                  tecnico_id: Optional[str], sessions: SessionIndex) -> float:
+        """Confidence che l'attività remota sia priva di sessione TeamViewer adeguata"""
+        if pd.isna(start) or pd.isna(end) or end < start:
+            return 0  # Orari non valutabili
+        
+        window = timedelta(minutes=CONFIG.TEAMVIEWER_MATCH_WINDOW_MINUTES)
+        session_count, session_minutes = sessions.query(tecnico_id, start - window, end + window)
+        if session_minutes >= CONFIG.MIN_TEAMVIEWER_SESSION_MINUTES:
+            return 10  # Sessione adeguata: anomalia improbabile
+        
+        # Nessuna sessione = più critico di sessioni troppo brevi
+        base_confidence = 60 if session_count == 0 else 45
+        
+        # Fattore 1: Durata attività (più lunga = sessione mancante meno giustificabile)
+        activity_minutes = (end - start).total_seconds() / 60
+        if activity_minutes >= 60:
+            base_confidence += 15
+        elif activity_minutes >= 30:
+            base_confidence += 10
+        
+        # Fattore 2: Tecnico che usa TeamViewer nello stesso giorno (assenza significativa)
+        if sessions.day_sessions(tecnico_id, start) > 0:
+            base_confidence += 15
+        elif tecnico_id not in sessions:
+            base_confidence -= 20  # Tecnico assente dagli export: possibile altro strumento remoto
+        
+        # Fattore 3: Attività interne BAIT (nessuna sessione cliente attesa)
+        cliente = str(attivita.get('Azienda', ''))
+        if any(bait in cliente for bait in self.bait_service_whitelist):
+            base_confidence -= 30
+        
+        return max(0, min(base_confidence, 100))
     
     def _get_confidence_level(self, score: float) -> ConfidenceLevel:
         """Converte score numerico in ConfidenceLevel"""
@@ -432,13 +611,19 @@ class AdvancedBusinessRulesEngine:
     
     # ALERT CREATION METHODS
     
+    def _next_alert_id(self) -> str:
+        self.alert_counter += 1
+        return f"BAIT_V2_{datetime.now().strftime('%Y%m%d')}_{self.alert_counter:04d}"
+    
+    def _add_alert(self, alert: Alert, order: tuple):
+        self.alerts.append(alert)
+        self._alert_order.append(order)
+    
     def _create_temporal_overlap_alert(self, tecnico: str, att1: pd.Series, att2: pd.Series, 
-                                     overlap_info: Dict, confidence_score: float):
+                                     overlap_info: Dict, confidence_score: float, order: tuple):
         """Crea alert per sovrapposizione temporale"""
-        self.alert_counter += 1
-        
         alert = Alert(
-            id=f"BAIT_V2_{datetime.now().strftime('%Y%m%d')}_{self.alert_counter:04d}",
+            id=self._next_alert_id(),
             severity=SeverityLevel.CRITICO,
             confidence_score=confidence_score,
             confidence_level=self._get_confidence_level(confidence_score),
@@ -464,15 +649,13 @@ class AdvancedBusinessRulesEngine:
             timestamp=datetime.now()
         )
         
-        self.alerts.append(alert)
+        self._add_alert(alert, order)
     
     def _create_travel_time_alert(self, tecnico: str, att_prev: pd.Series, att_next: pd.Series,
-                                travel_analysis: Dict):
+                                travel_analysis: Dict, order: tuple):
         """Crea alert per tempo viaggio insufficiente"""
-        self.alert_counter += 1
-        
         alert = Alert(
-            id=f"BAIT_V2_{datetime.now().strftime('%Y%m%d')}_{self.alert_counter:04d}",
+            id=self._next_alert_id(),
             severity=SeverityLevel.MEDIO,
             confidence_score=travel_analysis['confidence_score'],
             confidence_level=self._get_confidence_level(travel_analysis['confidence_score']),
@@ -500,14 +683,13 @@ class AdvancedBusinessRulesEngine:
             timestamp=datetime.now()
         )
         
-        self.alerts.append(alert)
+        self._add_alert(alert, order)
     
-    def _create_activity_type_alert(self, attivita: pd.Series, confidence_score: float, alert_type: str):
+    def _create_activity_type_alert(self, attivita: pd.Series, confidence_score: float, alert_type: str,
+                                    order: tuple):
         """Crea alert per inconsistenza tipo attività"""
-        self.alert_counter += 1
-        
         alert = Alert(
-            id=f"BAIT_V2_{datetime.now().strftime('%Y%m%d')}_{self.alert_counter:04d}",
+            id=self._next_alert_id(),
             severity=SeverityLevel.ALTO,
             confidence_score=confidence_score,
             confidence_level=self._get_confidence_level(confidence_score),
@@ -526,7 +708,7 @@ class AdvancedBusinessRulesEngine:
             timestamp=datetime.now()
         )
         
-        self.alerts.append(alert)
+        self._add_alert(alert, order)
     
     def to_legacy_format(self) -> List[Dict]:
         """Converte alert v2.0 in formato legacy per compatibilità"""
@@ -0,0 +1,225 @@
+"""
+BAIT Activity Controller - Cleaning Schema
+Schema dichiarativo di pulizia per file CSV, compilato in operazioni vettoriali
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from parsers import parse_decimal_series, parse_hours_series
+from vocabulary import VOCABULARY
+
+# Caratteri ammessi nei campi chiave (nomi tecnici, clienti): il resto è rumore di encoding/export
+SANITIZE_PATTERN = re.compile(r'[^\w\s\/:;,.()-]')
+
+# Data iniziale 'aa/bb/aaaa' di una cella: aa è il mese negli export mm/gg/aaaa
+DATE_PREFIX_PATTERN = r'^\s*(\d{1,2})/(\d{1,2})/(\d{4})'
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Regole di pulizia per una colonna"""
+    kind: str = 'text'  # text | id | datetime | numeric | hours | duration (testo, validato nel profilo)
+    sanitize: bool = False  # rimozione caratteri speciali (solo campi usati come chiave)
+    empty_as_null: bool = False  # stringhe vuote/spazi dopo la pulizia diventano NaN
+    upper_bound: Optional[float] = None  # numeric: valori >= soglia diventano NaN
+    vocabulary: Optional[str] = None  # dominio del vocabolario condiviso (colonna categorica)
+    month_first: bool = False  # datetime: export mm/gg/aaaa, riscritto gg/mm/aaaa come le altre fonti
+
+
+@dataclass(frozen=True)
+class FileSchema:
+    """Schema di pulizia di un file CSV; le colonne non dichiarate restano invariate"""
+    columns: Dict[str, ColumnSpec] = field(default_factory=dict)
+    drop_rows_pattern: Optional[str] = None  # righe scartate se la prima colonna contiene il pattern
+    drop_columns_pattern: Optional[str] = None  # colonne scartate se il nome corrisponde (es. residui pivot)
+
+
+TEXT = ColumnSpec()
+ID = ColumnSpec(kind='id')
+DATETIME = ColumnSpec(kind='datetime')
+MONTH_FIRST_DATETIME = ColumnSpec(kind='datetime', month_first=True)
+KEY = ColumnSpec(sanitize=True, empty_as_null=True)
+TECNICO = ColumnSpec(sanitize=True, empty_as_null=True, vocabulary='tecnico')
+CLIENTE = ColumnSpec(sanitize=True, empty_as_null=True, vocabulary='cliente')
+CATEGORIA = ColumnSpec(sanitize=True, empty_as_null=True, vocabulary='categoria')
+HOURS = ColumnSpec(kind='hours', upper_bound=24)
+DECIMAL_HOURS = ColumnSpec(kind='numeric', upper_bound=24)
+DURATION = ColumnSpec(kind='duration')
+
+CLEANING_SCHEMAS: Dict[str, FileSchema] = {
+    'attivita': FileSchema(columns={
+        'Contratto': TEXT,
+        'Id Ticket': ID,
+        # Export attività con date all'americana (08/04/2025 = 4 agosto)
+        'Iniziata il': MONTH_FIRST_DATETIME,
+        'Conclusa il': MONTH_FIRST_DATETIME,
+        'Azienda': CLIENTE,
+        'Tipologia Attività': CATEGORIA,
+        'Descrizione': TEXT,
+        'Durata': DURATION,
+        'Creato da': TECNICO
+    }),
+    'timbrature': FileSchema(
+        columns={
+            'dipendente nome': TECNICO,
+            'dipendente cognome': TECNICO,
+            'cliente nome': CLIENTE,
+            'ora inizio': DATETIME,
+            'ora fine': DATETIME,
+            'descrizione attività': TEXT,
+            # Orari Excel di epoca 1899 convertiti in ore
+            'ore': HOURS,
+            'ore arrotondate': HOURS,
+            # Ore decimali; valori anomali dell'export (es. 501.666.666.666.672) scartati dal limite
+            'ore in centesimi': DECIMAL_HOURS,
+            'centesimi al netto delle pause': DECIMAL_HOURS,
+            'timbratura id': ID
+        },
+        # Righe con caratteri di controllo malformati
+        drop_rows_pattern=r'[-]{10,}'
+    ),
+    'teamviewer_bait': FileSchema(columns={
+        'Assegnatario': TECNICO,
+        'Nome': KEY,
+        'Codice': ID,
+        'Tipo di sessione': CATEGORIA,
+        'Gruppo': CATEGORIA,
+        'Inizio': DATETIME,
+        'Fine': DATETIME,
+        'Durata': DURATION,
+        'Note': TEXT
+    }),
+    'teamviewer_gruppo': FileSchema(columns={
+        'Utente': TECNICO,
+        'Computer': KEY,
+        'ID': ID,
+        'Tipo di sessione': CATEGORIA,
+        'Gruppo': CATEGORIA,
+        'Inizio': DATETIME,
+        'Fine': DATETIME,
+        'Durata': DURATION,
+        'Note': TEXT
+    }),
+    'permessi': FileSchema(columns={
+        'Data della richiesta': DATETIME,
+        'Dipendente': TECNICO,
+        'Tipo': CATEGORIA,
+        'Data inizio': DATETIME,
+        'Data fine': DATETIME,
+        'Stato': CATEGORIA,
+        'Note': TEXT
+    }),
+    'auto': FileSchema(columns={
+        'Dipendente': TECNICO,
+        'Auto': TEXT,
+        'Presa Data e Ora': DATETIME,
+        'Riconsegna Data e Ora': DATETIME,
+        'Cliente': CLIENTE
+    }),
+    'calendario': FileSchema(
+        columns={
+            'Dipendente': TECNICO,
+            'Cliente': CLIENTE,
+            'Dove': TEXT,
+            'Data e Ora inizio': DATETIME,
+            'Data e Ora fine': DATETIME
+        },
+        # Tabella pivot incollata a destra dell'export (colonne 'Unnamed: N')
+        drop_columns_pattern=r'^Unnamed: \d+$'
+    )
+}
+
+
+def sanitize_series(series: pd.Series) -> pd.Series:
+    """Rimuove i caratteri non ammessi lavorando sui soli valori distinti (NaN preservati)"""
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return series
+    cleaned = pd.Index(uniques.astype(str)).str.replace(SANITIZE_PATTERN, '', regex=True)
+    values = np.asarray(cleaned, dtype=object).take(codes)
+    values[codes < 0] = np.nan
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def month_first_to_italian(series: pd.Series) -> pd.Series:
+    """
+    Date mm/gg/aaaa riscritte gg/mm/aaaa (formati di CONFIG.DATE_FORMATS); celle non
+    data invariate. Vale la dichiarazione dello schema, cella per cella: la stessa
+    colonna è letta allo stesso modo in blocchi e righe aggiunte, e una data valida
+    solo come gg/mm diventa un mese non valido, registrato tra le celle non interpretate.
+    """
+    return series.str.replace(DATE_PREFIX_PATTERN, r'\2/\1/\3', regex=True)
+
+
+class CleaningPlan:
+    """Schema compilato per un insieme di colonne: solo le colonne da trasformare vengono toccate"""
+
+    def __init__(self, schema: FileSchema, columns: Tuple[str, ...]):
+        present = [name for name in schema.columns if name in columns]
+        self.sanitize_columns = [name for name in present if schema.columns[name].sanitize]
+        self.null_columns = [name for name in present if schema.columns[name].empty_as_null]
+        self.month_first_columns = [name for name in present if schema.columns[name].month_first]
+        self.numeric_columns = [
+            (name, schema.columns[name].kind, schema.columns[name].upper_bound)
+            for name in present if schema.columns[name].kind in ('numeric', 'hours')
+        ]
+        self.drop_rows_pattern = re.compile(schema.drop_rows_pattern) if schema.drop_rows_pattern else None
+        self.drop_columns = [
+            name for name in columns
+            if schema.drop_columns_pattern and re.match(schema.drop_columns_pattern, name)
+        ]
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Applica la pulizia al DataFrame (restituisce una copia)"""
+        if self.drop_columns:
+            df = df.drop(columns=self.drop_columns)
+        df = df.dropna(how='all')
+
+        if self.drop_rows_pattern is not None:
+            first_column = df.iloc[:, 0]
+            df = df[~first_column.str.contains(self.drop_rows_pattern, na=False)]
+
+        df = df.copy()
+        for name in self.sanitize_columns:
+            df[name] = sanitize_series(df[name])
+
+        for name in self.null_columns:
+            column = df[name]
+            df[name] = column.mask(column.str.strip() == '')
+
+        for name in self.month_first_columns:
+            df[name] = month_first_to_italian(df[name])
+
+        for name, kind, upper_bound in self.numeric_columns:
+            values = parse_hours_series(df[name]) if kind == 'hours' else parse_decimal_series(df[name])
+            df[name] = values if upper_bound is None else values.where(values < upper_bound)
+
+        return df
+
+
+@lru_cache(maxsize=64)
+def compile_schema(file_type: str, columns: Tuple[str, ...]) -> CleaningPlan:
+    """Compila (una volta per tipo file e intestazione) lo schema di pulizia"""
+    return CleaningPlan(CLEANING_SCHEMAS.get(file_type, FileSchema()), columns)
+
+
+def clean_frame(df: pd.DataFrame, file_type: str) -> pd.DataFrame:
+    """Pulizia schema-driven di un DataFrame letto da CSV"""
+    return compile_schema(file_type, tuple(df.columns)).apply(df)
+
+
+# Colonne categoriche per file: {file_type: {colonna: dominio vocabolario}}
+VOCABULARY_COLUMNS: Dict[str, Dict[str, str]] = {
+    file_type: {name: spec.vocabulary for name, spec in schema.columns.items() if spec.vocabulary}
+    for file_type, schema in CLEANING_SCHEMAS.items()
+}
+
+
+def categorize_frames(data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Colonne tecnico/cliente/categoria come categoriche sul vocabolario condiviso tra le fonti"""
+    return VOCABULARY.categorize(data, VOCABULARY_COLUMNS)
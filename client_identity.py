@@ -0,0 +1,110 @@
+"""
+BAIT Activity Controller - Client Identity
+Indice clienti: chiavi normalizzate (maiuscole, punteggiatura, forme societarie),
+mappa cliente -> gruppo e cache dei match fuzzy
+"""
+
+import re
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from config import CONFIG
+
+# Forme societarie ignorate nel confronto ("ISOTERMA SRL" == "Isoterma S.r.l.")
+LEGAL_SUFFIXES = frozenset({
+    'SRL', 'SRLS', 'SRLU', 'SPA', 'SAPA', 'SAS', 'SNC', 'SS', 'SCARL', 'SCRL', 'SCPA',
+    'SOC', 'COOP', 'ONLUS'
+})
+
+NON_ALNUM_PATTERN = re.compile(r'[^A-Z0-9]+')
+
+
+@lru_cache(maxsize=8192)
+def normalize_client(raw_name: Optional[str]) -> Optional[str]:
+    """
+    Chiave cliente canonica: senza accenti, maiuscola, punteggiatura rimossa
+    (S.r.l. -> SRL) e forme societarie finali eliminate. None se vuota.
+    """
+    if raw_name is None or not isinstance(raw_name, str):
+        return None
+
+    ascii_name = unicodedata.normalize('NFKD', raw_name).encode('ascii', 'ignore').decode('ascii').upper()
+    tokens = NON_ALNUM_PATTERN.sub(' ', ascii_name.replace('.', '')).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens) or None
+
+
+class ClientIdentityIndex:
+    """
+    Identità clienti per le regole: ogni confronto si riduce a lookup su chiavi
+    normalizzate (memoizzate), gruppi precalcolati e match fuzzy in cache.
+    """
+
+    def __init__(self, groups: Dict[str, list] = None,
+                 fuzzy_threshold: float = CONFIG.CLIENT_FUZZY_THRESHOLD):
+        self.fuzzy_threshold = fuzzy_threshold
+        self._group_members: Dict[str, str] = {}
+        self._group_cache: Dict[str, Optional[str]] = {}
+        self._fuzzy_cache: Dict[Tuple[str, str], bool] = {}
+        self._lock = threading.Lock()
+        self.set_groups(groups if groups is not None else CONFIG.CLIENT_GROUPS)
+
+    def set_groups(self, groups: Dict[str, list]):
+        """Imposta la mappa gruppo -> clienti (invalida le cache dipendenti)"""
+        with self._lock:
+            self._group_members = {
+                normalize_client(client): group
+                for group, clients in groups.items() for client in clients
+                if normalize_client(client)
+            }
+            self._group_cache = {}
+
+    def key(self, raw_name: Optional[str]) -> Optional[str]:
+        """Chiave normalizzata del cliente"""
+        return normalize_client(raw_name)
+
+    def group(self, raw_name: Optional[str]) -> Optional[str]:
+        """Gruppo societario del cliente (None se non censito)"""
+        client_key = normalize_client(raw_name)
+        if client_key is None:
+            return None
+
+        if client_key not in self._group_cache:
+            group = self._group_members.get(client_key)
+            if group is None:
+                # Nomi estesi ("ISOTERMA SRL - SEDE MILANO"): contenimento verificato una volta per chiave
+                group = next(
+                    (g for member, g in self._group_members.items() if member in client_key), None
+                )
+            self._group_cache[client_key] = group
+        return self._group_cache[client_key]
+
+    def same_client(self, client1: Optional[str], client2: Optional[str]) -> bool:
+        """Stesso cliente a meno di maiuscole, punteggiatura, forma societaria o piccoli refusi"""
+        key1, key2 = normalize_client(client1), normalize_client(client2)
+        if key1 is None or key2 is None:
+            return False
+        if key1 == key2:
+            return True
+
+        pair = (key1, key2) if key1 < key2 else (key2, key1)
+        result = self._fuzzy_cache.get(pair)
+        if result is None:
+            result = SequenceMatcher(None, *pair).ratio() >= self.fuzzy_threshold
+            self._fuzzy_cache[pair] = result
+        return result
+
+    def same_group(self, client1: Optional[str], client2: Optional[str]) -> bool:
+        """Stesso cliente o clienti dello stesso gruppo"""
+        group1 = self.group(client1)
+        if group1 is not None and group1 == self.group(client2):
+            return True
+        return self.same_client(client1, client2)
+
+
+# Istanza globale condivisa dalle regole v1 e v2
+CLIENTS = ClientIdentityIndex()
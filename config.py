@@ -24,18 +24,65 @@ class SystemConfig:
     
     # Encoding rilevamento
     ENCODINGS_TO_TRY = ['cp1252', 'utf-8', 'iso-8859-1']
+    ENCODING_SAMPLE_BYTES = 10000  # Campione per rilevamento statistico (chardet)
     
     # Separatore CSV
     CSV_SEPARATOR = ';'
     
+    # Cache persistente DataFrame puliti (Parquet), relativa al base path
+    CACHE_DIR = '.bait_cache'
+    ENABLE_FRAME_CACHE = True
+    # Risultati delle regole per partizione (tecnico, giorno), in CACHE_DIR/rules
+    ENABLE_RULE_CACHE = True
+    
+    # Ingestion parallela: 'sequential', 'thread' (I/O bound, es. NAS) o 'process'
+    INGESTION_EXECUTOR = 'thread'
+    INGESTION_WORKERS = 7
+    
+    # Esecuzione regole business (RuleScheduler): 'sequential' (una scansione), 'thread' o 'process'
+    RULES_EXECUTOR = 'thread'
+    RULES_WORKERS = 4
+    
+    # Regole v2.0 a shard per tecnico: processi worker (1 = seriale, 0 = tutti i core)
+    RULES_V2_WORKERS = 1
+    
+    # Streaming a blocchi per export multi-mese (righe per blocco)
+    STREAM_CHUNK_ROWS = 50000
+    
+    # Ingestion incrementale: byte finali del contenuto già letto verificati prima di un append
+    APPEND_PREFIX_CHECK_BYTES = 65536
+    
+    # Storico partizionato per data (relativo al base path): granularità 'day' o 'month'
+    HISTORY_DIR = 'history'
+    HISTORY_GRANULARITY = 'day'
+    HISTORY_ARCHIVE_ON_LOAD = False  # Archivia ogni caricamento da upload_csv nello storico (altrimenti solo con --archivia)
+    
+    # Profilo integrità dati: una riga JSON per esecuzione (relativo al base path)
+    INTEGRITY_HISTORY_PATH = 'data_quality/integrity_history.jsonl'
+    RECORD_INTEGRITY_HISTORY = True  # Aggiunge il profilo di ogni caricamento allo storico qualità dati (JSONL in coda)
+    INTEGRITY_SAMPLE_SIZE = 5  # Esempi conservati per ogni tipo di anomalia
+    
+    # Versione logica di pulizia: incrementare ad ogni modifica di cleaning_schema
+    # (o dei metadati salvati in cache, es. profilo di integrità)
+    CLEANING_SCHEMA_VERSION = 9
+    
     # Formato date italiane
     DATE_FORMATS = ['%d/%m/%Y %H:%M', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']
     
     # Soglie business rules
     MAX_TRAVEL_TIME_MINUTES = 60  # Tempo massimo viaggio tra appuntamenti
     MIN_TEAMVIEWER_SESSION_MINUTES = 5  # Sessione minima TeamViewer per attività remota
+    TEAMVIEWER_MATCH_WINDOW_MINUTES = 30  # Tolleranza attorno all'attività remota per le sessioni correlate
     MAX_TIME_DISCREPANCY_MINUTES = 30  # Discrepanza massima calendario vs timbrature
     
+    # Anagrafica clienti: gruppi societari (stesso gruppo = nessuno spostamento) e match fuzzy nomi
+    CLIENT_GROUPS = {
+        'ELECTRALINE': ['ELECTRALINE 3PMARK SPA'],
+        'SPOLIDORO': ['SPOLIDORO STUDIO AVVOCATO'],
+        'ISOTERMA_GROUP': ['ISOTERMA SRL', 'GARIBALDINA SRL']
+    }
+    CLIENT_FUZZY_THRESHOLD = 0.92  # Similarità minima tra chiavi normalizzate
+    
     # Alert severity levels
     ALERT_SEVERITY = {
         'CRITICO': 1,   # Perdite di fatturazione sicure
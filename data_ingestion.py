@@ -6,44 +6,192 @@ Sistema robusto di parsing CSV con rilevamento automatico encoding
 import pandas as pd
 import chardet
 from datetime import datetime
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple, Iterator
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import codecs
+import json
 import os
+import re
+import tempfile
+import threading
+import time
+import warnings
 from config import CONFIG, LOGGER
+from models import DataModelFactory
+from cleaning_schema import categorize_frames, clean_frame
+from frame_cache import FrameCache, content_hasher
+from history_store import DateLike, HistoryStore
+from integrity_profiler import IntegrityHistory, IntegrityProfiler, issue_total, profile_frame
+from parsers import PARSE_FAILURES
+from rule_sources import RuleSources, SourceColumns, select_columns
+from technician_identity import TECHNICIANS
+
+# Messaggi ParserWarning pandas: "Skipping line N: motivo"
+SKIPPED_LINE_PATTERN = re.compile(r'Skipping line (\d+): ([^\n]+)')
+
+# Errore tokenizer C con posizione: "EOF inside string starting at row N"
+# (N = record, intestazione e righe vuote incluse, non riga fisica)
+C_ERROR_ROW_PATTERN = re.compile(r'row (\d+)')
+
+# Record CSV delimitati come nel tokenizer C: campo tra virgolette (anche su più righe,
+# "" = virgolette letterali) o senza virgolette iniziali; fine record \r\n, \n o \r
+_CSV_FIELD = r'(?:"[^"]*(?:""[^"]*)*"(?!")[^{sep}\r\n]*|[^{sep}"\r\n][^{sep}\r\n]*|)'.format(
+    sep=re.escape(CONFIG.CSV_SEPARATOR)
+)
+CSV_RECORD_PATTERN = re.compile(rf'{_CSV_FIELD}(?:{re.escape(CONFIG.CSV_SEPARATOR)}{_CSV_FIELD})*(?:\r\n|\n|\r)')
+
+# Colonne per lo streaming a partizioni: (colonna data, colonne nome tecnico)
+STREAM_PARTITION_COLUMNS = {
+    'attivita': ('Iniziata il', ['Creato da']),
+    'timbrature': ('ora inizio', ['dipendente nome', 'dipendente cognome']),
+    'teamviewer_bait': ('Inizio', ['Assegnatario']),
+    'teamviewer_gruppo': ('Inizio', ['Utente']),
+    'permessi': ('Data inizio', ['Dipendente']),
+    'auto': ('Presa Data e Ora', ['Dipendente']),
+    'calendario': ('Data e Ora inizio', ['Dipendente'])
+}
+
+# warnings.catch_warnings modifica stato globale: serializza la raccolta ParserWarning tra thread
+_PARSER_WARNINGS_LOCK = threading.Lock()
 
 class DataIngestionEngine:
     """Engine per l'ingestion robusta dei file CSV con encoding misto"""
     
-    def __init__(self, base_path: str = '.'):
+    def __init__(self, base_path: str = '.', use_cache: bool = CONFIG.ENABLE_FRAME_CACHE):
         self.base_path = base_path
         self.data_cache: Dict[str, pd.DataFrame] = {}
         
+        # Report di parsing per file: engine usato e righe scartate
+        self.parse_reports: Dict[str, Dict[str, Any]] = {}
+        
+        # Encoding già rilevati per (path, size, mtime), persistiti accanto alla cache frame
+        self.encoding_cache_path = (
+            os.path.join(base_path, CONFIG.CACHE_DIR, 'encodings.json') if use_cache else None
+        )
+        self.encoding_cache: Dict[str, Dict[str, Any]] = self._load_encoding_cache()
+        self._encoding_cache_lock = threading.Lock()
+        
+        # Tempi di caricamento per file (ms), riportati nella validazione
+        self.load_timings: Dict[str, int] = {}
+        
+        # Profili di integrità per file (aggiornati durante il parsing) e storico per esecuzione
+        self.integrity_profilers: Dict[str, IntegrityProfiler] = {}
+        self.integrity_history = IntegrityHistory(os.path.join(base_path, CONFIG.INTEGRITY_HISTORY_PATH))
+        
+        # Storico partizionato per data (intervalli di date invece della sola cartella upload)
+        self.history = HistoryStore(os.path.join(base_path, CONFIG.HISTORY_DIR))
+        
+        # Cache persistente tra esecuzioni (orchestrator, file watcher, dashboard)
+        self.frame_cache = FrameCache(os.path.join(base_path, CONFIG.CACHE_DIR)) if use_cache else None
+        
+        # Stato ultimo caricamento per file (offset byte, righe, hash header/prefisso e contenuto)
+        # usato per il parsing incrementale dei file che crescono solo in coda; persistito
+        # accanto alla cache frame, da cui un'esecuzione successiva riprende il frame
+        self.ingest_state_path = (
+            os.path.join(base_path, CONFIG.CACHE_DIR, 'ingest_state.json')
+            if self.frame_cache and self.frame_cache.enabled else None
+        )
+        self.ingest_state: Dict[str, Dict[str, Any]] = self._load_ingest_state()
+        self._ingest_state_lock = threading.Lock()
+        
+    def _load_encoding_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Carica la cache encoding persistita (se presente)"""
+        if not self.encoding_cache_path or not os.path.exists(self.encoding_cache_path):
+            return {}
+        try:
+            with open(self.encoding_cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            LOGGER.warning(f"Cache encoding illeggibile, verrà ricostruita: {e}")
+            return {}
+    
+    def _save_encoding_cache(self):
+        """Persiste la cache encoding con scrittura atomica"""
+        if not self.encoding_cache_path:
+            return
+        tmp_path = f"{self.encoding_cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.encoding_cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.encoding_cache, f, indent=1)
+            os.replace(tmp_path, self.encoding_cache_path)
+        except OSError as e:
+            LOGGER.warning(f"Impossibile salvare cache encoding: {e}")
+    
+    @staticmethod
+    def _detect_bom(raw_data: bytes) -> Optional[str]:
+        """Encoding dichiarato dal BOM, se presente"""
+        if raw_data.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if raw_data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        return None
+    
+    @staticmethod
+    def _is_valid_utf8(file_path: str, block_size: int = 1 << 20) -> bool:
+        """Decodifica UTF-8 strict dell'intero file, interrotta al primo byte non valido"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='strict')
+        try:
+            with open(file_path, 'rb') as file:
+                for block in iter(lambda: file.read(block_size), b''):
+                    decoder.decode(block)
+            decoder.decode(b'', final=True)
+            return True
+        except UnicodeDecodeError:
+            return False
+    
+    def _detect_encoding_statistical(self, file_path: str, raw_data: bytes) -> str:
+        """Rilevamento statistico chardet, usato solo come ultima risorsa"""
+        detection = chardet.detect(raw_data)
+        detected_encoding = detection['encoding']
+        confidence = detection['confidence'] or 0
+        
+        LOGGER.info(f"File {file_path}: encoding rilevato {detected_encoding} (confidence: {confidence:.2f})")
+        
+        # Se confidence è bassa, prova encodings comuni per file italiani sul campione già letto
+        if confidence < 0.7:
+            LOGGER.warning(f"Confidence bassa per {file_path}, provo encodings standard")
+            for encoding in CONFIG.ENCODINGS_TO_TRY:
+                try:
+                    raw_data.decode(encoding)
+                    LOGGER.info(f"Encoding {encoding} funziona per {file_path}")
+                    return encoding
+                except UnicodeDecodeError:
+                    continue
+        
+        return detected_encoding or 'cp1252'  # Default per file Windows italiani
+    
     def detect_encoding(self, file_path: str) -> str:
-        """Rileva automaticamente l'encoding del file"""
+        """
+        Rileva automaticamente l'encoding del file.
+        Ordine: cache (path, size, mtime), BOM, UTF-8 strict, chardet.
+        """
         try:
-            # Leggi un campione del file per rilevare encoding
+            stat = os.stat(file_path)
+            cache_key = os.path.abspath(file_path)
+            cached = self.encoding_cache.get(cache_key)
+            if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+                return cached['encoding']
+            
             with open(file_path, 'rb') as file:
-                raw_data = file.read(10000)  # Primi 10KB
-                
-            # Usa chardet per rilevare encoding
-            detection = chardet.detect(raw_data)
-            detected_encoding = detection['encoding']
-            confidence = detection['confidence']
+                raw_data = file.read(CONFIG.ENCODING_SAMPLE_BYTES)
             
-            LOGGER.info(f"File {file_path}: encoding rilevato {detected_encoding} (confidence: {confidence:.2f})")
+            encoding = self._detect_bom(raw_data)
+            if encoding is None and self._is_valid_utf8(file_path):
+                encoding = 'utf-8'
+            if encoding is None:
+                encoding = self._detect_encoding_statistical(file_path, raw_data)
             
-            # Se confidence è bassa, prova encodings comuni per file italiani
-            if confidence < 0.7:
-                LOGGER.warning(f"Confidence bassa per {file_path}, provo encodings standard")
-                for encoding in CONFIG.ENCODINGS_TO_TRY:
-                    try:
-                        with open(file_path, 'r', encoding=encoding) as f:
-                            f.read(1000)  # Test lettura
-                        LOGGER.info(f"Encoding {encoding} funziona per {file_path}")
-                        return encoding
-                    except UnicodeDecodeError:
-                        continue
-                        
-            return detected_encoding or 'cp1252'  # Default per file Windows italiani
+            LOGGER.info(f"File {file_path}: encoding {encoding}")
+            with self._encoding_cache_lock:
+                self.encoding_cache[cache_key] = {
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'encoding': encoding
+                }
+                self._save_encoding_cache()
+            return encoding
             
         except Exception as e:
             LOGGER.error(f"Errore rilevamento encoding per {file_path}: {e}")
@@ -66,33 +214,165 @@ class DataIngestionEngine:
         LOGGER.warning(f"Impossibile parsare data: {date_str}")
         return None
     
-    def clean_csv_data(self, df: pd.DataFrame, file_type: str) -> pd.DataFrame:
-        """Pulizia dati CSV specifica per tipo file"""
+    def _read_csv_with_report(self, source, encoding: Optional[str], engine: str,
+                              line_offset: int = 0, **kwargs) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+        """Esegue read_csv raccogliendo le righe malformate scartate dal parser"""
+        with _PARSER_WARNINGS_LOCK, warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            df = pd.read_csv(
+                source,
+                sep=CONFIG.CSV_SEPARATOR,
+                encoding=encoding,
+                on_bad_lines='warn',  # Segnala invece di scartare in silenzio
+                engine=engine,
+                dtype=str,  # Carica tutto come string per pulizia manuale
+                **kwargs
+            )
         
-        # Rimozione righe completamente vuote
-        df = df.dropna(how='all')
+        return df, self._collect_skipped_lines(caught, engine, line_offset)
+    
+    @staticmethod
+    def _collect_skipped_lines(caught: List[warnings.WarningMessage], engine: str,
+                               line_offset: int = 0) -> List[Dict[str, Any]]:
+        """Estrae le righe scartate dai ParserWarning, rilanciando gli altri warning"""
+        skipped_lines = []
+        for warning in caught:
+            if not issubclass(warning.category, pd.errors.ParserWarning):
+                warnings.warn_explicit(warning.message, warning.category, warning.filename, warning.lineno)
+                continue
+            for line, reason in SKIPPED_LINE_PATTERN.findall(str(warning.message)):
+                skipped_lines.append({'line': int(line) + line_offset, 'reason': reason.strip(), 'engine': engine})
+        return skipped_lines
+    
+    def read_csv_fast(self, file_path: str, encoding: str, raw_data: Optional[bytes] = None,
+                      usecols: Optional[List[int]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Legge il CSV con l'engine C. Se il tokenizer C si blocca (es. virgolette non chiuse)
+        le righe precedenti restano all'engine C e solo la parte restante del file
+        viene riletta con l'engine python.
+        raw_data: contenuto già letto dal disco, evita una seconda lettura del file.
+        usecols: posizioni delle sole colonne da convertire (None = tutte).
+        """
+        if raw_data is None:
+            with open(file_path, 'rb') as file:
+                raw_data = file.read()
         
-        # Pulizia specifica per timbrature.csv (dati corrotti)
-        if file_type == 'timbrature':
-            # Rimuovi righe con caratteri di controllo malformati
-            df = df[~df.iloc[:, 0].astype(str).str.contains(r'[-]{10,}', regex=True, na=False)]
-            
-            # Pulizia colonne numeriche con valori corrotti
-            numeric_columns = ['ore', 'ore in centesimi', 'ore arrotondate', 'centesimi al netto delle pause']
-            for col in numeric_columns:
-                if col in df.columns:
-                    # Sostituisci valori numerici anomali (es. 501.666.666.666.672)
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    df[col] = df[col].apply(lambda x: x if pd.isna(x) or x < 24 else None)
+        try:
+            df, skipped_lines = self._read_csv_with_report(BytesIO(raw_data), encoding, 'c', usecols=usecols)
+            return df, {'engine': 'c', 'skipped_lines': skipped_lines}
+        except pd.errors.ParserError as e:
+            LOGGER.warning(f"Engine C fallito per {file_path}: {e}")
+            error = str(e)
         
-        # Pulizia generale caratteri speciali malformati
-        for col in df.select_dtypes(include=['object']).columns:
-            df[col] = df[col].astype(str).str.replace(r'[^\w\s\/:;,.()-]', '', regex=True)
-            
-        return df
+        match = C_ERROR_ROW_PATTERN.search(error)
+        failed_row = int(match.group(1)) if match else 1
+        
+        split = self._read_split_at_record(raw_data.decode(encoding), failed_row, usecols) if failed_row > 1 else None
+        if split is not None:
+            df, skipped_lines = split
+        else:
+            # Posizione errore non individuabile: rilettura completa
+            df, skipped_lines = self._read_csv_with_report(BytesIO(raw_data), encoding, 'python', usecols=usecols)
+            failed_row = 1
+        
+        LOGGER.info(f"Fallback engine python per {file_path} dalla riga {failed_row + 1}")
+        return df, {
+            'engine': 'c+python' if failed_row > 1 else 'python',
+            'fallback_from_line': failed_row + 1,
+            'fallback_reason': error,
+            'skipped_lines': skipped_lines
+        }
     
-    def load_csv_file(self, file_name: str, file_type: str) -> Optional[pd.DataFrame]:
-        """Carica singolo file CSV con gestione robusta errori"""
+    @staticmethod
+    def _record_offsets(text: str, records: int) -> Optional[Tuple[int, int, int]]:
+        """
+        Fine dell'intestazione, inizio del record indicato (posizioni nel testo, record
+        contati come nel tokenizer C) e righe vuote che lo precedono; None se il testo
+        non si lascia dividere in record prima di quel punto
+        """
+        position = header_end = blank = 0
+        for record in range(records):
+            match = CSV_RECORD_PATTERN.match(text, position)
+            if match is None:
+                return None
+            if record == 0:
+                header_end = match.end()
+            elif not match.group().strip('\r\n'):
+                blank += 1
+            position = match.end()
+        return header_end, position, blank
+    
+    def _read_split_at_record(self, text: str, failed_row: int,
+                              usecols: Optional[List[int]]) -> Optional[Tuple[pd.DataFrame, List[Dict[str, Any]]]]:
+        """
+        Record precedenti a failed_row con l'engine C, i restanti (con l'intestazione)
+        con l'engine python. Divisione per record e non per riga fisica: i campi tra
+        virgolette su più righe restano interi. None se la divisione non è affidabile.
+        """
+        offsets = self._record_offsets(text, failed_row)
+        if offsets is None:
+            return None
+        header_end, offset, blank = offsets
+        
+        try:
+            head, head_skipped = self._read_csv_with_report(StringIO(text[:offset]), None, 'c', usecols=usecols)
+            # Tutti i record della parte C letti o segnalati: divisione coerente con il tokenizer
+            if len(head) + len(head_skipped) != failed_row - 1 - blank:
+                return None
+            tail, tail_skipped = self._read_csv_with_report(
+                StringIO(text[:header_end] + text[offset:]), None, 'python',
+                line_offset=failed_row - 1, usecols=usecols
+            )
+        except pd.errors.ParserError:
+            return None
+        return pd.concat([head, tail], ignore_index=True), head_skipped + tail_skipped
+    
+    def _read_remaining_records(self, file_path: str, encoding: str, rows: int,
+                                skipped: int) -> Tuple[pd.DataFrame, List[Dict[str, Any]], int]:
+        """
+        Record successivi ai primi rows + skipped record non vuoti (già restituiti o
+        scartati dall'engine C), letti con l'engine python insieme all'intestazione.
+        Se il testo non si lascia dividere in record: file intero con l'engine python,
+        senza le prime rows righe. Restituisce anche la riga da cui riparte la lettura.
+        """
+        with open(file_path, 'r', encoding=encoding, newline='') as file:
+            text = file.read()
+        
+        position = header_end = records = 0
+        remaining = skipped + rows + 1
+        while remaining:
+            match = CSV_RECORD_PATTERN.match(text, position)
+            if match is None:
+                df, skipped_lines = self._read_csv_with_report(StringIO(text), None, 'python')
+                return df.iloc[rows:], skipped_lines, 2
+            if records == 0:
+                header_end = match.end()
+            if records == 0 or match.group().strip('\r\n'):
+                remaining -= 1
+            records += 1
+            position = match.end()
+        
+        df, skipped_lines = self._read_csv_with_report(
+            StringIO(text[:header_end] + text[position:]), None, 'python', line_offset=records - 1
+        )
+        return df, skipped_lines, records + 1
+    
+    def clean_csv_data(self, df: pd.DataFrame, file_type: str) -> pd.DataFrame:
+        """Pulizia dati CSV specifica per tipo file (schema dichiarativo in cleaning_schema)"""
+        return clean_frame(df, file_type)
+    
+    @staticmethod
+    def _header_columns(raw_data: bytes, encoding: str) -> List[str]:
+        """Intestazione del CSV (nomi come li produce read_csv, duplicati inclusi)"""
+        return list(pd.read_csv(BytesIO(raw_data), sep=CONFIG.CSV_SEPARATOR, encoding=encoding,
+                                nrows=0, dtype=str).columns)
+    
+    def load_csv_file(self, file_name: str, file_type: str,
+                      columns: SourceColumns = None) -> Optional[pd.DataFrame]:
+        """
+        Carica singolo file CSV con gestione robusta errori.
+        columns: colonne dichiarate dalle regole (nomi o prefissi); None = tutte.
+        """
         file_path = os.path.join(self.base_path, file_name)
         
         if not os.path.exists(file_path):
@@ -100,26 +380,65 @@ class DataIngestionEngine:
             return None
             
         try:
+            # File cresciuto solo in coda rispetto all'ultimo caricamento: parsing delle sole righe nuove
+            df = self._load_appended_rows(file_path, file_name, file_type, columns)
+            if df is not None:
+                return df
+            
+            # Unica lettura dal disco (I/O parallelizzabile tra file): hash e parsing lavorano in memoria
+            with open(file_path, 'rb') as file:
+                raw_data = file.read()
+            hasher = content_hasher(raw_data)
+            
+            # File invariato: DataFrame pulito già disponibile su disco
+            content_hash = hasher.hexdigest() if self.frame_cache else None
+            if content_hash:
+                df = self.frame_cache.get(file_type, content_hash, columns)
+                if df is not None:
+                    LOGGER.info(f"Caricato {file_name} da cache: {len(df)} righe, {len(df.columns)} colonne")
+                    parse_report = self.frame_cache.get_metadata(file_type, content_hash)
+                    self.data_cache[file_type] = df
+                    self.parse_reports[file_type] = parse_report
+                    if 'raw_columns' in parse_report:
+                        self._record_ingest_state(
+                            file_type, file_path, raw_data, hasher, self.detect_encoding(file_path),
+                            parse_report['raw_rows'], parse_report['raw_columns'], columns,
+                            select_columns(parse_report['raw_columns'], columns)
+                        )
+                    return df
+            
             # Rileva encoding automaticamente
             encoding = self.detect_encoding(file_path)
             
-            # Carica CSV con parametri robusti
-            df = pd.read_csv(
-                file_path,
-                sep=CONFIG.CSV_SEPARATOR,
-                encoding=encoding,
-                on_bad_lines='skip',  # Salta righe malformate
-                engine='python',  # Engine più robusto
-                dtype=str  # Carica tutto come string per pulizia manuale
-            )
+            # Solo le colonne dichiarate dalle regole vengono convertite dal parser
+            header = self._header_columns(raw_data, encoding)
+            usecols = select_columns(header, columns)
+            
+            # Carica CSV: engine C veloce, fallback python solo se necessario
+            df, parse_report = self.read_csv_fast(file_path, encoding, raw_data, usecols)
+            parse_report['raw_rows'] = len(df)
+            parse_report['raw_columns'] = header
+            
+            # Profilo integrità sulle righe grezze appena lette (salvato con la voce di cache)
+            profiler = IntegrityProfiler(file_type)
+            profiler.update(df)
+            self.integrity_profilers[file_type] = profiler
+            parse_report['integrity'] = profiler.report(parse_report['skipped_lines'])
+            self.parse_reports[file_type] = parse_report
+            self._record_ingest_state(file_type, file_path, raw_data, hasher, encoding, len(df), header,
+                                      columns, usecols)
             
-            LOGGER.info(f"Caricato {file_name}: {len(df)} righe, {len(df.columns)} colonne")
+            LOGGER.info(f"Caricato {file_name}: {len(df)} righe, {len(df.columns)}/{len(header)} colonne (engine {parse_report['engine']})")
+            for skipped in parse_report['skipped_lines']:
+                LOGGER.warning(f"{file_name}: riga {skipped['line']} scartata ({skipped['reason']})")
             
             # Pulizia dati specifica per file type
             df = self.clean_csv_data(df, file_type)
             
-            # Cache per performance
+            # Cache per performance (su disco solo frame completi, proiettati in lettura)
             self.data_cache[file_type] = df
+            if content_hash and usecols is None:
+                self.frame_cache.put(file_type, content_hash, df, metadata=parse_report)
             
             return df
             
@@ -127,23 +446,505 @@ class DataIngestionEngine:
             LOGGER.error(f"Errore caricamento {file_name}: {e}")
             return None
     
-    def load_all_data(self) -> Dict[str, pd.DataFrame]:
-        """Carica tutti i file CSV configurati"""
-        LOGGER.info("Avvio caricamento dati CSV...")
+    # CARICAMENTO INCREMENTALE (APPEND-ONLY)
+    
+    @staticmethod
+    def _bytes_digest(data: bytes) -> str:
+        """Hash breve per header e finestra di prefisso"""
+        return content_hasher(data).hexdigest()
+    
+    def _load_ingest_state(self) -> Dict[str, Dict[str, Any]]:
+        """Stato incrementale persistito (senza hasher: ricalcolato alla ripresa)"""
+        if not self.ingest_state_path or not os.path.exists(self.ingest_state_path):
+            return {}
+        try:
+            with open(self.ingest_state_path, 'r', encoding='utf-8') as f:
+                states = json.load(f)
+        except (OSError, ValueError) as e:
+            LOGGER.warning(f"Stato incrementale illeggibile, verrà ricostruito: {e}")
+            return {}
+        for state in states.values():
+            if state.get('source_columns') is not None:
+                state['source_columns'] = tuple(state['source_columns'])
+        return states
+    
+    def _set_ingest_state(self, file_type: str, state: Optional[Dict[str, Any]]):
+        """Aggiorna (None = rimuove) lo stato del file e lo persiste con scrittura atomica"""
+        with self._ingest_state_lock:
+            if state is None:
+                self.ingest_state.pop(file_type, None)
+            else:
+                self.ingest_state[file_type] = state
+            if not self.ingest_state_path:
+                return
+            
+            states = {
+                name: {key: value for key, value in entry.items() if key != 'hasher'}
+                for name, entry in self.ingest_state.items()
+            }
+            tmp_path = f"{self.ingest_state_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.ingest_state_path), exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(states, f, indent=1)
+                os.replace(tmp_path, self.ingest_state_path)
+            except OSError as e:
+                LOGGER.warning(f"Impossibile salvare stato incrementale: {e}")
+    
+    def _record_ingest_state(self, file_type: str, file_path: str, raw_data: bytes, hasher,
+                             encoding: str, raw_rows: int, raw_columns: List[str],
+                             source_columns: SourceColumns = None, usecols: Optional[List[int]] = None):
+        """Memorizza offset e impronte del contenuto appena caricato"""
+        # Ultima riga incompleta (file in scrittura): niente append sicuro, al prossimo giro reload completo
+        if not raw_data.endswith(b'\n'):
+            self._set_ingest_state(file_type, None)
+            return
         
-        loaded_data = {}
+        self._set_ingest_state(file_type, {
+            'path': file_path,
+            'offset': len(raw_data),
+            'lines': raw_data.count(b'\n'),
+            'rows': raw_rows,
+            'columns': raw_columns,
+            'source_columns': source_columns,
+            'usecols': usecols,
+            'encoding': encoding,
+            'header_hash': self._bytes_digest(raw_data[:raw_data.find(b'\n') + 1]),
+            'prefix_hash': self._bytes_digest(raw_data[-CONFIG.APPEND_PREFIX_CHECK_BYTES:]),
+            # Voce della cache frame con il contenuto caricato (ripresa tra esecuzioni)
+            'content_hash': hasher.hexdigest(),
+            'hasher': hasher
+        })
+    
+    @staticmethod
+    def _verified_hasher(state: Dict[str, Any]):
+        """Hasher dei byte già caricati, None se non coincidono più con content_hash"""
+        with open(state['path'], 'rb') as file:
+            hasher = content_hasher(file.read(state['offset']))
+        return hasher if hasher.hexdigest() == state['content_hash'] else None
+    
+    def _resume_cached_frame(self, file_type: str, state: Dict[str, Any],
+                             columns: SourceColumns = None) -> Optional[pd.DataFrame]:
+        """Frame e report dell'ultimo caricamento di un'esecuzione precedente, dalla cache frame"""
+        if not self.frame_cache or not state.get('content_hash'):
+            return None
+        # Contenuto già caricato verificato per intero: header e finestra non rilevano
+        # modifiche a parità di dimensione fatte tra un'esecuzione e l'altra
+        hasher = self._verified_hasher(state)
+        if hasher is None:
+            return None
+        state['hasher'] = hasher
+        df = self.frame_cache.get(file_type, state['content_hash'], columns)
+        if df is None:
+            return None
+        self.parse_reports[file_type] = self.frame_cache.get_metadata(file_type, state['content_hash'])
+        self.data_cache[file_type] = df
+        return df
+    
+    def _load_appended_rows(self, file_path: str, file_name: str, file_type: str,
+                            columns: SourceColumns = None) -> Optional[pd.DataFrame]:
+        """
+        Se il file è cambiato solo per aggiunta in coda, parsa i byte nuovi e li unisce
+        al frame in memoria. Restituisce None quando serve un caricamento completo
+        (primo caricamento, header o prefisso modificati, file troncato, colonne richieste diverse).
+        """
+        state = self.ingest_state.get(file_type)
+        if state is None or state['path'] != file_path or state.get('source_columns') != columns:
+            return None
+        cached_df = self.data_cache.get(file_type)
+        if cached_df is None:
+            cached_df = self._resume_cached_frame(file_type, state, columns)
+            if cached_df is None:
+                return None
+        if 'hasher' not in state:
+            # Stato ricevuto da un worker (hasher non serializzabile): contenuto riverificato
+            hasher = self._verified_hasher(state)
+            if hasher is None:
+                return None
+            state['hasher'] = hasher
+        
+        offset = state['offset']
+        if os.path.getsize(file_path) < offset:
+            LOGGER.info(f"{file_name} troncato, ricaricamento completo")
+            return None
+        
+        with open(file_path, 'rb') as file:
+            header = file.readline()
+            window_start = max(0, offset - CONFIG.APPEND_PREFIX_CHECK_BYTES)
+            file.seek(window_start)
+            window = file.read(offset - window_start)
+            if (self._bytes_digest(header) != state['header_hash'] or
+                    self._bytes_digest(window) != state['prefix_hash']):
+                LOGGER.info(f"{file_name} riscritto, ricaricamento completo")
+                return None
+            tail = file.read()
+        
+        # Solo righe complete: una riga ancora in scrittura verrà letta al prossimo giro
+        tail = tail[:tail.rfind(b'\n') + 1]
+        if not tail:
+            return cached_df
+        
+        try:
+            new_rows, skipped_lines = self._read_csv_with_report(
+                BytesIO(tail), state['encoding'], 'c',
+                line_offset=state['lines'], header=None, names=state['columns'], usecols=state['usecols']
+            )
+        except (pd.errors.ParserError, UnicodeDecodeError) as e:
+            LOGGER.warning(f"Parsing incrementale fallito per {file_name} ({e}), ricaricamento completo")
+            return None
+        
+        # Indici coerenti con un caricamento completo dello stesso file
+        new_rows.index = pd.RangeIndex(state['rows'], state['rows'] + len(new_rows))
+        df = pd.concat([cached_df, self.clean_csv_data(new_rows, file_type)])
+        
+        # Hasher del contenuto già caricato (ricalcolato da _resume_cached_frame tra esecuzioni)
+        hasher = state['hasher']
+        hasher.update(tail)
+        
+        # La finestra letta dal file coincide con quella dello stato (hash verificato)
+        prefix_window = (window + tail)[-CONFIG.APPEND_PREFIX_CHECK_BYTES:]
+        state = {
+            **state,
+            'offset': offset + len(tail),
+            'lines': state['lines'] + tail.count(b'\n'),
+            'rows': state['rows'] + len(new_rows),
+            'prefix_hash': self._bytes_digest(prefix_window),
+            'content_hash': hasher.hexdigest(),
+            'hasher': hasher
+        }
+        self._set_ingest_state(file_type, state)
+        
+        previous_report = self.parse_reports.get(file_type, {})
+        
+        # Profilo integrità aggiornato con le sole righe nuove (ripreso dal report se caricato da cache)
+        profiler = self.integrity_profilers.get(file_type)
+        if profiler is None:
+            profiler = IntegrityProfiler.resume(file_type, previous_report.get('integrity', {}), cached_df)
+            self.integrity_profilers[file_type] = profiler
+        profiler.update(new_rows)
+        
+        all_skipped = previous_report.get('skipped_lines', []) + skipped_lines
+        parse_report = {
+            **previous_report,
+            'mode': 'append',
+            'appended_rows': len(new_rows),
+            'skipped_lines': all_skipped,
+            'raw_rows': state['rows'],
+            'integrity': profiler.report(all_skipped)
+        }
+        self.parse_reports[file_type] = parse_report
+        self.data_cache[file_type] = df
+        if self.frame_cache and state['usecols'] is None:
+            self.frame_cache.put(file_type, state['content_hash'], df, metadata=parse_report)
+        
+        LOGGER.info(f"Caricato {file_name} in modalità incrementale: +{len(new_rows)} righe ({len(df)} totali)")
+        for skipped in skipped_lines:
+            LOGGER.warning(f"{file_name}: riga {skipped['line']} scartata ({skipped['reason']})")
+        
+        return df
+    
+    # STREAMING A BLOCCHI
+    
+    def iter_csv_chunks(self, file_name: str, file_type: str,
+                        chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Legge il CSV a blocchi di righe limitati, applicando la pulizia a ciascun blocco.
+        Se il tokenizer C si blocca, i record non ancora restituiti sono riletti con
+        l'engine python (come read_csv_fast) e restituiti negli stessi blocchi.
+        Le righe scartate finiscono in parse_reports[file_type] a fine lettura.
+        """
+        file_path = os.path.join(self.base_path, file_name)
+        encoding = self.detect_encoding(file_path)
+        chunk_rows = chunksize or CONFIG.STREAM_CHUNK_ROWS
+        skipped_lines: List[Dict[str, Any]] = []
+        profiler = IntegrityProfiler(file_type)
+        rows, error = 0, None
+        
+        reader = pd.read_csv(
+            file_path,
+            sep=CONFIG.CSV_SEPARATOR,
+            encoding=encoding,
+            on_bad_lines='warn',
+            engine='c',
+            dtype=str,
+            chunksize=chunk_rows
+        )
+        
+        with reader:
+            while True:
+                try:
+                    with _PARSER_WARNINGS_LOCK, warnings.catch_warnings(record=True) as caught:
+                        warnings.simplefilter('always', pd.errors.ParserWarning)
+                        chunk = next(reader, None)
+                except pd.errors.ParserError as e:
+                    LOGGER.warning(f"Engine C fallito per {file_path}: {e}")
+                    error = str(e)
+                    break
+                skipped_lines.extend(self._collect_skipped_lines(caught, 'c'))
+                
+                if chunk is None:
+                    break
+                rows += len(chunk)
+                profiler.update(chunk)
+                yield self.clean_csv_data(chunk, file_type)
+        
+        report = {'engine': 'c', 'mode': 'stream'}
+        if error is not None:
+            # Record già restituiti (o scartati) dall'engine C: righe lette più righe segnalate
+            tail, tail_skipped, fallback_line = self._read_remaining_records(
+                file_path, encoding, rows, len(skipped_lines)
+            )
+            reported = {skipped['line'] for skipped in skipped_lines}
+            skipped_lines.extend(skipped for skipped in tail_skipped if skipped['line'] not in reported)
+            tail.index = pd.RangeIndex(rows, rows + len(tail))
+            LOGGER.info(f"Fallback engine python per {file_path} dalla riga {fallback_line}")
+            report = {
+                'engine': 'c+python' if rows else 'python', 'mode': 'stream',
+                'fallback_from_line': fallback_line, 'fallback_reason': error
+            }
+            
+            for start in range(0, len(tail), chunk_rows):
+                chunk = tail.iloc[start:start + chunk_rows]
+                profiler.update(chunk)
+                yield self.clean_csv_data(chunk, file_type)
         
-        for file_type, file_name in CONFIG.CSV_FILES.items():
-            df = self.load_csv_file(file_name, file_type)
+        self.integrity_profilers[file_type] = profiler
+        self.parse_reports[file_type] = {
+            **report, 'skipped_lines': skipped_lines,
+            'integrity': profiler.report(skipped_lines)
+        }
+        for skipped in skipped_lines:
+            LOGGER.warning(f"{file_name}: riga {skipped['line']} scartata ({skipped['reason']})")
+    
+    @staticmethod
+    def _typed_frame_builder(file_type: str):
+        """Builder colonnare del modello corrispondente al tipo file (se esiste)"""
+        return {
+            'attivita': DataModelFactory.build_attivita_frame,
+            'timbrature': DataModelFactory.build_timbrature_frame,
+            'teamviewer_bait': lambda df: DataModelFactory.build_teamviewer_frame(df, is_bait=True),
+            'teamviewer_gruppo': lambda df: DataModelFactory.build_teamviewer_frame(df, is_bait=False),
+            'permessi': DataModelFactory.build_permessi_frame,
+            'auto': DataModelFactory.build_veicoli_frame,
+            'calendario': DataModelFactory.build_calendario_frame
+        }.get(file_type)
+    
+    @staticmethod
+    def _partition_keys(chunk: pd.DataFrame, file_type: str, by: str) -> pd.Series:
+        """Chiave di partizione per riga: data (giorno) o nome tecnico"""
+        date_column, technician_columns = STREAM_PARTITION_COLUMNS[file_type]
+        
+        if by == 'day':
+            dates = DataModelFactory.parse_italian_datetime_series(
+                DataModelFactory.column_values(chunk, date_column)
+            )
+            keys = dates.dt.date
+        else:
+            parts = [DataModelFactory.column_values(chunk, c).astype(str).str.strip() for c in technician_columns]
+            keys = parts[0].str.cat(parts[1:], sep=' ') if len(parts) > 1 else parts[0]
+            keys = keys.where(~DataModelFactory.null_mask(keys))
+        
+        return keys.astype(object).where(keys.notna(), None)
+    
+    def stream_partitions(self, file_name: str, file_type: str, by: str = 'day',
+                          chunksize: Optional[int] = None) -> Iterator[Tuple[Any, pd.DataFrame]]:
+        """
+        Restituisce partizioni tipizzate (per giorno o per tecnico) con memoria limitata.
+        Ogni blocco viene tipizzato e suddiviso su file di appoggio temporanei; a fine
+        lettura le partizioni vengono rilette una alla volta, ordinate per chiave
+        (righe senza chiave per ultime). Il picco di memoria è un blocco o una partizione,
+        indipendentemente dalla dimensione del file.
+        """
+        if by not in ('day', 'technician'):
+            raise ValueError(f"Partizionamento non supportato: {by}")
+        
+        builder = self._typed_frame_builder(file_type)
+        
+        with tempfile.TemporaryDirectory(prefix='bait_stream_') as spill_dir:
+            fragments: Dict[Any, List[str]] = {}
+            
+            for chunk in self.iter_csv_chunks(file_name, file_type, chunksize):
+                keys = self._partition_keys(chunk, file_type, by)
+                typed = builder(chunk) if builder else chunk
+                
+                for key, part in typed.groupby(keys, sort=False, dropna=False):
+                    key = None if pd.isna(key) else key
+                    path = os.path.join(spill_dir, f"{sum(map(len, fragments.values()))}.pkl")
+                    part.to_pickle(path)
+                    fragments.setdefault(key, []).append(path)
+            
+            for key in sorted(fragments, key=lambda k: (k is None, k if k is not None else '')):
+                paths = fragments.pop(key)
+                partition = pd.concat([pd.read_pickle(path) for path in paths])
+                for path in paths:
+                    os.remove(path)
+                yield key, partition
+    
+    def _load_timed(self, file_name: str, file_type: str,
+                    columns: SourceColumns = None) -> Optional[pd.DataFrame]:
+        """Carica un file registrandone il tempo di caricamento"""
+        start_time = time.perf_counter()
+        try:
+            return self.load_csv_file(file_name, file_type, columns)
+        finally:
+            self.load_timings[file_type] = int((time.perf_counter() - start_time) * 1000)
+    
+    def load_all_data(self, executor: Optional[str] = None,
+                      max_workers: Optional[int] = None,
+                      sources: Optional[RuleSources] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Carica i file CSV configurati.
+        executor: 'sequential', 'thread' o 'process' (default CONFIG.INGESTION_EXECUTOR);
+        i file sono indipendenti, un file fallito non blocca gli altri.
+        sources: fonti e colonne richieste dalle regole selezionate (required_sources degli
+        engine); None = tutti i file con tutte le colonne.
+        """
+        executor = executor or CONFIG.INGESTION_EXECUTOR
+        max_workers = max_workers or CONFIG.INGESTION_WORKERS
+        files = {
+            file_type: file_name for file_type, file_name in CONFIG.CSV_FILES.items()
+            if sources is None or file_type in sources
+        }
+        columns = {file_type: sources.get(file_type) if sources else None for file_type in files}
+        LOGGER.info(f"Avvio caricamento dati CSV (modalità {executor}): {', '.join(files) or 'nessun file'}")
+        
+        results: Dict[str, Optional[pd.DataFrame]] = {}
+        
+        if executor == 'sequential' or max_workers <= 1:
+            for file_type, file_name in files.items():
+                results[file_type] = self._load_timed(file_name, file_type, columns[file_type])
+        
+        elif executor == 'thread':
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    pool.submit(self._load_timed, file_name, file_type, columns[file_type]): file_type
+                    for file_type, file_name in files.items()
+                }
+                for future in as_completed(futures):
+                    file_type = futures[future]
+                    try:
+                        results[file_type] = future.result()
+                    except Exception as e:
+                        LOGGER.error(f"Errore caricamento {file_type}: {e}")
+                        results[file_type] = None
+        
+        elif executor == 'process':
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    pool.submit(_load_file_in_worker, self.base_path, self.frame_cache is not None,
+                                file_name, file_type, columns[file_type]): file_type
+                    for file_type, file_name in files.items()
+                }
+                for future in as_completed(futures):
+                    file_type = futures[future]
+                    try:
+                        df, parse_report, encoding_entries, elapsed_ms, state, profiler = future.result()
+                    except Exception as e:
+                        LOGGER.error(f"Errore caricamento {file_type}: {e}")
+                        results[file_type] = None
+                        continue
+                    results[file_type] = df
+                    self.load_timings[file_type] = elapsed_ms
+                    if df is not None:
+                        self.data_cache[file_type] = df
+                        self.parse_reports[file_type] = parse_report
+                        # Stato incrementale e profilo del worker: unico scrittore il processo padre
+                        self._set_ingest_state(file_type, state)
+                        if profiler is not None:
+                            self.integrity_profilers[file_type] = profiler
+                    with self._encoding_cache_lock:
+                        self.encoding_cache.update(encoding_entries)
+            with self._encoding_cache_lock:
+                self._save_encoding_cache()
+        
+        else:
+            raise ValueError(f"Modalità ingestion non supportata: {executor}")
+        
+        # Ordine risultati stabile, come in CONFIG.CSV_FILES
+        loaded_data = {}
+        for file_type in files:
+            df = results.get(file_type)
             if df is not None:
                 loaded_data[file_type] = df
-                LOGGER.info(f"✓ {file_type}: {len(df)} record caricati")
+                LOGGER.info(f"✓ {file_type}: {len(df)} record caricati ({self.load_timings.get(file_type, 0)}ms)")
             else:
                 LOGGER.error(f"✗ {file_type}: caricamento fallito")
         
-        LOGGER.info(f"Caricamento completato: {len(loaded_data)}/{len(CONFIG.CSV_FILES)} file caricati")
+        loaded_data = self._finalize_loaded(loaded_data)
+        
+        # Profili di integrità dell'esecuzione nello storico qualità dati (nessuna rilettura dei file)
+        profiles = {
+            file_type: self.parse_reports[file_type]['integrity']
+            for file_type in loaded_data if 'integrity' in self.parse_reports.get(file_type, {})
+        }
+        if profiles and CONFIG.RECORD_INTEGRITY_HISTORY:
+            self.integrity_history.append(profiles, {'mode': executor})
+        
+        LOGGER.info(f"Caricamento completato: {len(loaded_data)}/{len(files)} file caricati")
         return loaded_data
     
+    def _finalize_loaded(self, loaded_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Passi comuni dopo il caricamento (da upload o da storico)"""
+        # Tecnici, clienti e categorie come categoriche su un vocabolario unico tra le fonti
+        loaded_data = categorize_frames(loaded_data)
+        self.data_cache.update(loaded_data)
+        
+        # Indice identità tecnici: ogni grafia delle fonti risolta in un ID stabile
+        TECHNICIANS.build_from_frames(loaded_data)
+        return loaded_data
+    
+    # STORICO PARTIZIONATO
+    
+    def load_data(self, date_range: Optional[Tuple[Optional[DateLike], Optional[DateLike]]] = None,
+                  sources: Optional[RuleSources] = None, archive: Optional[bool] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Punto di ingresso dei controller: senza intervallo carica gli upload correnti
+        (archiviandoli nello storico se richiesto), con intervallo legge solo le partizioni richieste.
+        sources: fonti e colonne dichiarate dalle regole da eseguire (None = tutto).
+        archive: archiviazione degli upload (None = CONFIG.HISTORY_ARCHIVE_ON_LOAD).
+        """
+        if date_range is not None:
+            return self.load_history(*date_range, sources=sources)
+        
+        loaded_data = self.load_all_data(sources=sources)
+        if archive is None:
+            archive = CONFIG.HISTORY_ARCHIVE_ON_LOAD
+        if loaded_data and archive:
+            # Solo i file caricati con tutte le colonne: lo storico resta completo
+            self.archive_history({
+                file_type: df for file_type, df in loaded_data.items()
+                if sources is None or sources.get(file_type) is None
+            })
+        return loaded_data
+    
+    def archive_history(self, data: Dict[str, pd.DataFrame]) -> Dict[str, List[str]]:
+        """Archivia i dati caricati nello storico, partizionati per data di riferimento della riga"""
+        written = {}
+        for file_type, df in data.items():
+            date_column = STREAM_PARTITION_COLUMNS[file_type][0]
+            dates = DataModelFactory.parse_italian_datetime_series(
+                DataModelFactory.column_values(df, date_column)
+            )
+            written[file_type] = self.history.write(file_type, df, dates)
+        return written
+    
+    def load_history(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                     sources: Optional[RuleSources] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Carica dallo storico le righe nell'intervallo [start, end] (estremi inclusi):
+        vengono lette solo le partizioni che lo intersecano, e dei soli file in sources.
+        """
+        LOGGER.info(f"Caricamento storico dal {start or 'inizio'} al {end or 'oggi'}...")
+        loaded_data = {}
+        for file_type in (sources if sources is not None else CONFIG.CSV_FILES):
+            df = self.history.read(file_type, start, end, sources.get(file_type) if sources else None)
+            if df is not None:
+                loaded_data[file_type] = df
+            else:
+                LOGGER.warning(f"Nessun dato storico per {file_type} nell'intervallo")
+        
+        return self._finalize_loaded(loaded_data)
+    
     def validate_data_integrity(self, data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
         """Valida integrità dei dati caricati"""
         validation_report = {
@@ -154,26 +955,57 @@ class DataIngestionEngine:
         }
         
         for file_type, df in data.items():
+            # Profilo calcolato in ingestion; dati da altre origini (es. storico) profilati ora
+            parse_report = self.parse_reports.get(file_type, {})
+            integrity = parse_report.get('integrity') or profile_frame(file_type, df)
+            
             file_status = {
                 'records': len(df),
                 'columns': len(df.columns),
-                'empty_records': df.isnull().all(axis=1).sum(),
-                'duplicate_records': df.duplicated().sum()
+                'empty_records': integrity['empty_rows'],
+                'duplicate_records': issue_total(integrity['duplicate_keys']),
+                'integrity': integrity
             }
             
+            if file_type in self.load_timings:
+                file_status['load_time_ms'] = self.load_timings[file_type]
+            
+            # Righe scartate dal parser CSV
+            skipped_lines = parse_report.get('skipped_lines', [])
+            file_status['parse_engine'] = parse_report.get('engine')
+            file_status['skipped_lines'] = skipped_lines
+            if skipped_lines:
+                validation_report['data_issues'].append(
+                    f"{file_type}: {len(skipped_lines)} righe malformate scartate "
+                    f"(righe {', '.join(str(s['line']) for s in skipped_lines[:10])})"
+                )
+            
             # Check specifici per tipo file
             if file_type == 'attivita':
-                missing_tickets = df['Id Ticket'].isnull().sum()
+                missing_tickets = integrity['null_counts'].get('Id Ticket', 0)
                 if missing_tickets > 0:
                     validation_report['data_issues'].append(f"attivita.csv: {missing_tickets} record senza ID Ticket")
             
             elif file_type == 'timbrature':
-                missing_times = df[['ora inizio', 'ora fine']].isnull().any(axis=1).sum()
+                missing_times = integrity['missing_interval']
                 if missing_times > 0:
                     validation_report['data_issues'].append(f"timbrature.csv: {missing_times} record senza orari")
             
+            # Anomalie del profilo di integrità
+            for label, total in (
+                ('date non interpretabili', issue_total(integrity['unparsable_dates'])),
+                ('durate non interpretabili', issue_total(integrity.get('unparsable_durations', {}))),
+                ('valori ore non validi o fuori range', issue_total(integrity['hours_out_of_range'])),
+                ('intervalli con fine precedente all\'inizio', integrity['end_before_start']['count'])
+            ):
+                if total > 0:
+                    validation_report['data_issues'].append(f"{file_type}: {total} {label}")
+            
             validation_report['files_status'][file_type] = file_status
         
+        # Celle non interpretate dai parser condivisi (pulizia e modelli) nel processo corrente
+        validation_report['parse_failures'] = PARSE_FAILURES.snapshot()
+        
         LOGGER.info(f"Validazione completata: {validation_report['total_records']} record totali")
         
         if validation_report['data_issues']:
@@ -182,6 +1014,21 @@ class DataIngestionEngine:
         
         return validation_report
 
+def _load_file_in_worker(base_path: str, use_cache: bool, file_name: str, file_type: str,
+                         columns: SourceColumns = None):
+    """
+    Caricamento singolo file in un processo worker (load_all_data modalità 'process').
+    Il worker non persiste lo stato incrementale: voce e profilo tornano al padre.
+    """
+    engine = DataIngestionEngine(base_path, use_cache=use_cache)
+    engine.ingest_state_path = None
+    df = engine._load_timed(file_name, file_type, columns)
+    state = engine.ingest_state.get(file_type)
+    if state is not None:
+        state = {key: value for key, value in state.items() if key != 'hasher'}
+    return (df, engine.parse_reports.get(file_type, {}), engine.encoding_cache, engine.load_timings[file_type],
+            state, engine.integrity_profilers.get(file_type))
+
 # Funzione di utilità per uso standalone
 def load_bait_data(base_path: str = '.') -> Dict[str, pd.DataFrame]:
     """Funzione di convenienza per caricare tutti i dati BAIT"""
@@ -0,0 +1,164 @@
+"""
+BAIT Activity Controller - Event Index
+Indice condiviso (ID tecnico, giorno) -> record di ogni fonte ordinati per orario,
+costruito una volta dal controller; base della timeline per tecnico (event_timeline)
+"""
+
+from collections import defaultdict
+from dataclasses import fields
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Fonte del controller -> (campo orario di riferimento, campo fine per record su più giorni)
+SOURCE_TIME_FIELDS: Dict[str, Tuple[str, Optional[str]]] = {
+    'attivita': ('iniziata_il', None),
+    'timbrature': ('ora_inizio', None),
+    'sessioni_bait': ('data_sessione', None),
+    'sessioni_gruppo': ('data_sessione', None),
+    'permessi': ('data_inizio', 'data_fine'),
+    'utilizzo_veicoli': ('ora_presa', None),
+    'calendario': ('data_inizio', None)
+}
+
+Key = Tuple[str, date]
+
+
+def record_values(record: Any) -> tuple:
+    """Valori dei campi del modello (NaN/NaT come None), confrontabili tra due caricamenti"""
+    values = []
+    for model_field in fields(record):
+        value = getattr(record, model_field.name)
+        values.append(None if value is not None and value != value else value)
+    return tuple(values)
+
+
+def _same_records(left: List[Any], right: List[Any]) -> bool:
+    return len(left) == len(right) and all(
+        record_values(a) == record_values(b) for a, b in zip(left, right)
+    )
+
+
+class EventIndex:
+    """
+    Record per fonte raggruppati per (ID tecnico, giorno) e ordinati per orario
+    (ordinamento stabile). I record su più giorni (permessi) compaiono in ogni giorno
+    coperto. Chiavi e tecnici seguono l'ordine di prima comparsa nella fonte.
+    Record con tecnico ma senza orario sono tenuti a parte (undated); quelli senza
+    tecnico non sono indicizzati.
+    """
+
+    def __init__(self):
+        self._days: Dict[str, Dict[Key, List[Any]]] = {}
+        self._technicians: Dict[str, Dict[str, List[date]]] = {}
+        # Posizione di ogni record nella lista della fonte, per ricostruire l'ordine originale
+        self._positions: Dict[str, Dict[int, int]] = {}
+        self._undated: Dict[str, Dict[str, List[Any]]] = {}
+
+    @classmethod
+    def from_models(cls, processed_data: Dict[str, List[Any]]) -> 'EventIndex':
+        """Indice delle fonti presenti nei dati processati del controller"""
+        index = cls()
+        for source, records in processed_data.items():
+            if source in SOURCE_TIME_FIELDS:
+                index.add(source, records)
+        return index
+
+    def add(self, source: str, records: Iterable[Any]):
+        """Indicizza (o reindicizza) i record di una fonte"""
+        time_field, end_field = SOURCE_TIME_FIELDS[source]
+        buckets: Dict[Key, List[Any]] = defaultdict(list)
+        positions: Dict[int, int] = {}
+        undated: Dict[str, List[Any]] = {}
+        for position, record in enumerate(records):
+            tecnico_id = record.tecnico_id
+            start = getattr(record, time_field)
+            if not tecnico_id:
+                continue
+            positions[id(record)] = position
+            if not start:
+                undated.setdefault(tecnico_id, []).append(record)
+                continue
+            end = getattr(record, end_field) if end_field else None
+            day, last_day = start.date(), (end.date() if end and end.date() > start.date() else start.date())
+            while day <= last_day:
+                buckets[(tecnico_id, day)].append(record)
+                day += timedelta(days=1)
+
+        technicians: Dict[str, List[date]] = {}
+        for key, bucket in buckets.items():
+            bucket.sort(key=lambda record: getattr(record, time_field))
+            technicians.setdefault(key[0], []).append(key[1])
+
+        self._days[source] = dict(buckets)
+        self._technicians[source] = technicians
+        self._positions[source] = positions
+        self._undated[source] = undated
+
+    def updated(self, processed_data: Dict[str, List[Any]]) -> 'EventIndex':
+        """Copia dell'indice con le fonti indicate reindicizzate (le altre condivise)"""
+        index = EventIndex()
+        index._days, index._technicians = dict(self._days), dict(self._technicians)
+        index._positions, index._undated = dict(self._positions), dict(self._undated)
+        for source, records in processed_data.items():
+            if source in SOURCE_TIME_FIELDS:
+                index.add(source, records)
+        return index
+
+    def changed_keys(self, other: 'EventIndex', source: str) -> Set[Tuple[str, Optional[date]]]:
+        """
+        Chiavi (ID tecnico, giorno) con record della fonte diversi nei due indici
+        (giorno None per i record senza orario del tecnico)
+        """
+        old, new = self._days.get(source, {}), other._days.get(source, {})
+        changed = {key for key in old.keys() | new.keys() if not _same_records(old.get(key, []), new.get(key, []))}
+        old, new = self._undated.get(source, {}), other._undated.get(source, {})
+        changed.update((tecnico_id, None) for tecnico_id in old.keys() | new.keys()
+                       if not _same_records(old.get(tecnico_id, []), new.get(tecnico_id, [])))
+        return changed
+
+    def sources(self) -> List[str]:
+        """Fonti indicizzate"""
+        return list(self._days)
+
+    def get(self, source: str, tecnico_id: Optional[str], day: date) -> List[Any]:
+        """Record della fonte per tecnico e giorno (lista vuota se assenti)"""
+        return self._days.get(source, {}).get((tecnico_id, day), [])
+
+    def days(self, source: str) -> Iterable[Tuple[Key, List[Any]]]:
+        """Coppie ((ID tecnico, giorno), record) della fonte"""
+        return self._days.get(source, {}).items()
+
+    def technicians(self, source: str) -> List[str]:
+        """Tecnici con almeno un record nella fonte"""
+        return list(self._technicians.get(source, {}))
+
+    def technician_days(self, source: str, tecnico_id: Optional[str]) -> List[date]:
+        """Giorni con almeno un record del tecnico nella fonte"""
+        return self._technicians.get(source, {}).get(tecnico_id, [])
+
+    def undated_technicians(self, source: str) -> List[str]:
+        """Tecnici con record senza orario nella fonte"""
+        return list(self._undated.get(source, {}))
+
+    def undated(self, source: str, tecnico_id: Optional[str]) -> List[Any]:
+        """Record del tecnico senza orario, nell'ordine della fonte"""
+        return self._undated.get(source, {}).get(tecnico_id, [])
+
+    def position(self, source: str, record: Any) -> int:
+        """Posizione del record nella lista originale della fonte"""
+        return self._positions[source][id(record)]
+
+    def technicians_on(self, source: str, day: date) -> List[str]:
+        """Tecnici con almeno un record nella fonte nel giorno indicato"""
+        return [tecnico_id for tecnico_id in self.technicians(source) if (tecnico_id, day) in self._days[source]]
+
+    def for_technician(self, source: str, tecnico_id: Optional[str]) -> List[Any]:
+        """Record del tecnico su tutti i giorni, ordinati per orario (senza ripetizioni)"""
+        seen = set()
+        records = []
+        for day in sorted(self._technicians.get(source, {}).get(tecnico_id, [])):
+            for record in self._days[source][(tecnico_id, day)]:
+                if id(record) not in seen:
+                    seen.add(id(record))
+                    records.append(record)
+        return records
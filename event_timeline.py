@@ -0,0 +1,207 @@
+"""
+BAIT Activity Controller - Event Timeline
+Flusso di eventi per tecnico e giorno (attività, timbrature, sessioni TeamViewer,
+veicoli, calendario, permessi) ordinato per orario e percorso una sola volta:
+le regole sono visitatori che reagiscono agli eventi durante la scansione
+"""
+
+import heapq
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+from event_index import SOURCE_TIME_FIELDS, EventIndex
+
+# Ordine delle fonti a parità di orario nel flusso unificato
+SOURCE_ORDER = ('calendario', 'utilizzo_veicoli', 'timbrature', 'attivita',
+                'sessioni_bait', 'sessioni_gruppo', 'permessi')
+SOURCE_RANK = {source: rank for rank, source in enumerate(SOURCE_ORDER)}
+
+# Partizione (ID tecnico, giorno) che genera un alert; giorno None = record senza orario
+Partition = Tuple[str, Optional[date]]
+# Porzione di timeline: ID tecnico -> giorni inclusi (None = tutti; giorno None = record senza orario)
+Scope = Dict[str, Optional[Set[Optional[date]]]]
+
+
+def in_scope(partition: Partition, scope: Scope) -> bool:
+    """La partizione (tecnico, giorno) rientra nella porzione di timeline"""
+    tecnico_id, giorno = partition
+    return tecnico_id in scope and (scope[tecnico_id] is None or giorno in scope[tecnico_id])
+
+
+def expand_scope(scope: Scope, halo: int) -> Scope:
+    """Giorni della porzione estesi di halo giorni prima e dopo (record senza orario invariati)"""
+    if not halo:
+        return scope
+    return {
+        tecnico_id: None if giorni is None else {
+            giorno if giorno is None else giorno + timedelta(days=offset)
+            for giorno in giorni for offset in range(-halo, halo + 1)
+        }
+        for tecnico_id, giorni in scope.items()
+    }
+
+
+@dataclass(frozen=True)
+class TimelineEvent:
+    """Record di una fonte nella timeline (orario None per i record senza orario)"""
+    orario: Optional[datetime]
+    source: str
+    posizione: int
+    record: Any
+
+    @property
+    def giorno(self) -> Optional[date]:
+        """Giorno del riferimento orario del record"""
+        return self.orario.date() if self.orario else None
+
+
+class TechnicianDay:
+    """Eventi di un tecnico in un giorno, per fonte e come flusso unico ordinato per orario"""
+
+    def __init__(self, index: EventIndex, tecnico_id: str, giorno: date):
+        self.tecnico_id = tecnico_id
+        self.giorno = giorno
+        self._index = index
+        self._by_source: Dict[str, List[TimelineEvent]] = {}
+
+    def of(self, source: str) -> List[TimelineEvent]:
+        """Eventi della fonte nel giorno, ordinati per orario"""
+        if source not in self._by_source:
+            time_field = SOURCE_TIME_FIELDS[source][0]
+            self._by_source[source] = [
+                TimelineEvent(getattr(record, time_field), source, self._index.position(source, record), record)
+                for record in self._index.get(source, self.tecnico_id, self.giorno)
+            ]
+        return self._by_source[source]
+
+    def has_any(self, sources: Iterable[str]) -> bool:
+        """Il giorno contiene almeno un evento di una delle fonti"""
+        return any(self._index.get(source, self.tecnico_id, self.giorno) for source in sources)
+
+    @property
+    def events(self) -> List[TimelineEvent]:
+        """Flusso unico di tutte le fonti, ordinato per orario (a parità: fonte, posizione)"""
+        return list(heapq.merge(
+            *(self.of(source) for source in self._index.sources()),
+            key=lambda event: (event.orario, SOURCE_RANK.get(event.source, len(SOURCE_ORDER)), event.posizione)
+        ))
+
+
+class EventTimeline:
+    """
+    Timeline per tecnico sulle fonti del controller: giorni del tecnico in ordine
+    cronologico (unione su tutte le fonti) e record senza orario. Costruita una volta
+    sull'EventIndex e condivisa da tutte le regole.
+    """
+
+    def __init__(self, index: EventIndex, records: Optional[Dict[str, List[Any]]] = None,
+                 scope: Optional[Scope] = None):
+        self.index = index
+        self._records = records or {}
+        self.scope = scope
+
+    @classmethod
+    def from_models(cls, processed_data: Dict[str, List[Any]]) -> 'EventTimeline':
+        """Timeline delle fonti presenti nei dati processati del controller"""
+        sources = {source: records for source, records in processed_data.items() if source in SOURCE_TIME_FIELDS}
+        return cls(EventIndex.from_models(sources), sources)
+
+    def restrict(self, scope: Scope) -> 'EventTimeline':
+        """Vista sugli stessi indice e record limitata a tecnici e giorni indicati"""
+        return EventTimeline(self.index, self._records, scope)
+
+    def records(self, source: str) -> List[Any]:
+        """Record della fonte in ingresso, indicizzati o no (per le statistiche sui totali)"""
+        return self._records.get(source, [])
+
+    def technicians(self) -> List[str]:
+        """Tecnici con almeno un record in una fonte, in ordine di ID"""
+        if self.scope is not None:
+            return sorted(self.scope)
+        tecnici = set()
+        for source in self.index.sources():
+            tecnici.update(self.index.technicians(source))
+            tecnici.update(self.index.undated_technicians(source))
+        return sorted(tecnici)
+
+    def days(self, tecnico_id: str) -> List[TechnicianDay]:
+        """Giorni del tecnico in ordine cronologico"""
+        giorni = set()
+        for source in self.index.sources():
+            giorni.update(self.index.technician_days(source, tecnico_id))
+        if self.scope is not None and self.scope[tecnico_id] is not None:
+            giorni &= self.scope[tecnico_id]
+        return [TechnicianDay(self.index, tecnico_id, giorno) for giorno in sorted(giorni)]
+
+    def undated(self, tecnico_id: str) -> List[TimelineEvent]:
+        """Record del tecnico senza orario, per fonte e posizione"""
+        if self.scope is not None and self.scope[tecnico_id] is not None and None not in self.scope[tecnico_id]:
+            return []
+        return [
+            TimelineEvent(None, source, self.index.position(source, record), record)
+            for source in self.index.sources()
+            for record in self.index.undated(source, tecnico_id)
+        ]
+
+
+def scan_timeline(timeline: EventTimeline, visitors: Sequence[Any]) -> List[float]:
+    """
+    Scansione unica della timeline: per ogni tecnico start_technician, visit_day per i
+    giorni con eventi delle fonti del visitatore, visit_undated, end_technician; infine
+    finish. Restituisce il tempo in ms speso da ciascun visitatore.
+    """
+    elapsed = [0.0] * len(visitors)
+
+    def call(position: int, hook: str, *args):
+        start = time.perf_counter()
+        getattr(visitors[position], hook)(*args)
+        elapsed[position] += (time.perf_counter() - start) * 1000
+
+    for position in range(len(visitors)):
+        call(position, 'begin', timeline)
+
+    for tecnico_id in timeline.technicians():
+        for position in range(len(visitors)):
+            call(position, 'start_technician', tecnico_id)
+
+        for day in timeline.days(tecnico_id):
+            for position, visitor in enumerate(visitors):
+                if day.has_any(visitor.sources):
+                    call(position, 'visit_day', day)
+
+        for event in timeline.undated(tecnico_id):
+            for position, visitor in enumerate(visitors):
+                if event.source in visitor.sources:
+                    call(position, 'visit_undated', event)
+
+        for position in range(len(visitors)):
+            call(position, 'end_technician', tecnico_id)
+
+    for position in range(len(visitors)):
+        call(position, 'finish')
+    return elapsed
+
+
+def events_frame(events: Iterable[TimelineEvent], *fields: str) -> pd.DataFrame:
+    """
+    Vista tabellare degli eventi per le join vettoriali, una riga per evento nell'ordine
+    ricevuto: tecnico_id, giorno (del riferimento orario), posizione nella lista
+    originale, record (il modello) e i campi del modello richiesti.
+    """
+    events = list(events)
+    records = [event.record for event in events]
+    frame = pd.DataFrame({
+        'tecnico_id': pd.Series([record.tecnico_id for record in records], dtype=object),
+        'giorno': pd.to_datetime(pd.Series([event.giorno for event in events], dtype=object)),
+        'posizione': pd.Series([event.posizione for event in events], dtype='int64'),
+        'record': pd.Series(records, dtype=object)
+    })
+    for field in fields:
+        values = pd.Series([getattr(record, field) for record in records], dtype=object)
+        # Orari come datetime64 (None -> NaT), il resto invariato
+        is_datetime = pd.api.types.infer_dtype(values, skipna=True) in ('datetime', 'datetime64')
+        frame[field] = pd.to_datetime(values) if is_datetime else values
+    return frame
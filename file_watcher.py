@@ -6,6 +6,7 @@ Sistema monitoring automatico per processing real-time con:
 
 - File system monitoring per 7 CSV files (attivita.csv, timbrature.csv, etc.)
 - Background orchestrator per automatic data ingestion
+- Validazioni business incrementali sui soli giorni tecnico cambiati
 - Progress bars e notifications per processing status
 - WebSocket server per real-time communication <500ms
 - Error recovery e fallback logic
@@ -34,6 +35,8 @@ import subprocess
 from queue import Queue, Empty
 from dataclasses import dataclass, asdict
 
+from bait_controller import BAITActivityController
+
 # File monitoring
 try:
     from watchdog.observers import Observer
@@ -109,6 +112,8 @@ class AutoUpdateEngine:
         self.observer: Optional[Observer] = None
         self.websocket_clients: Set[websockets.WebSocketServerProtocol] = set()
         self.is_running = False
+        # Controller persistente tra i job: regole e stato di ingestione restano in memoria
+        self.controller: Optional[BAITActivityController] = None
         
         # Performance metrics
         self.metrics = {
@@ -344,8 +349,14 @@ class AutoUpdateEngine:
                 if file_path in self.monitored_files:
                     self.monitored_files[file_path].processing_status = 'processing'
             
-            # Esegui BAIT orchestrator
-            result = self._run_bait_orchestrator(job.file_paths, job.job_type)
+            if job.job_type == 'full_refresh':
+                # Rilancio completo dell'orchestrator, poi nuova valutazione completa delle regole
+                result = self._run_bait_orchestrator(job.file_paths, job.job_type)
+                if result.get('success', False):
+                    result['validations'] = self._refresh_validations(job.file_paths, job.job_type)
+            else:
+                # File modificati: solo i giorni tecnico cambiati, al posto del rilancio completo
+                result = self._refresh_validations(job.file_paths, job.job_type)
             
             if result and result.get('success', False):
                 job.status = 'completed'
@@ -466,6 +477,59 @@ class AutoUpdateEngine:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _refresh_validations(self, file_paths: List[str], job_type: str) -> Dict[str, Any]:
+        """
+        Aggiorna le validazioni business sul controller persistente: primo job e
+        full_refresh con valutazione completa, gli altri rivalutano solo i giorni
+        tecnico cambiati (refresh_business_validations). Alert e KPI aggiornati
+        sono salvati nel JSON per la dashboard (bait_dashboard_data_*.json).
+        
+        Args:
+            file_paths: Lista file modificati
+            job_type: Tipo job
+            
+        Returns:
+            Risultato con conteggi alert aggiunti, rimossi, invariati e giorni tecnico rivalutati
+        """
+        try:
+            if self.controller is None or job_type == 'full_refresh':
+                controller = BAITActivityController(self.base_path)
+                if not (controller.load_and_process_data() and controller.execute_business_validations()):
+                    return {'success': False, 'error': 'Validation failed'}
+                
+                self.controller = controller
+                validations = {
+                    'mode': 'full',
+                    'alerts_added': len(controller.incremental_rules.alerts()),
+                    'alerts_removed': 0,
+                    'alerts_unchanged': 0
+                }
+            else:
+                delta = self.controller.refresh_business_validations()
+                if delta is None:
+                    return {'success': False, 'error': 'Incremental validation failed'}
+                
+                validations = {
+                    'mode': 'incremental',
+                    'alerts_added': len(delta.added),
+                    'alerts_removed': len(delta.removed),
+                    'alerts_unchanged': len(delta.unchanged),
+                    'partitions_reevaluated': sum(delta.partitions.values())
+                }
+            
+            # KPI ricalcolati sugli alert correnti
+            self.controller.calculate_kpis()
+            return {
+                'success': True,
+                'processed_files': file_paths,
+                'export_file': self.controller.export_dashboard_json(),
+                **validations
+            }
+            
+        except Exception as e:
+            logger.error(f"Errore aggiornamento validazioni: {e}")
+            return {'success': False, 'error': str(e)}
+    
     def _create_result_summary(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Crea summary del risultato processing."""
         try:
@@ -475,6 +539,14 @@ class AutoUpdateEngine:
                 'files_processed': len(result.get('processed_files', []))
             }
             
+            # Validazioni business: del job (incrementale) o successive all'orchestrator (full_refresh)
+            validations = result.get('validations', result)
+            summary.update({
+                key: validations[key] for key in (
+                    'mode', 'alerts_added', 'alerts_removed', 'alerts_unchanged', 'partitions_reevaluated', 'export_file'
+                ) if key in validations
+            })
+            
             # Parse output se disponibile
             if result.get('output_file') and os.path.exists(result['output_file']):
                 try:
@@ -0,0 +1,133 @@
+"""
+BAIT Activity Controller - Frame Cache
+Cache persistente su disco dei DataFrame CSV puliti, indirizzata per contenuto
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from config import CONFIG, LOGGER
+from rule_sources import SourceColumns, select_columns
+
+# Parquet richiede pyarrow (dipendenza opzionale)
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    LOGGER.warning("PyArrow non disponibile - cache Parquet disabilitata")
+
+
+def content_hasher(data: bytes = b''):
+    """Hasher incrementale: permette di aggiornare l'hash con i soli byte aggiunti in coda"""
+    return hashlib.blake2b(data, digest_size=16)
+
+
+def content_hash(data: bytes) -> str:
+    """Hash di un contenuto già letto in memoria"""
+    return content_hasher(data).hexdigest()
+
+
+def file_content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """Hash del contenuto file (indipendente da nome e mtime)"""
+    digest = content_hasher()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FrameCache:
+    """
+    Cache Parquet dei DataFrame puliti.
+    La chiave combina tipo file, hash contenuto e versione schema di pulizia:
+    un file invariato viene riletto dalla cache, una modifica al file o alla
+    logica di pulizia invalida automaticamente la voce.
+    """
+
+    def __init__(self, cache_dir: str, schema_version: int = CONFIG.CLEANING_SCHEMA_VERSION):
+        self.cache_dir = cache_dir
+        self.schema_version = schema_version
+        self.enabled = PARQUET_AVAILABLE
+
+    def _entry_path(self, file_type: str, content_hash: str) -> str:
+        """Percorso della voce di cache"""
+        return os.path.join(
+            self.cache_dir, f"{file_type}_{content_hash}_v{self.schema_version}.parquet"
+        )
+
+    def get(self, file_type: str, content_hash: str,
+            columns: SourceColumns = None) -> Optional[pd.DataFrame]:
+        """Restituisce il DataFrame in cache o None (columns: solo le colonne dichiarate)"""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(file_type, content_hash)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            if columns is not None:
+                # Le voci contengono sempre il frame completo: proiezione in lettura
+                names = [name for name in pq.read_schema(path).names if not name.startswith('__index_level_')]
+                positions = select_columns(names, columns)
+                if positions is not None:
+                    return pd.read_parquet(path, columns=[names[position] for position in positions])
+            return pd.read_parquet(path)
+        except Exception as e:
+            LOGGER.warning(f"Voce cache illeggibile {path}, verrà rigenerata: {e}")
+            return None
+
+    def get_metadata(self, file_type: str, content_hash: str) -> Dict[str, Any]:
+        """Metadati salvati insieme alla voce (es. report di parsing)"""
+        path = self._entry_path(file_type, content_hash) + '.json'
+        if not self.enabled or not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def put(self, file_type: str, content_hash: str, df: pd.DataFrame,
+            metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Salva il DataFrame e rimuove le voci obsolete dello stesso tipo file"""
+        if not self.enabled:
+            return False
+
+        path = self._entry_path(file_type, content_hash)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if metadata is not None:
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    json.dump(metadata, file, default=str)
+                os.replace(tmp_path, path + '.json')
+
+            df.to_parquet(tmp_path)
+            # Scrittura atomica: orchestrator, file watcher e dashboard condividono la cache
+            os.replace(tmp_path, path)
+        except Exception as e:
+            LOGGER.warning(f"Impossibile salvare cache {file_type}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        self._prune(file_type, keep=os.path.basename(path))
+        return True
+
+    def _prune(self, file_type: str, keep: str):
+        """Elimina le versioni precedenti della voce per il tipo file"""
+        pattern = re.compile(rf"^{re.escape(file_type)}_[0-9a-f]+_v\d+\.parquet(\.json)?$")
+        for name in os.listdir(self.cache_dir):
+            if pattern.match(name) and name not in (keep, keep + '.json'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
@@ -0,0 +1,191 @@
+"""
+BAIT Activity Controller - History Store
+Storico partizionato per data (giorno o mese) dei dati puliti, con lettura
+limitata alle partizioni che intersecano l'intervallo richiesto
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple, Union
+
+import pandas as pd
+from config import CONFIG, LOGGER
+from frame_cache import PARQUET_AVAILABLE
+from rule_sources import SourceColumns, select_columns
+
+# Colonna interna con il giorno di riferimento della riga
+DAY_COLUMN = '_giorno'
+
+# Partizione per righe senza data valida (lette solo senza filtro temporale)
+UNDATED_PARTITION = 'undated'
+
+DateLike = Union[str, date, datetime, pd.Timestamp]
+
+PERIOD_FORMATS = {'day': '%Y-%m-%d', 'month': '%Y-%m'}
+
+
+def period_range(spec: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Intervallo di un periodo: '2025-08-15', '2025-08' (mese), '2025Q3' (trimestre), '2025'"""
+    period = pd.Period(spec)
+    return period.start_time.normalize(), period.end_time.normalize()
+
+
+def last_days_range(days: int, today: Optional[date] = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Ultimi N giorni, oggi incluso"""
+    end = pd.Timestamp(today or date.today()).normalize()
+    return end - timedelta(days=days - 1), end
+
+
+def resolve_date_range(start: Optional[str] = None, end: Optional[str] = None,
+                       period: Optional[str] = None,
+                       last_days: Optional[int] = None) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Intervallo richiesto da riga di comando (--dal/--al, --periodo, --ultimi-giorni); None = upload corrente"""
+    if period:
+        return period_range(period)
+    if last_days:
+        return last_days_range(last_days)
+    if start or end:
+        return (pd.Timestamp(start) if start else None, pd.Timestamp(end) if end else None)
+    return None
+
+
+def add_date_range_arguments(parser):
+    """Opzioni comuni ai controller per l'analisi di un intervallo dallo storico"""
+    parser.add_argument('--dal', help="Data iniziale (YYYY-MM-DD) dallo storico")
+    parser.add_argument('--al', help="Data finale (YYYY-MM-DD) dallo storico")
+    parser.add_argument('--periodo', help="Periodo dallo storico: '2025-08', '2025Q3', '2025-08-15'")
+    parser.add_argument('--ultimi-giorni', type=int, help="Ultimi N giorni dallo storico")
+    parser.add_argument('--archivia', action='store_true', default=None,
+                        help="Archivia nello storico gli upload correnti caricati")
+
+
+class HistoryStore:
+    """
+    Storico su disco: {root}/{file_type}/{periodo}.parquet, un file per giorno o mese.
+    Scrivere un giorno sostituisce solo le righe di quel giorno; leggere un intervallo
+    apre solo le partizioni che lo intersecano.
+    """
+
+    def __init__(self, root: str, granularity: str = CONFIG.HISTORY_GRANULARITY):
+        if granularity not in PERIOD_FORMATS:
+            raise ValueError(f"Granularità storico non supportata: {granularity}")
+        self.root = root
+        self.granularity = granularity
+        # Parquet se disponibile, altrimenti pickle (stessa semantica, nessuna dipendenza)
+        self.extension = '.parquet' if PARQUET_AVAILABLE else '.pkl'
+
+    # PARTIZIONI
+
+    def _partition_path(self, file_type: str, period: str) -> str:
+        return os.path.join(self.root, file_type, f"{period}{self.extension}")
+
+    def partitions(self, file_type: str) -> List[str]:
+        """Periodi presenti nello storico per il tipo file (ordinati)"""
+        directory = os.path.join(self.root, file_type)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[:-len(self.extension)] for name in os.listdir(directory)
+            if name.endswith(self.extension)
+        )
+
+    def _period_bounds(self, period: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        start = pd.Timestamp(datetime.strptime(period, PERIOD_FORMATS[self.granularity]))
+        if self.granularity == 'day':
+            return start, start
+        return start, (start + pd.offsets.MonthEnd(0)).normalize()
+
+    def _read_partition(self, path: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(path):
+            return None
+        if self.extension == '.parquet':
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def _write_partition(self, path: str, df: pd.DataFrame):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if self.extension == '.parquet':
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    # SCRITTURA
+
+    def write(self, file_type: str, df: pd.DataFrame, dates: pd.Series) -> List[str]:
+        """
+        Archivia il frame partizionandolo per data di riferimento (dates, allineata a df).
+        Per ogni giorno presente in df le righe già archiviate vengono sostituite;
+        gli altri giorni e le altre partizioni restano invariati. Le righe senza data
+        si accumulano: una riga già archiviata è sostituita solo da una riga identica.
+        """
+        # Schema stabile su disco: categoriche salvate come testo
+        categorical = [name for name in df.columns if isinstance(df[name].dtype, pd.CategoricalDtype)]
+        frame = df.astype({name: object for name in categorical}) if categorical else df
+        frame = frame.assign(**{DAY_COLUMN: pd.to_datetime(dates).dt.normalize()})
+
+        periods = frame[DAY_COLUMN].dt.strftime(PERIOD_FORMATS[self.granularity]).fillna(UNDATED_PARTITION)
+        written = []
+        for period, part in frame.groupby(periods, sort=True):
+            path = self._partition_path(file_type, period)
+            existing = self._read_partition(path)
+            if existing is not None and period == UNDATED_PARTITION:
+                # Nessun giorno da sostituire: chiave delle righe è il loro contenuto
+                merged = pd.concat([existing, part], ignore_index=True)
+                row_hashes = pd.util.hash_pandas_object(merged, index=False).to_numpy()
+                archived = row_hashes[:len(existing)]
+                existing = existing[~pd.Series(archived).isin(row_hashes[len(existing):]).to_numpy()]
+                part = pd.concat([existing, part], ignore_index=True)
+            elif existing is not None:
+                existing = existing[~existing[DAY_COLUMN].isin(part[DAY_COLUMN].unique())]
+                part = pd.concat([existing, part], ignore_index=True)
+
+            part = part.sort_values(DAY_COLUMN, kind='stable').reset_index(drop=True)
+            self._write_partition(path, part)
+            written.append(period)
+
+        LOGGER.info(f"Storico {file_type}: {len(written)} partizioni aggiornate")
+        return written
+
+    # LETTURA
+
+    def read(self, file_type: str, start: Optional[DateLike] = None,
+             end: Optional[DateLike] = None, columns: SourceColumns = None) -> Optional[pd.DataFrame]:
+        """
+        Legge le righe con giorno in [start, end] (estremi inclusi, None = aperto).
+        Solo le partizioni che intersecano l'intervallo vengono aperte.
+        columns: solo le colonne dichiarate dalle regole (None = tutte).
+        """
+        start_day = pd.Timestamp(start).normalize() if start is not None else None
+        end_day = pd.Timestamp(end).normalize() if end is not None else None
+        unbounded = start_day is None and end_day is None
+
+        selected = []
+        for period in self.partitions(file_type):
+            if period == UNDATED_PARTITION:
+                if unbounded:
+                    selected.append(period)
+                continue
+            period_start, period_end = self._period_bounds(period)
+            if (start_day is None or period_end >= start_day) and (end_day is None or period_start <= end_day):
+                selected.append(period)
+
+        if not selected:
+            return None
+
+        frames = [self._read_partition(self._partition_path(file_type, period)) for period in selected]
+        df = pd.concat(frames, ignore_index=True)
+
+        if not unbounded:
+            mask = pd.Series(True, index=df.index)
+            if start_day is not None:
+                mask &= df[DAY_COLUMN] >= start_day
+            if end_day is not None:
+                mask &= df[DAY_COLUMN] <= end_day
+            df = df[mask]
+
+        LOGGER.info(f"Storico {file_type}: {len(selected)} partizioni lette, {len(df)} righe")
+        df = df.drop(columns=[DAY_COLUMN]).reset_index(drop=True)
+        positions = select_columns(list(df.columns), columns)
+        return df if positions is None else df.iloc[:, positions]
@@ -0,0 +1,199 @@
+"""
+BAIT Activity Controller - Incremental Rules
+Rivalutazione incrementale delle regole: a ogni aggiornamento dei dati sono rivalutate
+solo le chiavi (tecnico, giorno) toccate, dalle sole regole che le leggono; gli alert
+ottenuti sono fusi con quelli precedenti (aggiunti, rimossi, invariati)
+"""
+
+import json
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from config import LOGGER
+from business_rules import BusinessRulesEngine, RuleVisitor, ValidationResult
+from business_rules_advanced import AdvancedBusinessRulesEngine
+from event_index import SOURCE_TIME_FIELDS
+from event_timeline import EventTimeline, Partition, Scope, expand_scope, in_scope, scan_timeline
+from models import Alert, AlertSeverity
+from rule_cache import RuleResultCache
+
+
+@dataclass
+class AlertEntry:
+    """Alert corrente di una regola con partizione e chiave di ordinamento"""
+    partition: Partition
+    sort_key: tuple
+    alert: Alert
+
+
+@dataclass
+class AlertDelta:
+    """Esito di un aggiornamento incrementale; partitions = giorni tecnico rivalutati per regola"""
+    added: List[Alert] = field(default_factory=list)
+    removed: List[Alert] = field(default_factory=list)
+    unchanged: List[Alert] = field(default_factory=list)
+    partitions: Dict[str, int] = field(default_factory=dict)
+
+
+def alert_signature(severity: AlertSeverity, tecnico: str, messaggio: str, categoria: str,
+                    dettagli: Dict[str, Any] = None) -> str:
+    """Contenuto dell'alert (argomenti di create_alert, senza ID e timestamp) per il confronto tra valutazioni"""
+    return json.dumps([severity.name, tecnico, messaggio, categoria, dettagli or {}], sort_keys=True, default=str)
+
+
+def rule_scope(keys: Iterable[Partition], visitor: RuleVisitor) -> Scope:
+    """Partizioni i cui alert della regola possono cambiare quando cambiano le chiavi indicate"""
+    scope: Scope = {}
+    for tecnico_id, giorno in keys:
+        if visitor.partition_scope == 'technician':
+            scope[tecnico_id] = None
+        elif scope.get(tecnico_id, set()) is not None:
+            scope.setdefault(tecnico_id, set()).add(giorno)
+    return expand_scope(scope, visitor.partition_halo)
+
+
+class IncrementalRuleEngine:
+    """
+    Regole core e avanzate con stato tra un caricamento e l'altro: evaluate esegue la
+    valutazione completa, update confronta i nuovi dati con l'indice precedente e
+    rivaluta, per ogni regola che legge le fonti cambiate, solo le partizioni
+    (tecnico, giorno) toccate su una vista ristretta della timeline. Gli alert invariati
+    conservano l'ID, quelli nuovi proseguono la numerazione del proprio engine.
+    Con una RuleResultCache anche la valutazione completa riusa i risultati delle
+    partizioni invariate calcolati in esecuzioni precedenti.
+    """
+
+    def __init__(self, core_engine: BusinessRulesEngine, advanced_engine: AdvancedBusinessRulesEngine,
+                 target_date: datetime = None, result_cache: Optional[RuleResultCache] = None):
+        self.core_engine = core_engine
+        self.advanced_engine = advanced_engine
+        self.target_date = target_date
+        self.result_cache = result_cache
+        self.timeline: Optional[EventTimeline] = None
+        self._results: Dict[str, ValidationResult] = {}
+        self._entries: Dict[str, List[AlertEntry]] = {}
+
+    def visitors(self) -> List[RuleVisitor]:
+        """Nuovi visitatori delle regole core (BR001-BR004) e avanzate (BR005-BR007)"""
+        return self.core_engine.core_visitors(self.target_date) + self.advanced_engine.advanced_visitors()
+
+    def evaluate(self, processed_data: Dict[str, List[Any]], executor: Optional[str] = None,
+                 max_workers: Optional[int] = None) -> List[ValidationResult]:
+        """
+        Valutazione completa di tutte le regole, base per gli aggiornamenti successivi
+        (executor e max_workers di RuleScheduler, usati senza cache dei risultati)
+        """
+        timeline = EventTimeline.from_models(processed_data)
+        visitors = self.visitors()
+        if self.result_cache is not None:
+            results = self.result_cache.run(timeline, visitors)
+        else:
+            results = BusinessRulesEngine.run_visitors(timeline, visitors, executor, max_workers)
+
+        self.timeline = timeline
+        self._results = {result.rule_id: result for result in results}
+        # Alert in sospeso già ordinati da result(), allineati agli alert creati
+        self._entries = {
+            visitor.rule_id: [
+                AlertEntry(partition, sort_key, alert)
+                for (sort_key, _, partition), alert in zip(visitor.pending, result.alerts)
+            ]
+            for visitor, result in zip(visitors, results)
+        }
+        return results
+
+    def update(self, processed_data: Dict[str, List[Any]]) -> AlertDelta:
+        """
+        Aggiorna gli alert sui nuovi dati rivalutando solo le partizioni toccate
+        (senza una valutazione precedente: valutazione completa, tutti gli alert aggiunti)
+        """
+        if self.timeline is None:
+            results = self.evaluate(processed_data)
+            return AlertDelta(added=[alert for result in results for alert in result.alerts])
+
+        previous = self.timeline
+        sources = {source: processed_data.get(source, [])
+                   for source in set(previous.index.sources()) | set(processed_data)
+                   if source in SOURCE_TIME_FIELDS}
+        # Reindicizzate solo le liste nuove, confronto per chiave con l'indice precedente
+        reloaded = {source: records for source, records in sources.items()
+                    if records is not previous.records(source)}
+        index = previous.index.updated(reloaded)
+        touched = {source: previous.index.changed_keys(index, source) for source in reloaded}
+        self.timeline = EventTimeline(index, sources)
+
+        delta = AlertDelta()
+        for visitor in self.visitors():
+            keys = set().union(*(touched.get(source, set()) for source in visitor.sources))
+            scope = rule_scope(keys, visitor)
+            if not scope:
+                continue
+
+            # Timeline ristretta alle partizioni rivalutate più i giorni vicini letti dalla regola;
+            # gli alert delle partizioni di solo contesto sono scartati
+            start = time.perf_counter()
+            context = expand_scope(scope, visitor.partition_halo)
+            scan_timeline(self.timeline.restrict(context), [visitor])
+            self._merge(visitor, scope, delta)
+            self._results[visitor.rule_id].execution_time_ms = int((time.perf_counter() - start) * 1000)
+            delta.partitions[visitor.rule_id] = sum(
+                len(self.timeline.days(tecnico_id)) if giorni is None else len(giorni)
+                for tecnico_id, giorni in scope.items()
+            )
+
+        added = {id(alert) for alert in delta.added}
+        delta.unchanged = [alert for alert in self.alerts() if id(alert) not in added]
+        LOGGER.info(f"♻️ Aggiornamento incrementale: {sum(delta.partitions.values())} giorni tecnico rivalutati, "
+                    f"{len(delta.added)} alert aggiunti, {len(delta.removed)} rimossi, "
+                    f"{len(delta.unchanged)} invariati")
+        return delta
+
+    def _merge(self, visitor: RuleVisitor, scope: Scope, delta: AlertDelta):
+        """Sostituisce gli alert della regola nelle partizioni rivalutate, conservando gli invariati"""
+        kept, previous = [], defaultdict(deque)
+        for entry in self._entries[visitor.rule_id]:
+            if in_scope(entry.partition, scope):
+                alert = entry.alert
+                previous[alert_signature(alert.severity, alert.tecnico, alert.messaggio,
+                                         alert.categoria, alert.dettagli)].append(entry)
+            else:
+                kept.append(entry)
+
+        visitor.pending.sort(key=lambda item: item[0])
+        for sort_key, alert_args, partition in visitor.pending:
+            if not in_scope(partition, scope):
+                continue
+            matches: Deque[AlertEntry] = previous[alert_signature(*alert_args)]
+            if matches:
+                alert = matches.popleft().alert
+            else:
+                alert = visitor.engine.create_alert(*alert_args)
+                delta.added.append(alert)
+            kept.append(AlertEntry(partition, sort_key, alert))
+
+        delta.removed.extend(entry.alert for entries in previous.values() for entry in entries)
+        kept.sort(key=lambda entry: entry.sort_key)
+        self._entries[visitor.rule_id] = kept
+
+    def alerts(self) -> List[Alert]:
+        """Alert correnti, per regola nell'ordine dei visitatori"""
+        return [entry.alert for entries in self._entries.values() for entry in entries]
+
+    def results(self) -> List[ValidationResult]:
+        """
+        ValidationResult con gli alert correnti; stats dell'ultima valutazione completa,
+        tempi dell'ultima esecuzione di ciascuna regola
+        """
+        return [
+            ValidationResult(
+                rule_id=rule_id,
+                rule_name=result.rule_name,
+                alerts=[entry.alert for entry in self._entries[rule_id]],
+                stats=result.stats,
+                execution_time_ms=result.execution_time_ms
+            )
+            for rule_id, result in self._results.items()
+        ]
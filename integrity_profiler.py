@@ -0,0 +1,251 @@
+"""
+BAIT Activity Controller - Integrity Profiler
+Profilo di integrità calcolato durante l'ingestion in un solo passaggio sui blocchi
+letti: valori nulli, chiavi duplicate, date non interpretabili, ore fuori range e
+anomalie di riga. I profili di ogni esecuzione sono accodati a uno storico JSONL.
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from cleaning_schema import CLEANING_SCHEMAS, FileSchema, month_first_to_italian
+from config import CONFIG, LOGGER
+from parsers import (failure_mask, parse_duration_minutes_series, parse_hours_series,
+                     parse_italian_datetime_series)
+
+# Coppie (inizio, fine) per file: fine precedente all'inizio o estremo mancante sono anomalie di riga
+INTERVAL_COLUMNS: Dict[str, Tuple[str, str]] = {
+    'attivita': ('Iniziata il', 'Conclusa il'),
+    'timbrature': ('ora inizio', 'ora fine'),
+    'teamviewer_bait': ('Inizio', 'Fine'),
+    'teamviewer_gruppo': ('Inizio', 'Fine'),
+    'permessi': ('Data inizio', 'Data fine'),
+    'auto': ('Presa Data e Ora', 'Riconsegna Data e Ora'),
+    'calendario': ('Data e Ora inizio', 'Data e Ora fine')
+}
+
+
+class IntegrityProfiler:
+    """
+    Profilo incrementale di un file: update() su ogni blocco letto (file intero,
+    chunk in streaming o righe accodate), report() per il risultato serializzabile.
+    Colonne chiave, date e ore derivano dallo schema di pulizia del file.
+    """
+
+    def __init__(self, file_type: str, sample_size: int = CONFIG.INTEGRITY_SAMPLE_SIZE):
+        schema = CLEANING_SCHEMAS.get(file_type, FileSchema())
+        self.file_type = file_type
+        self.sample_size = sample_size
+        self.key_columns = [name for name, spec in schema.columns.items() if spec.kind == 'id']
+        self.date_columns = [name for name, spec in schema.columns.items() if spec.kind == 'datetime']
+        self.month_first_columns = {name for name, spec in schema.columns.items() if spec.month_first}
+        self.hours_columns = [
+            (name, spec.upper_bound) for name, spec in schema.columns.items() if spec.kind in ('numeric', 'hours')
+        ]
+        self.duration_columns = [name for name, spec in schema.columns.items() if spec.kind == 'duration']
+        self.interval = INTERVAL_COLUMNS.get(file_type)
+        self.control_pattern = re.compile(schema.drop_rows_pattern) if schema.drop_rows_pattern else None
+
+        self.rows = 0
+        self.columns: List[str] = []
+        self.null_counts: Dict[str, int] = {}
+        self.empty_rows = 0
+        self.control_rows = 0
+        self.missing_interval = 0
+        self.end_before_start: Dict[str, Any] = self._issue()
+        self.duplicate_keys: Dict[str, Dict[str, Any]] = {}
+        self.unparsable_dates: Dict[str, Dict[str, Any]] = {}
+        self.unparsable_durations: Dict[str, Dict[str, Any]] = {}
+        self.hours_out_of_range: Dict[str, Dict[str, Any]] = {}
+        self._seen_keys: Dict[str, set] = {name: set() for name in self.key_columns}
+
+    @staticmethod
+    def _issue(count: int = 0, samples: Optional[list] = None) -> Dict[str, Any]:
+        return {'count': count, 'samples': list(samples or [])}
+
+    def _record(self, issues: Dict[str, Dict[str, Any]], column: str, mask: pd.Series, values: pd.Series):
+        """Accumula conteggio ed esempi (riga, valore) delle celle marcate"""
+        count = int(mask.sum())
+        if not count:
+            return
+        issue = issues.setdefault(column, self._issue())
+        issue['count'] += count
+        room = self.sample_size - len(issue['samples'])
+        if room > 0:
+            issue['samples'].extend(
+                {'row': int(row), 'value': str(value)} for row, value in values[mask].head(room).items()
+            )
+
+    def update(self, chunk: pd.DataFrame):
+        """Aggiorna il profilo con un blocco di righe grezze (prima della pulizia)"""
+        if chunk.empty:
+            return
+
+        self.rows += len(chunk)
+        self.columns.extend(name for name in chunk.columns if name not in self.columns)
+
+        # Una sola maschera dei nulli per conteggi per colonna e righe vuote
+        nulls = chunk.isna()
+        for name, count in nulls.sum().items():
+            if count:
+                self.null_counts[name] = self.null_counts.get(name, 0) + int(count)
+        self.empty_rows += int(nulls.all(axis=1).sum())
+
+        if self.control_pattern is not None:
+            first_column = chunk.iloc[:, 0]
+            self.control_rows += int(first_column.str.contains(self.control_pattern, na=False).sum())
+
+        # Chiavi duplicate, anche tra blocchi diversi
+        for name in self.key_columns:
+            if name not in chunk.columns:
+                continue
+            keys = chunk[name].dropna()
+            seen = self._seen_keys[name]
+            duplicated = keys.duplicated() | keys.isin(seen)
+            self._record(self.duplicate_keys, name, duplicated, keys)
+            seen.update(keys.unique())
+
+        parsed_dates = {}
+        for name in self.date_columns:
+            if name not in chunk.columns:
+                continue
+            values = chunk[name]
+            # Le anomalie finiscono nel profilo: nessun log per cella dai parser
+            italian = month_first_to_italian(values) if name in self.month_first_columns else values
+            parsed = parse_italian_datetime_series(italian, report=False)
+            parsed_dates[name] = parsed
+            self._record(self.unparsable_dates, name, failure_mask(values, parsed), values)
+
+        for name in self.duration_columns:
+            if name in chunk.columns:
+                values = chunk[name]
+                minutes = parse_duration_minutes_series(values, report=False)
+                self._record(self.unparsable_durations, name, failure_mask(values, minutes), values)
+
+        for name, upper_bound in self.hours_columns:
+            if name not in chunk.columns:
+                continue
+            values = chunk[name]
+            hours = parse_hours_series(values, report=False)
+            invalid = values.notna() & (hours.isna() | (hours < 0))
+            if upper_bound is not None:
+                invalid |= hours >= upper_bound
+            self._record(self.hours_out_of_range, name, invalid, values)
+
+        if self.interval and all(name in parsed_dates for name in self.interval):
+            start, end = (parsed_dates[name] for name in self.interval)
+            self.missing_interval += int((start.isna() | end.isna()).sum())
+            reversed_rows = end < start
+            issue = self.end_before_start
+            issue['count'] += int(reversed_rows.sum())
+            room = self.sample_size - len(issue['samples'])
+            if room > 0:
+                issue['samples'].extend(int(row) for row in chunk.index[reversed_rows][:room])
+
+    def seed_keys(self, frame: pd.DataFrame):
+        """Registra le chiavi già caricate (ripresa del profilo su righe accodate)"""
+        for name in self.key_columns:
+            if name in frame.columns:
+                self._seen_keys[name].update(frame[name].dropna().unique())
+
+    @classmethod
+    def resume(cls, file_type: str, report: Dict[str, Any], frame: pd.DataFrame) -> 'IntegrityProfiler':
+        """Profilatore che prosegue un report salvato (es. da cache) sul frame già in memoria"""
+        profiler = cls(file_type)
+        profiler.rows = report.get('rows', 0)
+        profiler.columns = list(report.get('columns', []))
+        profiler.null_counts = dict(report.get('null_counts', {}))
+        profiler.empty_rows = report.get('empty_rows', 0)
+        profiler.control_rows = report.get('control_rows', 0)
+        profiler.missing_interval = report.get('missing_interval', 0)
+        profiler.end_before_start = dict(report.get('end_before_start', cls._issue()))
+        for attribute in ('duplicate_keys', 'unparsable_dates', 'unparsable_durations', 'hours_out_of_range'):
+            setattr(profiler, attribute, {
+                name: cls._issue(issue['count'], issue['samples'])
+                for name, issue in report.get(attribute, {}).items()
+            })
+        profiler.seed_keys(frame)
+        return profiler
+
+    def report(self, skipped_lines: Optional[list] = None) -> Dict[str, Any]:
+        """Profilo serializzabile (JSON) del file"""
+        return {
+            'rows': self.rows,
+            'columns': list(self.columns),
+            'null_counts': dict(self.null_counts),
+            'empty_rows': self.empty_rows,
+            'control_rows': self.control_rows,
+            'missing_interval': self.missing_interval,
+            'end_before_start': {
+                'count': self.end_before_start['count'],
+                'samples': list(self.end_before_start['samples'])
+            },
+            'duplicate_keys': {name: dict(issue) for name, issue in self.duplicate_keys.items()},
+            'unparsable_dates': {name: dict(issue) for name, issue in self.unparsable_dates.items()},
+            'unparsable_durations': {name: dict(issue) for name, issue in self.unparsable_durations.items()},
+            'hours_out_of_range': {name: dict(issue) for name, issue in self.hours_out_of_range.items()},
+            'skipped_lines': len(skipped_lines or [])
+        }
+
+
+def profile_frame(file_type: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """Profilo di un DataFrame già in memoria (dati non passati dall'ingestion CSV)"""
+    profiler = IntegrityProfiler(file_type)
+    profiler.update(df)
+    return profiler.report()
+
+
+def issue_total(issues: Dict[str, Dict[str, Any]]) -> int:
+    """Totale celle segnalate su tutte le colonne"""
+    return sum(issue['count'] for issue in issues.values())
+
+
+class IntegrityHistory:
+    """Storico dei profili di integrità: una riga JSON per esecuzione"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, profiles: Dict[str, Dict[str, Any]], run_info: Optional[Dict[str, Any]] = None):
+        """Accoda i profili dell'esecuzione corrente"""
+        record = {'timestamp': datetime.now().isoformat(timespec='seconds'), **(run_info or {}),
+                  'files': profiles}
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(record, default=str) + '\n')
+        except OSError as e:
+            LOGGER.warning(f"Impossibile salvare il profilo di integrità: {e}")
+
+    def runs(self) -> Iterable[Dict[str, Any]]:
+        """Esecuzioni registrate, dalla più vecchia"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def trends(self) -> pd.DataFrame:
+        """Andamento qualità dati: una riga per (esecuzione, file) con i totali per categoria"""
+        rows = [
+            {
+                'timestamp': pd.Timestamp(run['timestamp']),
+                'file_type': file_type,
+                'rows': profile['rows'],
+                'null_cells': sum(profile['null_counts'].values()),
+                'empty_rows': profile['empty_rows'],
+                'duplicate_keys': issue_total(profile['duplicate_keys']),
+                'unparsable_dates': issue_total(profile['unparsable_dates']),
+                'unparsable_durations': issue_total(profile.get('unparsable_durations', {})),
+                'hours_out_of_range': issue_total(profile['hours_out_of_range']),
+                'end_before_start': profile['end_before_start']['count'],
+                'skipped_lines': profile['skipped_lines']
+            }
+            for run in self.runs() for file_type, profile in run['files'].items()
+        ]
+        return pd.DataFrame(rows)
@@ -0,0 +1,145 @@
+"""
+BAIT Activity Controller - Interval Overlap
+Rilevamento sovrapposizioni tra intervalli [inizio, fine) con un unico ordinamento
+e ricerca binaria: O(n log n + k) invece del confronto di tutte le coppie
+"""
+
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+NS_PER_MINUTE = 60 * 10**9
+
+# Relazioni supportate da interval_join
+JOIN_PREDICATES = ('overlap', 'within', 'any')
+
+
+def _as_datetime64(values) -> np.ndarray:
+    return np.asarray(pd.to_datetime(values), dtype='datetime64[ns]')
+
+
+def overlapping_pairs(starts, ends) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Coppie di intervalli sovrapposti (inizio1 < fine2 e inizio2 < fine1).
+
+    Gli intervalli vengono ordinati una volta per inizio (ordinamento stabile); per
+    ciascuno, i successivi che iniziano prima della sua fine formano un blocco contiguo
+    trovato con searchsorted. Intervalli con estremi mancanti sono ignorati.
+
+    Restituisce (primo, secondo, minuti_sovrapposizione): posizioni negli array di
+    ingresso, ordinate come il confronto "ogni attività con le successive" sugli
+    intervalli ordinati per inizio.
+    """
+    starts = _as_datetime64(starts)
+    ends = _as_datetime64(ends)
+    empty = np.array([], dtype=np.int64)
+
+    valid = np.flatnonzero(~(np.isnat(starts) | np.isnat(ends)))
+    if len(valid) < 2:
+        return empty, empty, np.array([], dtype=float)
+
+    order = valid[np.argsort(starts[valid], kind='stable')]
+    sorted_starts = starts[order].astype(np.int64)
+    sorted_ends = ends[order].astype(np.int64)
+
+    # Blocco dei successivi che iniziano prima della fine dell'intervallo corrente
+    positions = np.arange(len(order))
+    block_end = np.searchsorted(sorted_starts, sorted_ends, side='left')
+    counts = np.maximum(block_end - positions - 1, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return empty, empty, np.array([], dtype=float)
+
+    left = np.repeat(positions, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    right = left + 1 + offsets
+
+    # Intervalli degeneri (fine <= inizio) nel blocco: la condizione va verificata anche sull'altro estremo
+    keep = sorted_ends[right] > sorted_starts[left]
+    left, right = left[keep], right[keep]
+
+    overlap_ns = np.minimum(sorted_ends[left], sorted_ends[right]) - np.maximum(sorted_starts[left], sorted_starts[right])
+    return order[left], order[right], overlap_ns / NS_PER_MINUTE
+
+
+def frame_overlaps(df: pd.DataFrame, start: str, end: str, by: Optional[str] = None) -> pd.DataFrame:
+    """
+    Sovrapposizioni tra le righe di un DataFrame (per gruppo se by è indicato).
+    Colonne: by (se presente), left, right (etichette di indice), overlap_minutes.
+    """
+    groups = df.groupby(by, observed=True, sort=True) if by is not None else [(None, df)]
+
+    frames = []
+    for key, group in groups:
+        first, second, minutes = overlapping_pairs(group[start], group[end])
+        if len(first) == 0:
+            continue
+        pairs = pd.DataFrame({
+            'left': group.index[first],
+            'right': group.index[second],
+            'overlap_minutes': minutes
+        })
+        if by is not None:
+            pairs.insert(0, by, key)
+        frames.append(pairs)
+
+    columns = ([by] if by is not None else []) + ['left', 'right', 'overlap_minutes']
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def interval_join(left: pd.DataFrame, right: pd.DataFrame, on: Union[str, Sequence[str]],
+                  left_interval: Tuple[str, str], right_interval: Tuple[str, str],
+                  how: str = 'overlap') -> pd.DataFrame:
+    """
+    Coppie di righe con la stessa chiave `on` filtrate per relazione tra intervalli.
+    Join di uguaglianza sulla chiave (pochi candidati per tecnico/giorno), poi metriche
+    e filtro calcolati in blocco su tutte le coppie.
+
+    how: 'overlap' (inizio1 < fine2 e inizio2 < fine1), 'within' (intervallo left
+    contenuto, estremi inclusi, in quello right), 'any' (tutte le coppie della chiave).
+    Intervalli puntuali: stessa colonna come inizio e fine.
+
+    Colonne: left, right (etichette di indice), overlap_minutes (negativo = distanza tra
+    gli intervalli), start_gap_minutes (inizio right - inizio left), contained.
+    Ordine: per left e poi right, nell'ordine delle righe in ingresso.
+    """
+    if how not in JOIN_PREDICATES:
+        raise ValueError(f"Relazione non supportata: {how} (attese: {', '.join(JOIN_PREDICATES)})")
+    keys: List[str] = [on] if isinstance(on, str) else list(on)
+
+    def endpoints(frame: pd.DataFrame, interval: Tuple[str, str], side: str) -> pd.DataFrame:
+        start, end = interval
+        return pd.DataFrame({
+            **{key: frame[key].values for key in keys},
+            f'{side}_start': pd.to_datetime(frame[start]).values,
+            f'{side}_end': pd.to_datetime(frame[end]).values,
+            side: frame.index.values,
+            f'{side}_order': np.arange(len(frame))
+        })
+
+    pairs = endpoints(left, left_interval, 'left').merge(endpoints(right, right_interval, 'right'), on=keys)
+    pairs = pairs.dropna(subset=['left_start', 'left_end', 'right_start', 'right_end'])
+
+    left_start = pairs['left_start'].values.astype(np.int64)
+    left_end = pairs['left_end'].values.astype(np.int64)
+    right_start = pairs['right_start'].values.astype(np.int64)
+    right_end = pairs['right_end'].values.astype(np.int64)
+
+    contained = (right_start <= left_start) & (left_end <= right_end)
+    if how == 'overlap':
+        keep = (left_start < right_end) & (right_start < left_end)
+    elif how == 'within':
+        keep = contained
+    else:
+        keep = np.ones(len(pairs), dtype=bool)
+
+    order = np.lexsort((pairs['right_order'].values[keep], pairs['left_order'].values[keep]))
+    return pd.DataFrame({
+        'left': pairs['left'].values[keep][order],
+        'right': pairs['right'].values[keep][order],
+        'overlap_minutes': ((np.minimum(left_end, right_end) - np.maximum(left_start, right_start))[keep][order]
+                            / NS_PER_MINUTE),
+        'start_gap_minutes': (right_start - left_start)[keep][order] / NS_PER_MINUTE,
+        'contained': contained[keep][order]
+    })
@@ -14,6 +14,7 @@ from models import (
     UtilizzoVeicolo, PermessoTecnico, Alert, AlertSeverity, TipologiaAttivita
 )
 from config import CONFIG, LOGGER
+from technician_identity import TECHNICIANS
 
 @dataclass
 class TechnicianKPI:
@@ -56,17 +57,18 @@ class KPICalculator:
                                       timbrature: List[TimbraturaTecnico],
                                       tecnico: str) -> float:
         """Calcola efficienza tecnico (ore reportate / ore tracciate)"""
+        tecnico_id = TECHNICIANS.resolve(tecnico)
         
         # Ore reportate dalle attività
         ore_reportate = sum(
             att.durata_ore for att in attivita 
-            if att.tecnico == tecnico and att.durata_ore
+            if att.tecnico_id == tecnico_id and att.durata_ore
         )
         
         # Ore tracciate da timbrature
         ore_tracciate = sum(
             tim.ore_lavorate for tim in timbrature 
-            if tim.nome_completo == tecnico and tim.ore_lavorate
+            if tim.tecnico_id == tecnico_id and tim.ore_lavorate
         )
         
         if ore_tracciate == 0:
@@ -176,17 +178,18 @@ class KPICalculator:
                                  alerts: List[Alert]) -> TechnicianKPI:
         """Calcola KPI completi per singolo tecnico"""
         
-        # Filtra dati per tecnico
-        tech_attivita = [a for a in attivita if a.tecnico == tecnico]
-        tech_timbrature = [t for t in timbrature if t.nome_completo == tecnico]
-        tech_sessioni = [s for s in sessioni_tv if s.tecnico == tecnico]
-        tech_veicoli = [v for v in utilizzo_veicoli if v.dipendente == tecnico]
-        tech_alerts = [al for al in alerts if al.tecnico == tecnico]
+        # Filtra dati per ID tecnico (stessa persona con grafie diverse tra le fonti)
+        tecnico_id = TECHNICIANS.resolve(tecnico)
+        tech_attivita = [a for a in attivita if a.tecnico_id == tecnico_id]
+        tech_timbrature = [t for t in timbrature if t.tecnico_id == tecnico_id]
+        tech_sessioni = [s for s in sessioni_tv if s.tecnico_id == tecnico_id]
+        tech_veicoli = [v for v in utilizzo_veicoli if v.tecnico_id == tecnico_id]
+        tech_alerts = [al for al in alerts if al.tecnico_id == tecnico_id]
         
         # Calcoli base
         ore_reportate = sum(a.durata_ore for a in tech_attivita if a.durata_ore)
         ore_tracciate = sum(t.ore_lavorate for t in tech_timbrature if t.ore_lavorate)
-        efficienza = self.calculate_technician_efficiency(attivita, timbrature, tecnico)
+        efficienza = self.calculate_technician_efficiency(tech_attivita, tech_timbrature, tecnico)
         
         # Conteggi attività
         attivita_remote = sum(1 for a in tech_attivita if a.tipologia == TipologiaAttivita.REMOTO)
@@ -205,7 +208,7 @@ class KPICalculator:
         )
         
         return TechnicianKPI(
-            nome=tecnico,
+            nome=TECHNICIANS.name(tecnico_id) or tecnico,
             ore_reportate=ore_reportate,
             ore_tracciate=ore_tracciate,
             efficienza_percentuale=efficienza,
@@ -227,10 +230,10 @@ class KPICalculator:
                              alerts: List[Alert]) -> SystemKPI:
         """Calcola KPI di sistema aggregati"""
         
-        # Tecnici unici
+        # Tecnici unici (per ID)
         tecnici = set()
-        tecnici.update(a.tecnico for a in attivita if a.tecnico)
-        tecnici.update(t.nome_completo for t in timbrature if t.nome_completo != "Unknown")
+        tecnici.update(a.tecnico_id for a in attivita if a.tecnico_id)
+        tecnici.update(t.tecnico_id for t in timbrature if t.tecnico_id)
         tecnici_totali = len(tecnici)
         
         # Ore totali
@@ -238,8 +241,8 @@ class KPICalculator:
         
         # Efficienza media
         efficienze = []
-        for tecnico in tecnici:
-            eff = self.calculate_technician_efficiency(attivita, timbrature, tecnico)
+        for tecnico_id in tecnici:
+            eff = self.calculate_technician_efficiency(attivita, timbrature, TECHNICIANS.name(tecnico_id))
             if eff > 0:
                 efficienze.append(eff)
         efficienza_media = statistics.mean(efficienze) if efficienze else 0.0
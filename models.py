@@ -5,10 +5,15 @@ Modelli dati con validazione per sistema di controllo attività
 
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import cached_property
 from typing import Optional, List, Dict, Any
 from enum import Enum
+import numpy as np
 import pandas as pd
-from config import LOGGER
+from config import CONFIG, LOGGER
+from technician_identity import TECHNICIANS
+from vocabulary import VOCABULARY
+import parsers
 
 class TipologiaAttivita(Enum):
     """Tipologie di attività tecnico"""
@@ -42,6 +47,11 @@ class AttivitaTecnico:
     descrizione: Optional[str] = None
     durata_ore: Optional[float] = None
     creato_da: Optional[str] = None
+    tecnico_id: Optional[str] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        if self.tecnico_id is None:
+            self.tecnico_id = TECHNICIANS.resolve(self.creato_da)
     
     @property
     def durata_minuti(self) -> Optional[int]:
@@ -70,10 +80,15 @@ class TimbraturaTecnico:
     indirizzo_start: Optional[str] = None
     indirizzo_end: Optional[str] = None
     descrizione: Optional[str] = None
+    tecnico_id: Optional[str] = field(default=None, repr=False)
     
-    @property
+    def __post_init__(self):
+        if self.tecnico_id is None:
+            self.tecnico_id = TECHNICIANS.resolve_parts(self.dipendente_nome, self.dipendente_cognome)
+    
+    @cached_property
     def nome_completo(self) -> str:
-        """Nome completo tecnico"""
+        """Nome completo tecnico (calcolato una sola volta)"""
         if self.dipendente_nome and self.dipendente_cognome:
             return f"{self.dipendente_nome} {self.dipendente_cognome}"
         return "Unknown"
@@ -96,6 +111,11 @@ class SessioneTeamViewer:
     utente: Optional[str] = None
     codice_sessione: Optional[str] = None
     cliente: Optional[str] = None
+    tecnico_id: Optional[str] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        if self.tecnico_id is None:
+            self.tecnico_id = TECHNICIANS.resolve(self.tecnico)
     
     @property
     def tecnico(self) -> Optional[str]:
@@ -111,6 +131,11 @@ class PermessoTecnico:
     data_fine: Optional[datetime] = None
     stato: StatoPermesso = StatoPermesso.UNKNOWN
     ore_permesso: Optional[float] = None
+    tecnico_id: Optional[str] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        if self.tecnico_id is None:
+            self.tecnico_id = TECHNICIANS.resolve(self.dipendente)
 
 @dataclass
 class UtilizzoVeicolo:
@@ -120,6 +145,11 @@ class UtilizzoVeicolo:
     ora_presa: Optional[datetime] = None
     ora_riconsegna: Optional[datetime] = None
     cliente: Optional[str] = None
+    tecnico_id: Optional[str] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        if self.tecnico_id is None:
+            self.tecnico_id = TECHNICIANS.resolve(self.dipendente)
     
     @property
     def durata_minuti(self) -> Optional[int]:
@@ -138,6 +168,11 @@ class AppuntamentoCalendario:
     data_fine: Optional[datetime] = None
     tecnico: Optional[str] = None
     descrizione: Optional[str] = None
+    tecnico_id: Optional[str] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        if self.tecnico_id is None:
+            self.tecnico_id = TECHNICIANS.resolve(self.tecnico)
 
 @dataclass
 class Alert:
@@ -149,6 +184,15 @@ class Alert:
     timestamp: datetime
     dettagli: Dict[str, Any] = field(default_factory=dict)
     categoria: Optional[str] = None
+    # Codici interi dal vocabolario condiviso (confronti e raggruppamenti senza stringhe)
+    tecnico_code: Optional[int] = field(default=None, repr=False)
+    categoria_code: Optional[int] = field(default=None, repr=False)
+    tecnico_id: Optional[str] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        self.tecnico_id = TECHNICIANS.resolve(self.tecnico)
+        self.tecnico_code = VOCABULARY.code('tecnico', self.tecnico)
+        self.categoria_code = VOCABULARY.code('categoria', self.categoria)
     
     def to_dict(self) -> Dict[str, Any]:
         """Converte alert in dizionario per export"""
@@ -166,6 +210,34 @@ class Alert:
 class DataModelFactory:
     """Factory per creare modelli dati da DataFrame"""
     
+    # Formati data italiani (configurazione) e valori equivalenti a cella vuota (condivisi con parsers)
+    DATE_FORMATS = CONFIG.DATE_FORMATS
+    NULL_STRINGS = parsers.NULL_STRINGS
+    
+    # Colonne sorgente lette dai frame tipizzati (nomi o prefissi, come in find_column)
+    _TEAMVIEWER_COLUMNS = (
+        'data sessione', 'Inizio', 'durata', 'Durata', 'assegnatario', 'Assegnatario',
+        'utente', 'Utente', 'computer', 'Computer', 'Nome', 'codice sessione', 'Codice', 'ID', 'cliente'
+    )
+    SOURCE_COLUMNS = {
+        'attivita': ('Contratto', 'Id Ticket', 'Iniziata il', 'Conclusa il', 'Azienda',
+                     'Tipologia Attivit', 'Descrizione', 'Durata', 'Creato da'),
+        'timbrature': ('dipendente nome', 'dipendente cognome', 'cliente nome', 'cliente indirizzo',
+                       'cliente citt', 'ora inizio', 'ora fine', 'ore', 'indirizzo start',
+                       'indirizzo end', 'descrizione attivit'),
+        'teamviewer_bait': _TEAMVIEWER_COLUMNS,
+        'teamviewer_gruppo': _TEAMVIEWER_COLUMNS,
+        'permessi': ('Dipendente', 'Tipo', 'Data inizio', 'Data fine', 'Stato', 'Ore'),
+        'auto': ('Dipendente', 'Auto', 'Presa Data e Ora', 'Riconsegna Data e Ora', 'Cliente'),
+        'calendario': ('Cliente', 'Dove', 'Data e Ora inizio', 'Data e Ora fine', 'Dipendente',
+                       'Descrizione', 'Note')
+    }
+    
+    @staticmethod
+    def model_sources(*file_types: str) -> Dict[str, tuple]:
+        """Fonti e colonne necessarie per costruire i modelli dei tipi file indicati"""
+        return {file_type: DataModelFactory.SOURCE_COLUMNS[file_type] for file_type in file_types}
+    
     @staticmethod
     def parse_italian_datetime(date_str: str) -> Optional[datetime]:
         """Parse datetime formato italiano"""
@@ -174,10 +246,7 @@ class DataModelFactory:
             
         date_str = str(date_str).strip()
         
-        # Formati data italiani
-        formats = ['%d/%m/%Y %H:%M', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']
-        
-        for fmt in formats:
+        for fmt in DataModelFactory.DATE_FORMATS:
             try:
                 return datetime.strptime(date_str, fmt)
             except ValueError:
@@ -186,53 +255,198 @@ class DataModelFactory:
         LOGGER.warning(f"Impossibile parsare data: {date_str}")
         return None
     
+    # PARSING COLONNARE
+    
+    @staticmethod
+    def find_column(df: pd.DataFrame, *candidates: str) -> Optional[str]:
+        """
+        Trova la colonna sorgente tra i nomi candidati.
+        Prima cerca un match esatto, poi un match per prefisso case-insensitive
+        (es. 'Tipologia Attivit' trova 'Tipologia Attività' qualunque sia l'encoding).
+        """
+        for candidate in candidates:
+            if candidate in df.columns:
+                return candidate
+        
+        for candidate in candidates:
+            prefix = candidate.lower()
+            for column in df.columns:
+                if str(column).lower().startswith(prefix):
+                    return column
+        return None
+    
+    @staticmethod
+    def column_values(df: pd.DataFrame, *candidates: str) -> pd.Series:
+        """Restituisce la colonna sorgente o una Series vuota se assente"""
+        column = DataModelFactory.find_column(df, *candidates)
+        if column is None:
+            return pd.Series(None, index=df.index, dtype=object)
+        return df[column]
+    
+    # Parser vettoriali condivisi con ingestion e profilo di integrità (modulo parsers)
+    null_mask = staticmethod(parsers.null_mask)
+    parse_italian_datetime_series = staticmethod(parsers.parse_italian_datetime_series)
+    
+    @staticmethod
+    def parse_durata_ore_series(series: pd.Series) -> pd.Series:
+        """Converte durate 'HH:MM' o decimali (virgola o punto) in ore decimali"""
+        return parsers.parse_hours_series(series)
+    
+    @staticmethod
+    def parse_ore_lavorate_series(series: pd.Series) -> pd.Series:
+        """Converte ore lavorate, inclusi gli orari Excel di epoca 1899 (12/31/1899 5:01:00 AM)"""
+        return parsers.parse_hours_series(series)
+    
+    @staticmethod
+    def map_stato_permesso_series(series: pd.Series) -> pd.Series:
+        """Mappa 'Stato' (Approvata, Rifiutata, Richiesta/In attesa) su StatoPermesso"""
+        values = series.astype(str).str.strip().str.lower()
+        return pd.Series(
+            np.select(
+                [values.str.startswith('approvat'),
+                 values.str.startswith('rifiutat'),
+                 values.str.startswith('richiest') | values.str.startswith('in attesa')],
+                [StatoPermesso.APPROVATO, StatoPermesso.RIFIUTATO, StatoPermesso.RICHIESTO],
+                default=StatoPermesso.UNKNOWN
+            ),
+            index=series.index,
+            dtype=object
+        )
+    
+    @staticmethod
+    def map_tipologia_series(series: pd.Series) -> pd.Series:
+        """Mappa 'Tipologia Attività' su TipologiaAttivita"""
+        values = series.astype(str)
+        return pd.Series(
+            np.select(
+                [values.str.contains('Remoto', regex=False),
+                 values.str.contains('On-Site', regex=False)],
+                [TipologiaAttivita.REMOTO, TipologiaAttivita.ONSITE],
+                default=TipologiaAttivita.UNKNOWN
+            ),
+            index=series.index,
+            dtype=object
+        )
+    
+    @staticmethod
+    def materialize(model_cls, frame: pd.DataFrame) -> list:
+        """Istanzia i modelli da un frame colonnare tipizzato (NaN/NaT -> None)"""
+        columns = {}
+        for name in frame.columns:
+            column = frame[name]
+            if pd.api.types.is_datetime64_any_dtype(column):
+                column = pd.Series(column.array.to_pydatetime(), index=frame.index, dtype=object)
+            else:
+                column = column.astype(object)
+            columns[name] = column.where(frame[name].notna(), None)
+        
+        names = list(columns)
+        rows = zip(*(columns[name].tolist() for name in names))
+        return [model_cls(**dict(zip(names, row))) for row in rows]
+    
+    # FRAME COLONNARI TIPIZZATI
+    
+    @staticmethod
+    def build_attivita_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Frame tipizzato con i campi di AttivitaTecnico, utilizzabile direttamente dalle regole"""
+        cols = DataModelFactory.column_values
+        return pd.DataFrame({
+            'contratto': cols(df, 'Contratto'),
+            'id_ticket': cols(df, 'Id Ticket'),
+            'iniziata_il': DataModelFactory.parse_italian_datetime_series(cols(df, 'Iniziata il')),
+            'conclusa_il': DataModelFactory.parse_italian_datetime_series(cols(df, 'Conclusa il')),
+            'azienda': cols(df, 'Azienda'),
+            'tipologia': DataModelFactory.map_tipologia_series(cols(df, 'Tipologia Attivit')),
+            'descrizione': cols(df, 'Descrizione'),
+            'durata_ore': DataModelFactory.parse_durata_ore_series(cols(df, 'Durata')),
+            'creato_da': cols(df, 'Creato da')
+        }, index=df.index)
+    
+    @staticmethod
+    def build_timbrature_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Frame tipizzato con i campi di TimbraturaTecnico"""
+        cols = DataModelFactory.column_values
+        return pd.DataFrame({
+            'dipendente_nome': cols(df, 'dipendente nome'),
+            'dipendente_cognome': cols(df, 'dipendente cognome'),
+            'cliente_nome': cols(df, 'cliente nome'),
+            'cliente_indirizzo': cols(df, 'cliente indirizzo'),
+            'cliente_citta': cols(df, 'cliente citt'),
+            'ora_inizio': DataModelFactory.parse_italian_datetime_series(cols(df, 'ora inizio')),
+            'ora_fine': DataModelFactory.parse_italian_datetime_series(cols(df, 'ora fine')),
+            'ore_lavorate': DataModelFactory.parse_ore_lavorate_series(cols(df, 'ore')),
+            'indirizzo_start': cols(df, 'indirizzo start'),
+            'indirizzo_end': cols(df, 'indirizzo end'),
+            'descrizione': cols(df, 'descrizione attivit')
+        }, index=df.index)
+    
+    @staticmethod
+    def build_teamviewer_frame(df: pd.DataFrame, is_bait: bool = True) -> pd.DataFrame:
+        """Frame tipizzato con i campi di SessioneTeamViewer (export BAIT o gruppo)"""
+        cols = DataModelFactory.column_values
+        empty = pd.Series(None, index=df.index, dtype=object)
+        
+        # Export BAIT '8m ', '1h 5m'; export gruppo minuti semplici
+        durata_minuti = parsers.floor_minutes(parsers.parse_duration_minutes_series(cols(df, 'durata', 'Durata')))
+        
+        return pd.DataFrame({
+            'data_sessione': DataModelFactory.parse_italian_datetime_series(cols(df, 'data sessione', 'Inizio')),
+            'durata_minuti': durata_minuti,
+            'assegnatario': cols(df, 'assegnatario', 'Assegnatario') if is_bait else empty,
+            'computer': cols(df, 'computer', 'Computer', 'Nome'),
+            'utente': cols(df, 'utente', 'Utente') if not is_bait else empty,
+            'codice_sessione': cols(df, 'codice sessione', 'Codice', 'ID'),
+            'cliente': cols(df, 'cliente')
+        }, index=df.index)
+    
+    @staticmethod
+    def build_permessi_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Frame tipizzato con i campi di PermessoTecnico"""
+        cols = DataModelFactory.column_values
+        return pd.DataFrame({
+            'dipendente': cols(df, 'Dipendente'),
+            'tipo_permesso': cols(df, 'Tipo'),
+            'data_inizio': DataModelFactory.parse_italian_datetime_series(cols(df, 'Data inizio')),
+            'data_fine': DataModelFactory.parse_italian_datetime_series(cols(df, 'Data fine')),
+            'stato': DataModelFactory.map_stato_permesso_series(cols(df, 'Stato')),
+            'ore_permesso': DataModelFactory.parse_durata_ore_series(cols(df, 'Ore'))
+        }, index=df.index)
+    
+    @staticmethod
+    def build_veicoli_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Frame tipizzato con i campi di UtilizzoVeicolo"""
+        cols = DataModelFactory.column_values
+        return pd.DataFrame({
+            'dipendente': cols(df, 'Dipendente'),
+            'auto': cols(df, 'Auto'),
+            'ora_presa': DataModelFactory.parse_italian_datetime_series(cols(df, 'Presa Data e Ora')),
+            'ora_riconsegna': DataModelFactory.parse_italian_datetime_series(cols(df, 'Riconsegna Data e Ora')),
+            'cliente': cols(df, 'Cliente')
+        }, index=df.index)
+    
+    @staticmethod
+    def build_calendario_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Frame tipizzato con i campi di AppuntamentoCalendario (colonne pivot escluse)"""
+        cols = DataModelFactory.column_values
+        frame = pd.DataFrame({
+            'cliente': cols(df, 'Cliente'),
+            'luogo': cols(df, 'Dove'),
+            'data_inizio': DataModelFactory.parse_italian_datetime_series(cols(df, 'Data e Ora inizio')),
+            'data_fine': DataModelFactory.parse_italian_datetime_series(cols(df, 'Data e Ora fine')),
+            'tecnico': cols(df, 'Dipendente'),
+            'descrizione': cols(df, 'Descrizione', 'Note')
+        }, index=df.index)
+        # Righe residue della tabella pivot: nessun dato di appuntamento
+        return frame[frame[['cliente', 'data_inizio', 'tecnico']].notna().any(axis=1)]
+    
+    # MATERIALIZZAZIONE MODELLI
+    
     @staticmethod
     def create_attivita_from_df(df: pd.DataFrame) -> List[AttivitaTecnico]:
         """Crea lista AttivitaTecnico da DataFrame"""
-        attivita_list = []
-        
-        for _, row in df.iterrows():
-            try:
-                # Determina tipologia attività
-                tipologia = TipologiaAttivita.UNKNOWN
-                if 'Tipologia Attivit' in row and pd.notna(row['Tipologia Attivit']):
-                    tipo_str = str(row['Tipologia Attivit']).strip()
-                    if 'Remoto' in tipo_str:
-                        tipologia = TipologiaAttivita.REMOTO
-                    elif 'On-Site' in tipo_str:
-                        tipologia = TipologiaAttivita.ONSITE
-                
-                # Parse durata
-                durata_ore = None
-                if 'Durata' in row and pd.notna(row['Durata']):
-                    durata_str = str(row['Durata']).replace(',', '.')
-                    try:
-                        # Converti formato HH:MM in ore decimali
-                        if ':' in durata_str:
-                            hours, minutes = durata_str.split(':')
-                            durata_ore = float(hours) + float(minutes) / 60
-                        else:
-                            durata_ore = float(durata_str)
-                    except ValueError:
-                        pass
-                
-                attivita = AttivitaTecnico(
-                    contratto=row.get('Contratto'),
-                    id_ticket=row.get('Id Ticket'),
-                    iniziata_il=DataModelFactory.parse_italian_datetime(row.get('Iniziata il')),
-                    conclusa_il=DataModelFactory.parse_italian_datetime(row.get('Conclusa il')),
-                    azienda=row.get('Azienda'),
-                    tipologia=tipologia,
-                    descrizione=row.get('Descrizione'),
-                    durata_ore=durata_ore,
-                    creato_da=row.get('Creato da')
-                )
-                
-                attivita_list.append(attivita)
-                
-            except Exception as e:
-                LOGGER.error(f"Errore creazione AttivitaTecnico: {e}")
-                continue
+        attivita_list = DataModelFactory.materialize(
+            AttivitaTecnico, DataModelFactory.build_attivita_frame(df)
+        )
         
         LOGGER.info(f"Creati {len(attivita_list)} record AttivitaTecnico")
         return attivita_list
@@ -240,48 +454,9 @@ class DataModelFactory:
     @staticmethod
     def create_timbrature_from_df(df: pd.DataFrame) -> List[TimbraturaTecnico]:
         """Crea lista TimbraturaTecnico da DataFrame"""
-        timbrature_list = []
-        
-        for _, row in df.iterrows():
-            try:
-                # Parse ore lavorate
-                ore_lavorate = None
-                if 'ore' in row and pd.notna(row['ore']):
-                    try:
-                        ore_str = str(row['ore'])
-                        # Gestione formato time Excel malformato
-                        if 'AM' in ore_str or 'PM' in ore_str:
-                            # Estrai ore dalla rappresentazione Excel
-                            parts = ore_str.split()
-                            if len(parts) >= 2:
-                                time_part = parts[1]
-                                if ':' in time_part:
-                                    hours, minutes = time_part.split(':')[:2]
-                                    ore_lavorate = float(hours) + float(minutes) / 60
-                        else:
-                            ore_lavorate = float(ore_str.replace(',', '.'))
-                    except ValueError:
-                        pass
-                
-                timbratura = TimbraturaTecnico(
-                    dipendente_nome=row.get('dipendente nome'),
-                    dipendente_cognome=row.get('dipendente cognome'),
-                    cliente_nome=row.get('cliente nome'),
-                    cliente_indirizzo=row.get('cliente indirizzo'),
-                    cliente_citta=row.get('cliente citt'),
-                    ora_inizio=DataModelFactory.parse_italian_datetime(row.get('ora inizio')),
-                    ora_fine=DataModelFactory.parse_italian_datetime(row.get('ora fine')),
-                    ore_lavorate=ore_lavorate,
-                    indirizzo_start=row.get('indirizzo start'),
-                    indirizzo_end=row.get('indirizzo end'),
-                    descrizione=row.get('descrizione attivit')
-                )
-                
-                timbrature_list.append(timbratura)
-                
-            except Exception as e:
-                LOGGER.error(f"Errore creazione TimbraturaTecnico: {e}")
-                continue
+        timbrature_list = DataModelFactory.materialize(
+            TimbraturaTecnico, DataModelFactory.build_timbrature_frame(df)
+        )
         
         LOGGER.info(f"Creati {len(timbrature_list)} record TimbraturaTecnico")
         return timbrature_list
@@ -289,37 +464,42 @@ class DataModelFactory:
     @staticmethod
     def create_teamviewer_from_df(df: pd.DataFrame, is_bait: bool = True) -> List[SessioneTeamViewer]:
         """Crea lista SessioneTeamViewer da DataFrame"""
-        sessioni_list = []
-        
-        for _, row in df.iterrows():
-            try:
-                # Parse durata
-                durata_minuti = None
-                if 'durata' in row and pd.notna(row['durata']):
-                    try:
-                        durata_str = str(row['durata']).replace(',', '.')
-                        durata_minuti = int(float(durata_str))
-                    except ValueError:
-                        pass
-                
-                sessione = SessioneTeamViewer(
-                    data_sessione=DataModelFactory.parse_italian_datetime(row.get('data sessione')),
-                    durata_minuti=durata_minuti,
-                    assegnatario=row.get('assegnatario') if is_bait else None,
-                    computer=row.get('computer'),
-                    utente=row.get('utente') if not is_bait else None,
-                    codice_sessione=row.get('codice sessione'),
-                    cliente=row.get('cliente')
-                )
-                
-                sessioni_list.append(sessione)
-                
-            except Exception as e:
-                LOGGER.error(f"Errore creazione SessioneTeamViewer: {e}")
-                continue
+        sessioni_list = DataModelFactory.materialize(
+            SessioneTeamViewer, DataModelFactory.build_teamviewer_frame(df, is_bait)
+        )
         
         LOGGER.info(f"Creati {len(sessioni_list)} record SessioneTeamViewer")
         return sessioni_list
+    
+    @staticmethod
+    def create_permessi_from_df(df: pd.DataFrame) -> List[PermessoTecnico]:
+        """Crea lista PermessoTecnico da DataFrame"""
+        permessi_list = DataModelFactory.materialize(
+            PermessoTecnico, DataModelFactory.build_permessi_frame(df)
+        )
+        
+        LOGGER.info(f"Creati {len(permessi_list)} record PermessoTecnico")
+        return permessi_list
+    
+    @staticmethod
+    def create_veicoli_from_df(df: pd.DataFrame) -> List[UtilizzoVeicolo]:
+        """Crea lista UtilizzoVeicolo da DataFrame"""
+        veicoli_list = DataModelFactory.materialize(
+            UtilizzoVeicolo, DataModelFactory.build_veicoli_frame(df)
+        )
+        
+        LOGGER.info(f"Creati {len(veicoli_list)} record UtilizzoVeicolo")
+        return veicoli_list
+    
+    @staticmethod
+    def create_calendario_from_df(df: pd.DataFrame) -> List[AppuntamentoCalendario]:
+        """Crea lista AppuntamentoCalendario da DataFrame"""
+        calendario_list = DataModelFactory.materialize(
+            AppuntamentoCalendario, DataModelFactory.build_calendario_frame(df)
+        )
+        
+        LOGGER.info(f"Creati {len(calendario_list)} record AppuntamentoCalendario")
+        return calendario_list
 
 if __name__ == "__main__":
     # Test dei modelli
@@ -0,0 +1,232 @@
+"""
+BAIT Activity Controller - Parsers
+Parser vettoriali per i formati delle fonti: date italiane, orari Excel (seriali ed
+epoca 1899), durate TeamViewer ('8m', '1h 5m', 'HH:MM') e decimali con virgola.
+Ogni parser lavora sull'intera Series e registra le celle non interpretabili.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from config import CONFIG, LOGGER
+
+# Orari esportati da Excel come data fittizia di fine 1899 ('12/31/1899 5:01:00 AM')
+EXCEL_TIME_FORMATS = ['%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %I:%M %p', '%m/%d/%Y %H:%M:%S',
+                      '%m/%d/%Y %H:%M', '%Y-%m-%d %H:%M:%S']
+# 30/12/1899 (epoca Excel/OLE) e 31/12/1899 valgono entrambe giorno zero
+EXCEL_TIME_EPOCH = pd.Timestamp('1899-12-31')
+EXCEL_TIME_MAX_YEAR = 1900
+
+# Valori testuali equivalenti a cella vuota
+NULL_STRINGS = ['', 'nan', 'NaN', 'None', 'NaT']
+
+# Durate: '8m', '1h 5m', '2h', '1h 05m 30s', '90 min'
+DURATION_PATTERN = (
+    r'^(?:(?P<h>\d+(?:[.,]\d+)?)\s*h)?\s*'
+    r'(?:(?P<m>\d+(?:[.,]\d+)?)\s*m(?:in)?)?\s*'
+    r'(?:(?P<s>\d+)\s*s)?$'
+)
+CLOCK_PATTERN = r'^(?P<h>\d+):(?P<m>\d{1,2})(?::(?P<s>\d{1,2}))?$'
+# Almeno due gruppi di migliaia senza virgola: il punto non è decimale ('1.234' resta 1,234)
+THOUSANDS_PATTERN = r'\d{1,3}(?:\.\d{3}){2,}'
+
+
+class ParseFailureLog:
+    """Celle non interpretabili per (parser, colonna): conteggio ed esempi"""
+
+    def __init__(self, sample_size: int = 5):
+        self.sample_size = sample_size
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, parser: str, column: Optional[str], values: pd.Series, failed: pd.Series) -> int:
+        """Registra le celle fallite e restituisce quante sono"""
+        count = int(failed.sum())
+        if not count:
+            return 0
+
+        samples = values[failed].astype(str).unique()[:self.sample_size].tolist()
+        with self._lock:
+            entry = self._entries.setdefault((parser, str(column)), {'count': 0, 'samples': []})
+            entry['count'] += count
+            entry['samples'] = (entry['samples'] + [s for s in samples if s not in entry['samples']])[:self.sample_size]
+
+        label = f" '{column}'" if column is not None else ''
+        LOGGER.warning(f"Impossibile interpretare {count} valori{label} con {parser} (es. {samples[:3]})")
+        return count
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copia serializzabile: {'parser:colonna': {'count', 'samples'}}"""
+        with self._lock:
+            return {f"{parser}:{column}": dict(entry) for (parser, column), entry in self._entries.items()}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Registro globale condiviso da ingestion e factory
+PARSE_FAILURES = ParseFailureLog()
+
+
+def null_mask(series: pd.Series) -> pd.Series:
+    """Maschera celle vuote, incluse le stringhe 'nan' prodotte dalla pulizia CSV"""
+    return series.isna() | series.astype(str).str.strip().isin(NULL_STRINGS)
+
+
+def failure_mask(series: pd.Series, parsed: pd.Series) -> pd.Series:
+    """Celle valorizzate in ingresso ma non interpretate"""
+    return parsed.isna() & ~null_mask(series)
+
+
+def _report(parser: str, series: pd.Series, parsed: pd.Series, report: bool):
+    if report:
+        PARSE_FAILURES.record(parser, series.name, series, failure_mask(series, parsed))
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.astype(str).str.strip()
+
+
+def parse_italian_datetime_series(series: pd.Series, report: bool = True) -> pd.Series:
+    """
+    Date italiane: un passaggio pd.to_datetime per formato (CONFIG.DATE_FORMATS),
+    applicato solo alle celle non ancora risolte dai formati precedenti.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    values = _text(series)
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    pending = ~null_mask(series)
+
+    for fmt in CONFIG.DATE_FORMATS:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(values[pending], format=fmt, errors='coerce')
+        parsed = parsed[parsed.notna()]
+        result.loc[parsed.index] = parsed
+        pending.loc[parsed.index] = False
+
+    _report('date', series, result, report)
+    return result
+
+
+def parse_decimal_series(series: pd.Series, report: bool = True) -> pd.Series:
+    """
+    Numeri con virgola decimale ('5,1', '1.234,5'), punto decimale ('5.1') o soli
+    separatori delle migliaia ripetuti ('1.234.567', anche valori corrotti dall'export
+    come '921.666.666.666.672', poi scartati dai limiti dello schema).
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+
+    values = _text(series)
+    has_comma = values.str.contains(',', regex=False)
+    grouped = values.str.fullmatch(THOUSANDS_PATTERN)
+    values = values.where(~(has_comma | grouped),
+                          values.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    result = pd.to_numeric(values, errors='coerce').astype(float)
+
+    _report('decimale', series, result, report)
+    return result
+
+
+def _excel_epoch_timedelta(values: pd.Series) -> pd.Series:
+    """Orari in formato data Excel di fine 1899 come durata dal giorno zero (NaT se non lo sono)"""
+    result = pd.Series(pd.NaT, index=values.index, dtype='timedelta64[ns]')
+    pending = values.str.contains('1899', regex=False) | values.str.contains('1900', regex=False)
+
+    for fmt in EXCEL_TIME_FORMATS:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(values[pending], format=fmt, errors='coerce')
+        parsed = parsed[parsed.notna() & (parsed.dt.year <= EXCEL_TIME_MAX_YEAR)]
+        day = parsed.dt.normalize()
+        days = ((day - EXCEL_TIME_EPOCH).dt.days).clip(lower=0)
+        result.loc[parsed.index] = pd.to_timedelta(days, unit='D') + (parsed - day)
+        pending.loc[parsed.index] = False
+
+    return result
+
+
+def parse_excel_time_series(series: pd.Series, report: bool = True) -> pd.Series:
+    """
+    Orari Excel come Timedelta: date fittizie di epoca 1899 ('12/31/1899 5:01:00 AM')
+    o numeri seriali in giorni ('0,2083' = 5 ore).
+    """
+    if pd.api.types.is_timedelta64_dtype(series):
+        return series
+
+    values = _text(series)
+    result = _excel_epoch_timedelta(values)
+    serial = parse_decimal_series(series.where(result.isna()), report=False)
+    result = result.where(result.notna(), pd.to_timedelta(serial, unit='D'))
+
+    _report('orario Excel', series, result, report)
+    return result
+
+
+def parse_hours_series(series: pd.Series, report: bool = True) -> pd.Series:
+    """
+    Ore decimali: numeri (virgola o punto), 'HH:MM[:SS]' e orari Excel di epoca 1899.
+    Un numero semplice è già in ore.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+
+    values = _text(series)
+    result = parse_decimal_series(series, report=False)
+
+    clock = values.str.extract(CLOCK_PATTERN)
+    has_clock = clock['h'].notna()
+    if has_clock.any():
+        clock_hours = (clock['h'].astype(float) + clock['m'].astype(float) / 60 +
+                       clock['s'].astype(float).fillna(0) / 3600)
+        result = result.where(~has_clock, clock_hours)
+
+    excel = _excel_epoch_timedelta(values)
+    has_excel = excel.notna()
+    if has_excel.any():
+        result = result.where(~has_excel, excel.dt.total_seconds() / 3600)
+
+    result = result.where(~null_mask(series))
+    _report('ore', series, result, report)
+    return result
+
+
+def parse_duration_minutes_series(series: pd.Series, report: bool = True) -> pd.Series:
+    """
+    Durate in minuti: '8m', '1h 5m', '2h', '1h 05m 30s', 'HH:MM[:SS]' (ore:minuti)
+    e numeri semplici, già in minuti (virgola o punto).
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+
+    values = _text(series).str.lower()
+    result = parse_decimal_series(series, report=False)
+
+    units = values.str.extract(DURATION_PATTERN)
+    has_units = units.notna().any(axis=1) & values.str.contains(r'[hms]', regex=True)
+    if has_units.any():
+        numbers = units.apply(lambda column: pd.to_numeric(column.str.replace(',', '.', regex=False)))
+        minutes = numbers['h'].fillna(0) * 60 + numbers['m'].fillna(0) + numbers['s'].fillna(0) / 60
+        result = result.where(~has_units, minutes)
+
+    clock = values.str.extract(CLOCK_PATTERN)
+    has_clock = clock['h'].notna()
+    if has_clock.any():
+        clock_minutes = (clock['h'].astype(float) * 60 + clock['m'].astype(float) +
+                         clock['s'].astype(float).fillna(0) / 60)
+        result = result.where(~has_clock, clock_minutes)
+
+    result = result.where(~null_mask(series))
+    _report('durata', series, result, report)
+    return result
+
+
+def floor_minutes(minutes: pd.Series) -> pd.Series:
+    """Minuti interi (Int64, NaN preservati)"""
+    return np.floor(minutes).astype('Int64')
@@ -0,0 +1,248 @@
+"""
+BAIT Activity Controller - Rule Result Cache
+Cache persistente su disco dei risultati delle regole per partizione (tecnico, giorno),
+indirizzata per impronta dei record in ingresso, versione e soglie della regola
+"""
+
+import json
+import os
+import pickle
+import re
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Sequence
+
+from config import LOGGER
+from event_index import record_values
+from event_timeline import EventTimeline, Partition, Scope, expand_scope, scan_timeline
+from frame_cache import content_hash, content_hasher
+
+# Formato delle voci (impronta, alert in sospeso, contatori delle stats): incluso nel nome file
+ENTRY_FORMAT = 2
+
+
+class PartitionDigests:
+    """
+    Hash dei record di ogni fonte per chiave (tecnico, giorno), calcolati una volta per
+    timeline. Comprendono la posizione dei record nella fonte: le chiavi di ordinamento
+    degli alert in cache restano valide (righe aggiunte in coda o corrette sul posto
+    non invalidano le altre partizioni, righe rimosse o inserite sì).
+    """
+
+    def __init__(self, timeline: EventTimeline):
+        self.timeline = timeline
+        self._digests: Dict[str, Dict[Partition, bytes]] = {}
+
+    def of(self, source: str) -> Dict[Partition, bytes]:
+        """Hash per chiave della fonte (giorno None: record del tecnico senza orario)"""
+        if source not in self._digests:
+            index = self.timeline.index
+            digests = {key: self._digest(source, records) for key, records in index.days(source)}
+            for tecnico_id in index.undated_technicians(source):
+                digests[(tecnico_id, None)] = self._digest(source, index.undated(source, tecnico_id))
+            self._digests[source] = digests
+        return self._digests[source]
+
+    def _digest(self, source: str, records: List[Any]) -> bytes:
+        digest = content_hasher()
+        for record in records:
+            position = self.timeline.index.position(source, record)
+            digest.update(f"{position}:{record_values(record)!r}".encode('utf-8'))
+        return digest.digest()
+
+    def fingerprints(self, visitor: Any) -> Dict[Partition, str]:
+        """
+        Impronta di ogni partizione della regola: record delle sue fonti nel giorno
+        ± partition_halo, o in tutti i giorni del tecnico per le regole 'technician'
+        (partizione (ID tecnico, None))
+        """
+        index = self.timeline.index
+        technician = visitor.partition_scope == 'technician'
+        halo = range(-visitor.partition_halo, visitor.partition_halo + 1)
+        units = {(tecnico_id, None if technician else giorno)
+                 for source in visitor.sources for tecnico_id, giorno in self.of(source)}
+
+        fingerprints = {}
+        for tecnico_id, giorno in units:
+            digest = content_hasher()
+            for source in visitor.sources:
+                if technician:
+                    keys = [(tecnico_id, day) for day in sorted(index.technician_days(source, tecnico_id))]
+                    keys.append((tecnico_id, None))
+                elif giorno is None:
+                    keys = [(tecnico_id, None)]
+                else:
+                    keys = [(tecnico_id, giorno + timedelta(days=offset)) for offset in halo]
+                digests = self.of(source)
+                digest.update(source.encode('utf-8'))
+                for key in keys:
+                    digest.update(digests.get(key, b'-'))
+            fingerprints[(tecnico_id, giorno)] = digest.hexdigest()
+        return fingerprints
+
+
+class RuleResultCache:
+    """
+    Cache degli alert in sospeso e dei contatori delle stats di ogni regola per partizione
+    (tecnico, giorno). Un file per regola e parametri (versione e soglie,
+    RuleVisitor.parameters), con l'impronta dei dati di ogni partizione: al rilancio sono
+    ricalcolate solo le partizioni la cui impronta è cambiata, su una vista ristretta della
+    timeline. Gli alert sono poi creati nell'ordine delle chiavi come in una valutazione
+    completa, i contatori sommati sulle partizioni ricalcolate e riusate.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.enabled = True
+
+    def _entry_path(self, visitor: Any) -> str:
+        """Percorso della voce di cache della regola per i parametri correnti"""
+        parameters = json.dumps([ENTRY_FORMAT, visitor.parameters()], sort_keys=True, default=str)
+        return os.path.join(self.cache_dir, f"{visitor.rule_id}_{content_hash(parameters.encode('utf-8'))}.pkl")
+
+    def get(self, visitor: Any) -> Dict[Partition, tuple]:
+        """Partizione -> (impronta, alert in sospeso, contatori) della regola (vuoto se assente o illeggibile)"""
+        path = self._entry_path(visitor)
+        if not self.enabled or not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, 'rb') as file:
+                return pickle.load(file)
+        except Exception as e:
+            LOGGER.warning(f"Voce cache regole illeggibile {path}, verrà rigenerata: {e}")
+            return {}
+
+    def put(self, visitor: Any, entries: Dict[Partition, tuple]) -> bool:
+        """Salva le partizioni della regola e rimuove le voci con parametri obsoleti"""
+        if not self.enabled:
+            return False
+
+        path = self._entry_path(visitor)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(entries, file, protocol=pickle.HIGHEST_PROTOCOL)
+            # Scrittura atomica: controller e file watcher condividono la cache
+            os.replace(tmp_path, path)
+        except Exception as e:
+            LOGGER.warning(f"Impossibile salvare cache regola {visitor.rule_id}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        self._prune(visitor.rule_id, keep=os.path.basename(path))
+        return True
+
+    def _prune(self, rule_id: str, keep: str):
+        """Elimina le voci della regola calcolate con versione o soglie precedenti"""
+        pattern = re.compile(rf"^{re.escape(rule_id)}_[0-9a-f]+\.pkl$")
+        for name in os.listdir(self.cache_dir):
+            if pattern.match(name) and name != keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+
+    def run(self, timeline: EventTimeline, visitors: Sequence[Any]) -> List[Any]:
+        """
+        Esegue i visitatori riusando le partizioni in cache e restituisce i ValidationResult
+        nell'ordine dei visitatori (come RuleScheduler.run)
+        """
+        visitors = list(visitors)
+        elapsed = [0.0] * len(visitors)
+        digests = PartitionDigests(timeline)
+        cached_total = computed_total = 0
+
+        full, restricted = [], []
+        for position, visitor in enumerate(visitors):
+            start = time.perf_counter()
+            fingerprints = digests.fingerprints(visitor)
+            cached = self.get(visitor)
+            stale = {unit for unit, fingerprint in fingerprints.items()
+                     if unit not in cached or cached[unit][0] != fingerprint}
+            elapsed[position] += (time.perf_counter() - start) * 1000
+
+            plan = (position, fingerprints, cached, stale)
+            if len(stale) == len(fingerprints):
+                full.append(plan)
+            else:
+                restricted.append(plan)
+            cached_total += len(fingerprints) - len(stale)
+            computed_total += len(stale)
+
+        # Regole da ricalcolare per intero: una scansione condivisa della timeline completa
+        if full:
+            positions = [plan[0] for plan in full]
+            for position, ms in zip(positions, scan_timeline(timeline, [visitors[p] for p in positions])):
+                elapsed[position] += ms
+        # Le altre solo sulle partizioni cambiate (più i giorni vicini che leggono; nessuna
+        # partizione: solo begin/finish, per le statistiche sui totali)
+        for position, _, _, stale in restricted:
+            visitor = visitors[position]
+            scope: Scope = {}
+            for tecnico_id, giorno in stale:
+                if visitor.partition_scope == 'technician':
+                    scope[tecnico_id] = None
+                else:
+                    scope.setdefault(tecnico_id, set()).add(giorno)
+            context = timeline.restrict(expand_scope(scope, visitor.partition_halo))
+            elapsed[position] += scan_timeline(context, [visitor])[0]
+
+        for position, fingerprints, cached, stale in full + restricted:
+            start = time.perf_counter()
+            self._merge(visitors[position], fingerprints, cached, stale)
+            elapsed[position] += (time.perf_counter() - start) * 1000
+
+        LOGGER.info(f"🗄️ Cache regole: {cached_total} partizioni riutilizzate, {computed_total} ricalcolate")
+
+        # ID alert progressivi per engine: creati in sequenza, nell'ordine dichiarato
+        results = []
+        for visitor, ms in zip(visitors, elapsed):
+            start = time.perf_counter()
+            result = visitor.result(0)
+            result.execution_time_ms = int(ms + (time.perf_counter() - start) * 1000)
+            results.append(result)
+        return results
+
+    def _unit(self, visitor: Any, partition: Partition) -> Partition:
+        return (partition[0], None) if visitor.partition_scope == 'technician' else partition
+
+    def _merge(self, visitor: Any, fingerprints: Dict[Partition, str], cached: Dict[Partition, tuple],
+               stale: set):
+        """
+        Alert in sospeso e contatori: partizioni ricalcolate più quelle valide in cache
+        (le partizioni di solo contesto della scansione ristretta sono scartate); aggiorna la voce
+        """
+        computed: Dict[Partition, list] = {unit: [] for unit in stale}
+        for entry in visitor.pending:
+            unit = self._unit(visitor, entry[2])
+            if unit in computed:
+                computed[unit].append(entry)
+
+        counts: Dict[Partition, Dict[str, int]] = {unit: {} for unit in stale}
+        names = set()
+        for partition, partition_counts in visitor.partition_stats.items():
+            names.update(partition_counts)
+            unit_counts = counts.get(self._unit(visitor, partition))
+            if unit_counts is not None:
+                for name, value in partition_counts.items():
+                    unit_counts[name] = unit_counts.get(name, 0) + value
+
+        reused = fingerprints.keys() - stale
+        visitor.pending = ([entry for unit in reused for entry in cached[unit][1]] +
+                           [entry for entries in computed.values() for entry in entries])
+        unit_counts = [cached[unit][2] for unit in reused] + list(counts.values())
+        names.update(name for partition_counts in unit_counts for name in partition_counts)
+        for name in names:
+            visitor.stats[name] = sum(partition_counts.get(name, 0) for partition_counts in unit_counts)
+        visitor.stats['cached_partitions'] = len(reused)
+        visitor.stats['computed_partitions'] = len(stale)
+
+        if stale:
+            # Voci di giorni fuori dai dati correnti conservate (es. rilanci su intervalli diversi)
+            entries = dict(cached)
+            entries.update({unit: (fingerprints[unit], computed[unit], counts[unit]) for unit in stale})
+            self.put(visitor, entries)
@@ -0,0 +1,87 @@
+"""
+BAIT Activity Controller - Rule Scheduler
+Esecuzione delle regole (visitatori della timeline, indipendenti tra loro) in parallelo
+su gruppi di scansioni: risultati e ID degli alert restano deterministici
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import CONFIG
+from event_timeline import EventTimeline, scan_timeline
+
+RULE_EXECUTORS = ('sequential', 'thread', 'process')
+
+
+def _scan_in_worker(sources: Dict[str, List[Any]], visitors: Sequence[Any]) -> Tuple[List[Tuple[dict, list, dict]], List[float]]:
+    """Scansione in un processo worker: timeline ricostruita dalle fonti, restituisce stats e alert in sospeso"""
+    elapsed = scan_timeline(EventTimeline.from_models(sources), visitors)
+    return [(visitor.stats, visitor.pending, visitor.partition_stats) for visitor in visitors], elapsed
+
+
+class RuleScheduler:
+    """
+    Regole distribuite su al più max_workers gruppi, ognuno percorso con una sola
+    scansione della timeline. Gli alert sono creati a fine esecuzione nell'ordine
+    dichiarato delle regole.
+    """
+
+    def __init__(self, executor: Optional[str] = None, max_workers: Optional[int] = None):
+        self.executor = executor or CONFIG.RULES_EXECUTOR
+        self.max_workers = max_workers or CONFIG.RULES_WORKERS
+        if self.executor not in RULE_EXECUTORS:
+            raise ValueError(f"Modalità esecuzione regole non supportata: {self.executor}")
+
+    def run(self, timeline: EventTimeline, visitors: Sequence[Any]) -> List[Any]:
+        """Esegue i visitatori sulla timeline e restituisce i ValidationResult nell'ordine dei visitatori"""
+        visitors = list(visitors)
+        elapsed = [0.0] * len(visitors)
+
+        # Gruppi in ordine dichiarato (round robin): ognuno una scansione
+        positions = list(range(len(visitors)))
+        workers = 1 if self.executor == 'sequential' else max(1, min(self.max_workers, len(visitors)))
+        groups = [positions[start::workers] for start in range(workers)]
+        for group, group_elapsed in zip(groups, self._run_groups(timeline, visitors, groups)):
+            for position, ms in zip(group, group_elapsed):
+                elapsed[position] = ms
+
+        # ID alert progressivi per engine: creati in sequenza, nell'ordine dichiarato
+        results = []
+        for visitor, ms in zip(visitors, elapsed):
+            start = time.perf_counter()
+            result = visitor.result(0)
+            result.execution_time_ms = int(ms + (time.perf_counter() - start) * 1000)
+            results.append(result)
+        return results
+
+    def _run_groups(self, timeline: EventTimeline, visitors: List[Any],
+                    groups: List[List[int]]) -> List[List[float]]:
+        if len(groups) == 1:
+            return [scan_timeline(timeline, [visitors[position] for position in groups[0]])]
+
+        if self.executor == 'thread':
+            # Timeline e indice in sola lettura, stato di scansione per visitatore
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                futures = [pool.submit(scan_timeline, timeline, [visitors[position] for position in group])
+                           for group in groups]
+                return [future.result() for future in futures]
+
+        # Processi: i visitatori (con le sole fonti lette) viaggiano serializzati,
+        # stats e alert in sospeso tornano al processo principale
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = []
+            for group in groups:
+                group_visitors = [visitors[position] for position in group]
+                sources = {source: timeline.records(source)
+                           for visitor in group_visitors for source in visitor.sources}
+                futures.append(pool.submit(_scan_in_worker, sources, group_visitors))
+
+            results = []
+            for group, future in zip(groups, futures):
+                outputs, group_elapsed = future.result()
+                for position, (stats, pending, partition_stats) in zip(group, outputs):
+                    visitor = visitors[position]
+                    visitor.stats, visitor.pending, visitor.partition_stats = stats, pending, partition_stats
+                results.append(group_elapsed)
+            return results
@@ -0,0 +1,58 @@
+"""
+BAIT Activity Controller - Rule Sources
+Fonti e colonne dichiarate dalle regole: l'ingestion carica solo i file
+richiesti dalle regole selezionate e, per ciascuno, solo le colonne dichiarate
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# {file_type: colonne lette} per una regola; None = tutte le colonne del file
+SourceColumns = Optional[Tuple[str, ...]]
+RuleSources = Dict[str, SourceColumns]
+
+
+def merge_sources(declarations: Iterable[RuleSources]) -> RuleSources:
+    """Unione delle fonti dichiarate da più regole (None su una fonte prevale: file completo)"""
+    merged: Dict[str, Optional[set]] = {}
+    for declaration in declarations:
+        for file_type, columns in declaration.items():
+            if columns is None or (file_type in merged and merged[file_type] is None):
+                merged[file_type] = None
+            else:
+                merged.setdefault(file_type, set()).update(columns)
+
+    return {
+        file_type: None if columns is None else tuple(sorted(columns))
+        for file_type, columns in merged.items()
+    }
+
+
+def sources_for_rules(rule_sources: Dict[str, RuleSources],
+                      rule_ids: Optional[Iterable[str]] = None) -> RuleSources:
+    """Fonti richieste dall'insieme di regole (tutte se rule_ids è None)"""
+    if rule_ids is None:
+        return merge_sources(rule_sources.values())
+
+    unknown = set(rule_ids) - rule_sources.keys()
+    if unknown:
+        raise ValueError(f"Regole sconosciute: {sorted(unknown)}")
+    return merge_sources(rule_sources[rule_id] for rule_id in rule_ids)
+
+
+def select_columns(header: List[str], columns: SourceColumns) -> Optional[List[int]]:
+    """
+    Posizioni delle colonne dell'intestazione da leggere (usecols).
+    Stesso criterio di DataModelFactory.find_column: nome esatto o prefisso
+    case-insensitive ('Tipologia Attivit' trova la colonna qualunque sia l'encoding).
+    La prima colonna è sempre inclusa (filtro righe malformate dello schema di pulizia).
+    None se servono tutte le colonne.
+    """
+    if columns is None:
+        return None
+
+    prefixes = tuple(column.lower() for column in columns)
+    positions = [
+        position for position, name in enumerate(header)
+        if position == 0 or name in columns or str(name).lower().startswith(prefixes)
+    ]
+    return None if len(positions) == len(header) else positions
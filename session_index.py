@@ -0,0 +1,117 @@
+"""
+BAIT Activity Controller - Session Index
+Indice per tecnico delle sessioni TeamViewer (export BAIT e gruppo, senza doppioni):
+sessioni che intersecano una finestra e durata totale in tempo logaritmico
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from config import LOGGER
+from models import SessioneTeamViewer
+from parsers import parse_duration_minutes_series, parse_italian_datetime_series
+from technician_identity import TECHNICIANS
+
+# Stessa sessione presente in entrambi gli export: stesso tecnico, inizio e durata
+DEDUP_KEY = ['tecnico_id', 'inizio', 'durata_minuti']
+
+
+class SessionIndex:
+    """
+    Sessioni [inizio, fine] ordinate per tecnico due volte (per inizio e per fine)
+    con somme cumulative delle durate. Le sessioni che intersecano [a, b] sono quelle
+    iniziate entro b meno quelle concluse prima di a: due ricerche binarie.
+    """
+
+    def __init__(self, sessions: pd.DataFrame):
+        """sessions: colonne tecnico_id, inizio (datetime), durata_minuti"""
+        frame = sessions.dropna(subset=['tecnico_id', 'inizio'])
+        # Durata mancante o negativa (fine prima dell'inizio): sessione puntuale
+        frame = frame.assign(durata_minuti=frame['durata_minuti'].astype(float).fillna(0).clip(lower=0))
+        deduplicated = frame.drop_duplicates(subset=DEDUP_KEY)
+        self.duplicates = len(frame) - len(deduplicated)
+        # Doppioni per (ID tecnico, giorno di inizio), partizioni delle stats delle regole
+        duplicated = frame[frame.duplicated(subset=DEDUP_KEY)]
+        self.duplicates_by_day: Dict[Tuple[str, Any], int] = {
+            key: int(count) for key, count in duplicated.groupby(
+                [duplicated['tecnico_id'], pd.to_datetime(duplicated['inizio']).dt.date], sort=False
+            ).size().items()
+        }
+
+        starts = deduplicated['inizio'].astype('datetime64[ns]').astype('int64')
+        ends = starts + (deduplicated['durata_minuti'] * 60 * 10**9).astype('int64')
+        frame = pd.DataFrame({
+            'tecnico_id': deduplicated['tecnico_id'].astype(str).values,
+            'inizio': starts.values,
+            'fine': ends.values,
+            'durata': deduplicated['durata_minuti'].values
+        })
+
+        self._by_start: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._by_end: Dict[str, Tuple[List[int], List[float]]] = {}
+        for tecnico_id, group in frame.groupby('tecnico_id', sort=False):
+            self._by_start[tecnico_id] = self._sorted_with_sums(group, 'inizio')
+            self._by_end[tecnico_id] = self._sorted_with_sums(group, 'fine')
+
+        if self.duplicates:
+            LOGGER.info(f"Indice sessioni TeamViewer: {self.duplicates} sessioni duplicate tra gli export ignorate")
+
+    @staticmethod
+    def _sorted_with_sums(group: pd.DataFrame, column: str) -> Tuple[List[int], List[float]]:
+        ordered = group.sort_values(column, kind='stable')
+        return ordered[column].tolist(), [0.0] + list(accumulate(ordered['durata'].tolist()))
+
+    @classmethod
+    def from_sessions(cls, *session_lists: Iterable[SessioneTeamViewer]) -> 'SessionIndex':
+        """Indice dai modelli SessioneTeamViewer (una o più liste, es. export BAIT e gruppo)"""
+        rows = [
+            (sessione.tecnico_id, sessione.data_sessione, sessione.durata_minuti)
+            for sessioni in session_lists for sessione in sessioni
+        ]
+        sessions = pd.DataFrame(rows, columns=DEDUP_KEY)
+        sessions['inizio'] = pd.to_datetime(sessions['inizio'])
+        sessions['durata_minuti'] = pd.to_numeric(sessions['durata_minuti'], errors='coerce')
+        return cls(sessions)
+
+    @classmethod
+    def from_frames(cls, *frames: Optional[pd.DataFrame]) -> 'SessionIndex':
+        """Indice dai DataFrame grezzi degli export (Assegnatario/Utente, Inizio, Fine o Durata)"""
+        parts = []
+        for df in frames:
+            if df is None or df.empty:
+                continue
+            tecnico_col = 'Assegnatario' if 'Assegnatario' in df.columns else 'Utente'
+            names = df[tecnico_col].astype(object)
+            ids = names.map({name: TECHNICIANS.resolve(name) for name in names.dropna().unique()})
+            starts = parse_italian_datetime_series(df['Inizio'], report=False)
+            if 'Fine' in df.columns:
+                minutes = (parse_italian_datetime_series(df['Fine'], report=False) - starts).dt.total_seconds() / 60
+            else:
+                minutes = parse_duration_minutes_series(df['Durata'], report=False)
+            parts.append(pd.DataFrame({'tecnico_id': ids, 'inizio': starts, 'durata_minuti': minutes}))
+
+        sessions = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=DEDUP_KEY)
+        return cls(sessions)
+
+    def query(self, tecnico_id: Optional[str], start, end) -> Tuple[int, float]:
+        """Numero di sessioni che intersecano [start, end] (estremi inclusi) e durata totale in minuti"""
+        if tecnico_id not in self._by_start or pd.isna(start) or pd.isna(end) or end < start:
+            return 0, 0.0
+        starts, start_sums = self._by_start[tecnico_id]
+        ends, end_sums = self._by_end[tecnico_id]
+
+        # Le sessioni concluse prima di start sono un sottoinsieme di quelle iniziate entro end
+        started = bisect_right(starts, pd.Timestamp(end).value)
+        finished_before = bisect_left(ends, pd.Timestamp(start).value)
+        return started - finished_before, start_sums[started] - end_sums[finished_before]
+
+    def day_sessions(self, tecnico_id: Optional[str], day) -> int:
+        """Sessioni del tecnico nel giorno indicato"""
+        day_start = pd.Timestamp(day).normalize()
+        return self.query(tecnico_id, day_start, day_start + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns'))[0]
+
+    def __contains__(self, tecnico_id: Optional[str]) -> bool:
+        """Il tecnico ha almeno una sessione nell'indice"""
+        return tecnico_id in self._by_start
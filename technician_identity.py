@@ -0,0 +1,115 @@
+"""
+BAIT Activity Controller - Technician Identity
+Indice identità tecnici: ogni grafia delle fonti ("Davide Cestone", "Cestone, Davide",
+nome/cognome separati) viene risolta in un ID tecnico stabile
+"""
+
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Colonne con nomi tecnico per fonte (nome completo)
+PERSON_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'attivita': ('Creato da',),
+    'teamviewer_bait': ('Assegnatario',),
+    'teamviewer_gruppo': ('Utente',),
+    'permessi': ('Dipendente',),
+    'auto': ('Dipendente',),
+    'calendario': ('Dipendente',)
+}
+
+# Colonne nome/cognome separate
+PERSON_NAME_PARTS: Dict[str, Tuple[str, str]] = {
+    'timbrature': ('dipendente nome', 'dipendente cognome')
+}
+
+TOKEN_PATTERN = re.compile(r'[^\W\d_]+')
+
+
+@lru_cache(maxsize=4096)
+def normalize_technician(raw_name: Optional[str]) -> Optional[str]:
+    """
+    ID tecnico canonico: token alfabetici senza accenti, minuscoli e ordinati,
+    così ordine nome/cognome e virgole non contano. None se il valore non è un nome.
+    """
+    if raw_name is None or not isinstance(raw_name, str):
+        return None
+
+    ascii_name = unicodedata.normalize('NFKD', raw_name).encode('ascii', 'ignore').decode('ascii')
+    tokens = TOKEN_PATTERN.findall(ascii_name.casefold())
+    if not tokens:
+        return None
+    return '_'.join(sorted(tokens))
+
+
+def display_name(raw_name: str) -> str:
+    """Forma leggibile 'Nome Cognome' (gestisce 'Cognome, Nome')"""
+    if ',' in raw_name:
+        cognome, nome = raw_name.split(',', 1)
+        raw_name = f"{nome.strip()} {cognome.strip()}"
+    return ' '.join(raw_name.split())
+
+
+class TechnicianIdentityIndex:
+    """
+    Mappa grafia -> ID tecnico e ID -> nome visualizzato.
+    Costruito una volta in ingestion; le regole confrontano gli ID invece delle stringhe.
+    """
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, raw_name: Optional[str]) -> Optional[str]:
+        """ID tecnico per una grafia qualsiasi (registrata al primo incontro)"""
+        technician_id = normalize_technician(raw_name)
+        if technician_id is not None and technician_id not in self._names:
+            with self._lock:
+                self._names.setdefault(technician_id, display_name(raw_name))
+        return technician_id
+
+    def resolve_parts(self, nome: Optional[str], cognome: Optional[str]) -> Optional[str]:
+        """ID tecnico da nome e cognome separati"""
+        if not isinstance(nome, str) or not isinstance(cognome, str):
+            return None
+        return self.resolve(f"{nome} {cognome}")
+
+    def name(self, technician_id: Optional[str]) -> Optional[str]:
+        """Nome visualizzato per l'ID"""
+        if technician_id is None:
+            return None
+        return self._names.get(technician_id, technician_id)
+
+    def register(self, raw_names: Iterable[str]):
+        """Registra un insieme di grafie"""
+        for raw_name in raw_names:
+            self.resolve(raw_name)
+
+    def build_from_frames(self, data: Dict[str, pd.DataFrame]):
+        """Registra tutte le grafie delle fonti caricate (nomi completi prima delle parti)"""
+        for file_type, columns in PERSON_COLUMNS.items():
+            df = data.get(file_type)
+            if df is None:
+                continue
+            for column in columns:
+                if column in df.columns:
+                    self.register(df[column].dropna().astype(str).unique())
+
+        for file_type, (nome_col, cognome_col) in PERSON_NAME_PARTS.items():
+            df = data.get(file_type)
+            if df is None or nome_col not in df.columns or cognome_col not in df.columns:
+                continue
+            parts = df[[nome_col, cognome_col]].dropna().astype(str).drop_duplicates()
+            for nome, cognome in parts.itertuples(index=False):
+                self.resolve_parts(nome, cognome)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+# Istanza globale condivisa da ingestion, modelli, regole e KPI
+TECHNICIANS = TechnicianIdentityIndex()
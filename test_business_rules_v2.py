@@ -0,0 +1,46 @@
+"""
+Test regole v2.0: orari di attività e sessioni TeamViewer letti con la stessa
+convenzione gg/mm/aaaa (date ambigue come 08/07/2025 = 8 luglio)
+"""
+
+import pandas as pd
+
+from business_rules_v2 import AdvancedBusinessRulesEngine
+
+
+def remote_activity(start: str, end: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Id Ticket': ['1001'],
+        'Creato da': ['Mario Rossi'],
+        'Azienda': ['CLIENTE SPA'],
+        'Tipologia Attività': ['Remoto'],
+        'Iniziata il': [start],
+        'Conclusa il': [end]
+    })
+
+
+def teamviewer_session(start: str, end: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Assegnatario': ['Mario Rossi'],
+        'Inizio': [start],
+        'Fine': [end]
+    })
+
+
+def activity_type_alerts(attivita: pd.DataFrame, teamviewer: pd.DataFrame):
+    engine = AdvancedBusinessRulesEngine()
+    return engine.validate_all_rules({'attivita': attivita, 'teamviewer_bait': teamviewer},
+                                     ['activity_type'], workers=1)
+
+
+def test_remote_activity_covered_by_session_on_ambiguous_date():
+    alerts = activity_type_alerts(remote_activity('08/07/2025 09:00', '08/07/2025 10:00'),
+                                  teamviewer_session('08/07/2025 09:05', '08/07/2025 09:55'))
+    assert alerts == []
+
+
+def test_remote_activity_not_covered_by_session_on_swapped_date():
+    # 07/08/2025 = 7 agosto: nessuna sessione l'8 luglio
+    alerts = activity_type_alerts(remote_activity('08/07/2025 09:00', '08/07/2025 10:00'),
+                                  teamviewer_session('07/08/2025 09:05', '07/08/2025 09:55'))
+    assert [alert.category for alert in alerts] == ['activity_type_mismatch']
@@ -0,0 +1,44 @@
+"""
+Test schema di pulizia: date delle colonne dichiarate mm/gg/aaaa riscritte gg/mm/aaaa
+cella per cella, con lo stesso esito su file intero, blocchi e righe aggiunte
+"""
+
+import pandas as pd
+
+from cleaning_schema import clean_frame
+from parsers import PARSE_FAILURES, parse_italian_datetime_series
+
+ROWS = [
+    ('1', '08/07/2025 09:00', '08/07/2025 10:30'),
+    ('2', '13/08/2025 14:00', '08/13/2025 15:00'),
+    ('3', '08/01/2025 08:15', ''),
+    ('4', '', 'non valida')
+]
+
+
+def attivita(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['Id Ticket', 'Iniziata il', 'Conclusa il'], dtype=str)
+
+
+def test_month_first_columns_rewritten_day_first():
+    df = clean_frame(attivita(ROWS), 'attivita')
+    assert df['Iniziata il'].tolist()[0] == '07/08/2025 09:00'
+    assert df['Conclusa il'].tolist()[:2] == ['07/08/2025 10:30', '13/08/2025 15:00']
+    assert df['Iniziata il'].tolist()[2] == '01/08/2025 08:15'
+    assert df['Conclusa il'].tolist()[2:] == ['', 'non valida']
+
+
+def test_chunks_and_appended_rows_read_like_whole_file():
+    whole = clean_frame(attivita(ROWS), 'attivita')
+    chunks = pd.concat([clean_frame(attivita(ROWS[:2]), 'attivita'),
+                        clean_frame(attivita(ROWS[2:]), 'attivita').set_axis([2, 3])])
+    pd.testing.assert_frame_equal(chunks, whole)
+
+
+def test_day_first_cell_reported_as_parse_failure():
+    PARSE_FAILURES.clear()
+    df = clean_frame(attivita(ROWS), 'attivita')
+    parsed = parse_italian_datetime_series(df['Iniziata il'])
+    assert parsed.isna().tolist() == [False, True, False, True]
+    assert PARSE_FAILURES.snapshot()['date:Iniziata il']['samples'] == ['08/13/2025 14:00']
+    PARSE_FAILURES.clear()
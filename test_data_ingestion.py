@@ -0,0 +1,178 @@
+"""
+Test ingestion CSV: fallback dell'engine C diviso per record (campi multilinea tra
+virgolette e separatori di riga Unicode nei campi restano interi) e caricamento
+incrementale ripreso da un'esecuzione precedente
+"""
+
+import json
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from config import CONFIG
+from data_ingestion import DataIngestionEngine
+from frame_cache import PARQUET_AVAILABLE
+
+HEADER = 'Id;Descrizione;Durata\r\n'
+RECORDS = [
+    '1;"riga uno\r\nriga due";01:00\r\n',
+    '2;"tab\x0bverticale\x85, separatore di riga";00:30\r\n',
+    '\r\n',
+    '3;semplice;00:15\r\n',
+    '4;"su\ntre\nrighe";00:20\r\n'
+]
+UNTERMINATED = '5;"virgolette non chiuse;02:00\r\n6;dopo;00:45\r\n'
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return DataIngestionEngine(str(tmp_path), use_cache=False)
+
+
+def test_fallback_splits_on_record_boundaries(engine):
+    raw = (HEADER + ''.join(RECORDS) + UNTERMINATED).encode('utf-8')
+    df, report = engine.read_csv_fast('attivita.csv', 'utf-8', raw)
+
+    assert report['engine'] == 'c+python'
+    assert df['Id'].tolist() == ['1', '2', '3', '4']
+    assert df['Descrizione'].tolist() == [
+        'riga uno\r\nriga due', 'tab\x0bverticale\x85, separatore di riga', 'semplice', 'su\ntre\nrighe'
+    ]
+    assert df['Durata'].tolist() == ['01:00', '00:30', '00:15', '00:20']
+
+
+def test_fallback_matches_python_engine(engine):
+    raw = (HEADER + ''.join(RECORDS) + UNTERMINATED).encode('utf-8')
+    df, _ = engine.read_csv_fast('attivita.csv', 'utf-8', raw)
+    expected, _ = engine._read_csv_with_report(BytesIO(raw), 'utf-8', 'python')
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_fallback_with_selected_columns(engine):
+    raw = (HEADER + ''.join(RECORDS) + UNTERMINATED).encode('utf-8')
+    df, _ = engine.read_csv_fast('attivita.csv', 'utf-8', raw, usecols=[0, 2])
+    assert list(df.columns) == ['Id', 'Durata']
+    assert df['Durata'].tolist() == ['01:00', '00:30', '00:15', '00:20']
+
+
+def test_well_formed_file_uses_c_engine(engine):
+    raw = (HEADER + ''.join(RECORDS)).encode('utf-8')
+    df, report = engine.read_csv_fast('attivita.csv', 'utf-8', raw)
+    assert report == {'engine': 'c', 'skipped_lines': []}
+    assert len(df) == 4
+
+
+def write_upload(base_path, name: str, text: str):
+    path = base_path / 'upload_csv' / name
+    path.parent.mkdir(exist_ok=True)
+    with open(path, 'a', encoding='utf-8', newline='') as file:
+        file.write(text)
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="cache frame richiede pyarrow")
+def test_append_resumes_from_previous_run(tmp_path):
+    write_upload(tmp_path, 'auto.csv', 'Dipendente;Auto;Presa Data e Ora\r\nMario Rossi;Fiat;01/08/2025 09:00\r\n')
+    DataIngestionEngine(str(tmp_path)).load_csv_file('upload_csv/auto.csv', 'auto')
+
+    write_upload(tmp_path, 'auto.csv', 'Anna Bianchi;Panda;04/08/2025 14:30\r\n')
+    engine = DataIngestionEngine(str(tmp_path))
+    df = engine.load_csv_file('upload_csv/auto.csv', 'auto')
+
+    assert engine.parse_reports['auto']['mode'] == 'append'
+    assert engine.parse_reports['auto']['appended_rows'] == 1
+    expected = DataIngestionEngine(str(tmp_path), use_cache=False).load_csv_file('upload_csv/auto.csv', 'auto')
+    pd.testing.assert_frame_equal(df, expected)
+
+    # La voce aggiornata è a sua volta ripresa dall'esecuzione successiva
+    write_upload(tmp_path, 'auto.csv', 'Luca Verdi;Golf;05/08/2025 08:15\r\n')
+    engine = DataIngestionEngine(str(tmp_path))
+    df = engine.load_csv_file('upload_csv/auto.csv', 'auto')
+    assert engine.parse_reports['auto']['mode'] == 'append'
+    assert df['Dipendente'].tolist() == ['Mario Rossi', 'Anna Bianchi', 'Luca Verdi']
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="cache frame richiede pyarrow")
+def test_rewritten_file_is_reloaded_in_full(tmp_path):
+    write_upload(tmp_path, 'auto.csv', 'Dipendente;Auto;Presa Data e Ora\r\nMario Rossi;Fiat;01/08/2025 09:00\r\n')
+    DataIngestionEngine(str(tmp_path)).load_csv_file('upload_csv/auto.csv', 'auto')
+
+    (tmp_path / 'upload_csv' / 'auto.csv').unlink()
+    write_upload(tmp_path, 'auto.csv', 'Dipendente;Auto;Presa Data e Ora\r\nAnna Bianchi;Panda;04/08/2025 14:30\r\n'
+                                       'Luca Verdi;Golf;05/08/2025 08:15\r\n')
+    engine = DataIngestionEngine(str(tmp_path))
+    df = engine.load_csv_file('upload_csv/auto.csv', 'auto')
+
+    assert engine.parse_reports['auto'].get('mode') != 'append'
+    assert df['Dipendente'].tolist() == ['Anna Bianchi', 'Luca Verdi']
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="cache frame richiede pyarrow")
+def test_same_size_edit_before_window_is_reloaded(tmp_path, monkeypatch):
+    # Finestra di controllo più corta delle righe: la modifica cade prima della finestra
+    monkeypatch.setattr(CONFIG, 'APPEND_PREFIX_CHECK_BYTES', 16)
+    write_upload(tmp_path, 'auto.csv', 'Dipendente;Auto;Presa Data e Ora\r\nMario Rossi;Fiat;01/08/2025 09:00\r\n'
+                                       'Anna Bianchi;Panda;04/08/2025 14:30\r\n')
+    DataIngestionEngine(str(tmp_path)).load_csv_file('upload_csv/auto.csv', 'auto')
+
+    path = tmp_path / 'upload_csv' / 'auto.csv'
+    path.write_bytes(path.read_bytes().replace(b'Mario Rossi', b'Mario Verdi'))
+    write_upload(tmp_path, 'auto.csv', 'Luca Verdi;Golf;05/08/2025 08:15\r\n')
+    engine = DataIngestionEngine(str(tmp_path))
+    df = engine.load_csv_file('upload_csv/auto.csv', 'auto')
+
+    assert engine.parse_reports['auto'].get('mode') != 'append'
+    assert df['Dipendente'].tolist() == ['Mario Verdi', 'Anna Bianchi', 'Luca Verdi']
+
+
+def test_stream_falls_back_after_yielded_chunks(tmp_path):
+    rows = [f'Tecnico {i};Auto {i};0{1 + i % 9}/08/2025 09:00\r\n' for i in range(10)]
+    rows.insert(4, 'Riga;con;troppi;campi\r\n')
+    write_upload(tmp_path, 'auto.csv', 'Dipendente;Auto;Presa Data e Ora\r\n' + ''.join(rows)
+                 + '\r\nUltimo;"virgolette non chiuse;02/08/2025 10:00\r\n')
+    engine = DataIngestionEngine(str(tmp_path), use_cache=False)
+
+    chunks = list(engine.iter_csv_chunks('upload_csv/auto.csv', 'auto', chunksize=3))
+    report = engine.parse_reports['auto']
+    full = DataIngestionEngine(str(tmp_path), use_cache=False)
+    expected = full.load_csv_file('upload_csv/auto.csv', 'auto')
+
+    assert report['engine'] == 'c+python'
+    assert [skipped['line'] for skipped in report['skipped_lines']] == [6, 14]
+    assert report['skipped_lines'] == full.parse_reports['auto']['skipped_lines']
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="cache frame richiede pyarrow")
+def test_process_workers_leave_state_to_parent(tmp_path):
+    write_upload(tmp_path, 'auto.csv', 'Dipendente;Auto;Presa Data e Ora\r\nMario Rossi;Fiat;01/08/2025 09:00\r\n')
+    write_upload(tmp_path, 'permessi.csv', 'Dipendente;Tipo;Data inizio;Data fine\r\n'
+                 'Anna Bianchi;Ferie;25/08/2025;29/08/2025\r\n')
+    engine = DataIngestionEngine(str(tmp_path))
+    engine.load_all_data(executor='process', max_workers=2, sources={'auto': None, 'permessi': None})
+
+    # Stato di entrambi i worker nel file scritto dal padre, profili disponibili nel padre
+    with open(engine.ingest_state_path, encoding='utf-8') as file:
+        assert set(json.load(file)) == {'auto', 'permessi'}
+    assert set(engine.integrity_profilers) == {'auto', 'permessi'}
+
+    # Lo stesso engine e un'esecuzione successiva riprendono in append dallo stato unito
+    write_upload(tmp_path, 'auto.csv', 'Anna Bianchi;Panda;04/08/2025 14:30\r\n')
+    df = engine.load_csv_file('upload_csv/auto.csv', 'auto')
+    assert engine.parse_reports['auto']['mode'] == 'append'
+    assert df['Dipendente'].tolist() == ['Mario Rossi', 'Anna Bianchi']
+
+    write_upload(tmp_path, 'permessi.csv', 'Luca Verdi;Ferie;01/09/2025;02/09/2025\r\n')
+    engine = DataIngestionEngine(str(tmp_path))
+    engine.load_csv_file('upload_csv/permessi.csv', 'permessi')
+    assert engine.parse_reports['permessi']['mode'] == 'append'
+
+
+def test_each_load_is_recorded_in_integrity_history(tmp_path):
+    write_upload(tmp_path, 'auto.csv', 'Dipendente;Auto;Presa Data e Ora\r\nMario Rossi;Fiat;01/08/2025 09:00\r\n')
+    for _ in range(2):
+        DataIngestionEngine(str(tmp_path), use_cache=False).load_all_data(sources={'auto': None})
+
+    runs = list(DataIngestionEngine(str(tmp_path), use_cache=False).integrity_history.runs())
+    assert len(runs) == 2
+    assert runs[-1]['files']['auto']['rows'] == 1
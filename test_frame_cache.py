@@ -0,0 +1,116 @@
+"""
+Test cache frame: voci indirizzate per contenuto e versione dello schema di pulizia,
+invalidate da una modifica al file o da un incremento di CLEANING_SCHEMA_VERSION
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from config import CONFIG
+from data_ingestion import DataIngestionEngine
+from frame_cache import PARQUET_AVAILABLE, FrameCache, content_hash, file_content_hash
+
+pytestmark = pytest.mark.skipif(not PARQUET_AVAILABLE, reason="cache frame richiede pyarrow")
+
+FRAME = pd.DataFrame({'Dipendente': ['Mario Rossi', 'Anna Bianchi'], 'Auto': ['Fiat', 'Panda'],
+                      'Cliente': ['ACME', 'BETA']})
+UPLOAD = 'Dipendente;Auto;Presa Data e Ora\r\nMario Rossi;Fiat;01/08/2025 09:00\r\n'
+
+
+def entries(cache_dir) -> list:
+    return sorted(os.listdir(cache_dir))
+
+
+def test_content_hash_ignores_name(tmp_path):
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    first.write_bytes(UPLOAD.encode('utf-8'))
+    second.write_bytes(UPLOAD.encode('utf-8'))
+    assert file_content_hash(str(first)) == file_content_hash(str(second)) == content_hash(UPLOAD.encode('utf-8'))
+
+
+def test_get_returns_stored_frame_and_metadata(tmp_path):
+    cache = FrameCache(str(tmp_path), schema_version=1)
+    cache.put('auto', 'abc', FRAME, metadata={'engine': 'c'})
+
+    pd.testing.assert_frame_equal(cache.get('auto', 'abc'), FRAME)
+    # Prima colonna sempre inclusa nella proiezione
+    assert list(cache.get('auto', 'abc', columns=('Cliente',)).columns) == ['Dipendente', 'Cliente']
+    assert cache.get_metadata('auto', 'abc') == {'engine': 'c'}
+
+
+def test_content_change_misses_and_prunes_previous_entry(tmp_path):
+    cache = FrameCache(str(tmp_path), schema_version=1)
+    cache.put('auto', 'abc', FRAME, metadata={})
+
+    assert cache.get('auto', 'def') is None
+    cache.put('auto', 'def', FRAME.iloc[:1], metadata={})
+    assert cache.get('auto', 'abc') is None
+    assert entries(tmp_path) == ['auto_def_v1.parquet', 'auto_def_v1.parquet.json']
+
+
+def test_schema_version_bump_misses_and_prunes_previous_entry(tmp_path):
+    FrameCache(str(tmp_path), schema_version=1).put('auto', 'abc', FRAME)
+
+    cache = FrameCache(str(tmp_path), schema_version=2)
+    assert cache.get('auto', 'abc') is None
+    assert cache.get_metadata('auto', 'abc') == {}
+    cache.put('auto', 'abc', FRAME)
+    assert entries(tmp_path) == ['auto_abc_v2.parquet']
+
+
+def test_other_file_types_are_kept(tmp_path):
+    cache = FrameCache(str(tmp_path), schema_version=1)
+    cache.put('auto', 'abc', FRAME)
+    cache.put('permessi', 'abc', FRAME)
+    cache.put('auto', 'def', FRAME)
+    assert entries(tmp_path) == ['auto_def_v1.parquet', 'permessi_abc_v1.parquet']
+
+
+def write_upload(base_path, text: str):
+    path = base_path / 'upload_csv' / 'auto.csv'
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(text.encode('utf-8'))
+
+
+def load(base_path, schema_version: int = CONFIG.CLEANING_SCHEMA_VERSION):
+    engine = DataIngestionEngine(str(base_path))
+    engine.frame_cache = FrameCache(engine.frame_cache.cache_dir, schema_version)
+    return engine, engine.load_csv_file('upload_csv/auto.csv', 'auto')
+
+
+def test_engine_reuses_cached_frame_for_unchanged_file(tmp_path, monkeypatch):
+    write_upload(tmp_path, UPLOAD)
+    _, expected = load(tmp_path)
+
+    # Senza stato incrementale la seconda esecuzione passa dalla sola cache frame
+    os.remove(tmp_path / CONFIG.CACHE_DIR / 'ingest_state.json')
+    monkeypatch.setattr(DataIngestionEngine, 'read_csv_fast', None)
+    _, df = load(tmp_path)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_engine_reloads_rewritten_file(tmp_path):
+    write_upload(tmp_path, UPLOAD)
+    load(tmp_path)
+
+    write_upload(tmp_path, UPLOAD.replace('Mario Rossi;Fiat', 'Anna Bianchi;Panda'))
+    _, df = load(tmp_path)
+    assert df['Dipendente'].tolist() == ['Anna Bianchi']
+
+
+def test_engine_reloads_after_schema_version_bump(tmp_path, monkeypatch):
+    write_upload(tmp_path, UPLOAD)
+    load(tmp_path)
+
+    calls = []
+    read_csv_fast = DataIngestionEngine.read_csv_fast
+    monkeypatch.setattr(DataIngestionEngine, 'read_csv_fast',
+                        lambda self, *args, **kwargs: calls.append(args) or read_csv_fast(self, *args, **kwargs))
+    _, df = load(tmp_path, CONFIG.CLEANING_SCHEMA_VERSION + 1)
+
+    assert len(calls) == 1
+    assert df['Dipendente'].tolist() == ['Mario Rossi']
+    digest = file_content_hash(str(tmp_path / 'upload_csv' / 'auto.csv'))
+    assert f"auto_{digest}_v{CONFIG.CLEANING_SCHEMA_VERSION + 1}.parquet" in entries(tmp_path / CONFIG.CACHE_DIR)
@@ -0,0 +1,44 @@
+"""
+Test storico partizionato: righe di un giorno sostituite a ogni archiviazione,
+righe senza data accumulate tra archiviazioni successive senza duplicati
+"""
+
+import pandas as pd
+
+from history_store import HistoryStore, UNDATED_PARTITION
+
+
+def frame(rows):
+    df = pd.DataFrame(rows, columns=['Dipendente', 'Auto', 'Data'])
+    return df, pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
+
+
+def test_undated_rows_merged_across_writes(tmp_path):
+    store = HistoryStore(str(tmp_path), granularity='day')
+    first, dates = frame([
+        ['Mario Rossi', 'Fiat', '01/08/2025'],
+        ['Anna Bianchi', 'Panda', ''],
+        ['Luca Verdi', 'Golf', None]
+    ])
+    store.write('auto', first, dates)
+
+    second, dates = frame([
+        ['Mario Rossi', 'Punto', '01/08/2025'],
+        ['Anna Bianchi', 'Panda', ''],
+        ['Paolo Neri', 'Clio', 'da definire']
+    ])
+    written = store.write('auto', second, dates)
+
+    assert UNDATED_PARTITION in written
+    df = store.read('auto')
+    assert df['Dipendente'].tolist() == ['Mario Rossi', 'Luca Verdi', 'Anna Bianchi', 'Paolo Neri']
+    assert df['Auto'].tolist() == ['Punto', 'Golf', 'Panda', 'Clio']
+
+
+def test_undated_duplicates_within_one_write_are_kept(tmp_path):
+    store = HistoryStore(str(tmp_path), granularity='month')
+    df, dates = frame([['Anna Bianchi', 'Panda', ''], ['Anna Bianchi', 'Panda', '']])
+    store.write('auto', df, dates)
+    store.write('auto', df, dates)
+
+    assert len(store.read('auto')) == 2
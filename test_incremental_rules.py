@@ -0,0 +1,165 @@
+"""
+Test rivalutazione incrementale: IncrementalRuleEngine.update confrontato con una
+valutazione completa sugli stessi dati dopo righe aggiunte, modificate e rimosse
+"""
+
+import copy
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from business_rules import BusinessRulesEngine
+from business_rules_advanced import AdvancedBusinessRulesEngine
+from incremental_rules import IncrementalRuleEngine
+from models import (AppuntamentoCalendario, AttivitaTecnico, PermessoTecnico, SessioneTeamViewer, StatoPermesso,
+                    TimbraturaTecnico, TipologiaAttivita, UtilizzoVeicolo)
+
+BASE = datetime(2025, 8, 1)
+TARGET = BASE + timedelta(days=1)
+TECNICI = ['Davide Cestone', 'Alex Ferrario', 'Matteo Signo', None]
+CLIENTI = ['ACME SRL', 'Acme S.r.l.', 'BETA SPA', 'BAIT Service', None]
+
+
+class RandomData:
+    """Record casuali su pochi giorni, con orari mancanti e fine prima dell'inizio"""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def moment(self):
+        if self.rng.random() < 0.05:
+            return None
+        return BASE + timedelta(days=self.rng.randint(0, 4), minutes=self.rng.randint(0, 60 * 23))
+
+    def interval(self):
+        start = self.moment()
+        if start is None or self.rng.random() < 0.1:
+            return start, None
+        return start, start + timedelta(minutes=self.rng.randint(-30, 300))
+
+    def attivita(self):
+        start, end = self.interval()
+        return AttivitaTecnico(id_ticket=str(self.rng.randint(1, 10 ** 6)), iniziata_il=start, conclusa_il=end,
+                               azienda=self.rng.choice(CLIENTI), tipologia=self.rng.choice(list(TipologiaAttivita)),
+                               creato_da=self.rng.choice(TECNICI))
+
+    def timbratura(self):
+        start, end = self.interval()
+        nome = self.rng.choice(TECNICI)
+        return TimbraturaTecnico(dipendente_nome=nome.split()[0] if nome else None,
+                                 dipendente_cognome=nome.split()[1] if nome else None,
+                                 cliente_nome=self.rng.choice(CLIENTI), ora_inizio=start, ora_fine=end)
+
+    def sessione(self):
+        return SessioneTeamViewer(data_sessione=self.moment(), durata_minuti=self.rng.choice([None, 0, 5, 45]),
+                                  assegnatario=self.rng.choice(TECNICI))
+
+    def appuntamento(self):
+        start, end = self.interval()
+        return AppuntamentoCalendario(cliente=self.rng.choice(CLIENTI), luogo='Sede', data_inizio=start,
+                                      data_fine=end, tecnico=self.rng.choice(TECNICI))
+
+    def veicolo(self):
+        start, end = self.interval()
+        return UtilizzoVeicolo(dipendente=self.rng.choice(TECNICI), auto='A', ora_presa=start, ora_riconsegna=end,
+                               cliente=self.rng.choice(CLIENTI + ['']))
+
+    def permesso(self):
+        start = self.moment()
+        end = start + timedelta(days=self.rng.randint(-1, 2), hours=self.rng.randint(0, 8)) if start else None
+        return PermessoTecnico(dipendente=self.rng.choice(TECNICI), tipo_permesso='Ferie', data_inizio=start,
+                               data_fine=end, stato=self.rng.choice(list(StatoPermesso)))
+
+    def dataset(self):
+        sessioni = [self.sessione() for _ in range(100)]
+        # Parte delle sessioni presente anche nell'export di gruppo (doppioni)
+        gruppo = [SessioneTeamViewer(data_sessione=sessione.data_sessione, durata_minuti=sessione.durata_minuti,
+                                     utente=sessione.assegnatario) for sessione in sessioni[:15]]
+        return {
+            'attivita': [self.attivita() for _ in range(150)],
+            'timbrature': [self.timbratura() for _ in range(100)],
+            'sessioni_bait': sessioni,
+            'sessioni_gruppo': gruppo,
+            'calendario': [self.appuntamento() for _ in range(40)],
+            'utilizzo_veicoli': [self.veicolo() for _ in range(50)],
+            'permessi': [self.permesso() for _ in range(15)]
+        }
+
+
+GENERATORS = {
+    'attivita': RandomData.attivita,
+    'sessioni_bait': RandomData.sessione,
+    'utilizzo_veicoli': RandomData.veicolo,
+    'permessi': RandomData.permesso
+}
+
+
+def new_engine() -> IncrementalRuleEngine:
+    return IncrementalRuleEngine(BusinessRulesEngine(), AdvancedBusinessRulesEngine(), TARGET)
+
+
+def signatures(results):
+    """Contenuto degli alert per regola, senza ID e timestamp"""
+    return {
+        result.rule_id: sorted(json.dumps([alert.severity.name, alert.tecnico, alert.messaggio, alert.categoria,
+                                           alert.dettagli], sort_keys=True, default=str)
+                               for alert in result.alerts)
+        for result in results
+    }
+
+
+def reloaded(data, changes):
+    """Nuove liste di copie dei record (come dopo un ricaricamento) con le modifiche applicate"""
+    data = {source: [copy.copy(record) for record in records] for source, records in data.items()}
+    for source, operation, position, record in changes:
+        records = data[source]
+        if operation == 'append':
+            records.append(record)
+        elif operation == 'edit':
+            records[position % len(records)] = record
+        else:
+            del records[position % len(records)]
+    return data
+
+
+@pytest.mark.parametrize('operation', ['append', 'edit', 'remove'])
+@pytest.mark.parametrize('seed', range(3))
+def test_update_matches_full_evaluation(seed, operation):
+    generator = RandomData(seed)
+    data = generator.dataset()
+    engine = new_engine()
+    engine.evaluate(data)
+
+    for step in range(3):
+        changes = [(source, operation, generator.rng.randrange(1000), GENERATORS[source](generator))
+                   for source in generator.rng.sample(sorted(GENERATORS), 2)]
+        data = reloaded(data, changes)
+        delta = engine.update(data)
+
+        assert signatures(engine.results()) == signatures(new_engine().evaluate(data))
+        assert len(delta.added) + len(delta.unchanged) == len(engine.alerts())
+        # ID progressivi per engine: regole core e avanzate numerate separatamente
+        for group in (('BR001', 'BR002', 'BR003', 'BR004'), ('BR005', 'BR006', 'BR007')):
+            ids = [alert.id_alert for result in engine.results() if result.rule_id in group for alert in result.alerts]
+            assert len(ids) == len(set(ids))
+
+
+def test_update_without_changes_keeps_alerts():
+    data = RandomData(0).dataset()
+    engine = new_engine()
+    engine.evaluate(data)
+    before = engine.alerts()
+
+    delta = engine.update(reloaded(data, []))
+    assert not delta.added and not delta.removed
+    assert [id(alert) for alert in engine.alerts()] == [id(alert) for alert in before]
+
+
+def test_update_without_previous_evaluation_adds_all_alerts():
+    data = RandomData(1).dataset()
+    engine = new_engine()
+    delta = engine.update(data)
+    assert len(delta.added) == len(engine.alerts())
+    assert signatures(engine.results()) == signatures(new_engine().evaluate(data))
@@ -0,0 +1,100 @@
+"""
+Test sovrapposizioni tra intervalli: overlapping_pairs e interval_join confrontati con
+il confronto di tutte le coppie su intervalli casuali (estremi mancanti e intervalli
+degeneri inclusi)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from interval_overlap import JOIN_PREDICATES, interval_join, overlapping_pairs
+
+BASE = pd.Timestamp('2025-08-01 08:00')
+
+
+def random_intervals(seed: int, size: int):
+    """Inizi e fine casuali su una giornata, con NaT e fine prima dell'inizio"""
+    rng = np.random.default_rng(seed)
+    starts = BASE + pd.to_timedelta(rng.integers(0, 600, size), unit='min')
+    ends = starts + pd.to_timedelta(rng.integers(-30, 180, size), unit='min')
+    starts, ends = pd.Series(starts), pd.Series(ends)
+    starts[rng.random(size) < 0.1] = pd.NaT
+    ends[rng.random(size) < 0.1] = pd.NaT
+    return starts, ends
+
+
+def brute_force_pairs(starts: pd.Series, ends: pd.Series):
+    """Ogni intervallo con i successivi nell'ordine stabile per inizio"""
+    valid = [i for i in range(len(starts)) if pd.notna(starts[i]) and pd.notna(ends[i])]
+    order = sorted(valid, key=lambda i: starts[i])
+    pairs = []
+    for a, i in enumerate(order):
+        for j in order[a + 1:]:
+            if starts[i] < ends[j] and starts[j] < ends[i]:
+                minutes = (min(ends[i], ends[j]) - max(starts[i], starts[j])).total_seconds() / 60
+                pairs.append((i, j, minutes))
+    return pairs
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_overlapping_pairs_matches_brute_force(seed):
+    starts, ends = random_intervals(seed, 60)
+    first, second, minutes = overlapping_pairs(starts, ends)
+    assert list(zip(first.tolist(), second.tolist(), minutes.tolist())) == brute_force_pairs(starts, ends)
+
+
+def test_overlapping_pairs_touching_intervals_do_not_overlap():
+    starts = pd.Series(pd.to_datetime(['2025-08-01 09:00', '2025-08-01 10:00']))
+    ends = pd.Series(pd.to_datetime(['2025-08-01 10:00', '2025-08-01 11:00']))
+    first, _, _ = overlapping_pairs(starts, ends)
+    assert len(first) == 0
+
+
+def test_overlapping_pairs_fewer_than_two_valid_intervals():
+    starts = pd.Series(pd.to_datetime(['2025-08-01 09:00', None]))
+    ends = pd.Series(pd.to_datetime(['2025-08-01 10:00', '2025-08-01 11:00']))
+    first, second, minutes = overlapping_pairs(starts, ends)
+    assert len(first) == len(second) == len(minutes) == 0
+
+
+def random_frame(seed: int, size: int) -> pd.DataFrame:
+    """Intervalli casuali per pochi tecnici, etichette di indice non consecutive"""
+    rng = np.random.default_rng(seed)
+    starts, ends = random_intervals(seed, size)
+    return pd.DataFrame({
+        'tecnico_id': rng.choice(['T1', 'T2', 'T3'], size),
+        'inizio': starts,
+        'fine': ends
+    }, index=rng.permutation(size) * 10)
+
+
+def brute_force_join(left: pd.DataFrame, right: pd.DataFrame, how: str):
+    rows = []
+    for left_label, a in left.iterrows():
+        for right_label, b in right.iterrows():
+            if a['tecnico_id'] != b['tecnico_id'] or pd.isna([a['inizio'], a['fine'], b['inizio'], b['fine']]).any():
+                continue
+            contained = b['inizio'] <= a['inizio'] and a['fine'] <= b['fine']
+            overlap = a['inizio'] < b['fine'] and b['inizio'] < a['fine']
+            if how == 'any' or (how == 'overlap' and overlap) or (how == 'within' and contained):
+                minutes = (min(a['fine'], b['fine']) - max(a['inizio'], b['inizio'])).total_seconds() / 60
+                gap = (b['inizio'] - a['inizio']).total_seconds() / 60
+                rows.append((left_label, right_label, minutes, gap, contained))
+    return rows
+
+
+@pytest.mark.parametrize('how', JOIN_PREDICATES)
+@pytest.mark.parametrize('seed', range(5))
+def test_interval_join_matches_brute_force(seed, how):
+    left, right = random_frame(seed, 40), random_frame(seed + 100, 30)
+    joined = interval_join(left, right, 'tecnico_id', ('inizio', 'fine'), ('inizio', 'fine'), how=how)
+    rows = list(zip(joined['left'].tolist(), joined['right'].tolist(), joined['overlap_minutes'].tolist(),
+                    joined['start_gap_minutes'].tolist(), joined['contained'].tolist()))
+    assert rows == brute_force_join(left, right, how)
+
+
+def test_interval_join_rejects_unknown_predicate():
+    frame = random_frame(0, 5)
+    with pytest.raises(ValueError):
+        interval_join(frame, frame, 'tecnico_id', ('inizio', 'fine'), ('inizio', 'fine'), how='before')
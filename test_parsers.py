@@ -0,0 +1,79 @@
+"""
+Test parser vettoriali: date italiane, ore decimali, durate TeamViewer, orari Excel
+di epoca 1899 e decimali con virgola, con il registro delle celle non interpretate
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import CONFIG
+from parsers import (PARSE_FAILURES, parse_decimal_series, parse_duration_minutes_series,
+                     parse_excel_time_series, parse_hours_series, parse_italian_datetime_series)
+
+
+@pytest.fixture(autouse=True)
+def clear_failures():
+    PARSE_FAILURES.clear()
+    yield
+    PARSE_FAILURES.clear()
+
+
+def values(series: pd.Series) -> list:
+    """Valori come lista, None per i mancanti"""
+    return [None if pd.isna(value) else value for value in series]
+
+
+def test_italian_datetime_day_first():
+    parsed = parse_italian_datetime_series(pd.Series(['08/07/2025 09:30', '31/12/2025', '2025-08-01 14:05:00']))
+    assert values(parsed) == [pd.Timestamp('2025-07-08 09:30'), pd.Timestamp('2025-12-31'),
+                              pd.Timestamp('2025-08-01 14:05')]
+
+
+def test_italian_datetime_uses_config_formats(monkeypatch):
+    monkeypatch.setattr(CONFIG, 'DATE_FORMATS', ['%Y/%m/%d'])
+    parsed = parse_italian_datetime_series(pd.Series(['2025/08/07', '08/07/2025']), report=False)
+    assert values(parsed) == [pd.Timestamp('2025-08-07'), None]
+
+
+def test_italian_datetime_empty_and_invalid_cells():
+    parsed = parse_italian_datetime_series(pd.Series(['', 'nan', None, '32/01/2025'], name='Iniziata il'))
+    assert values(parsed) == [None] * 4
+    assert PARSE_FAILURES.snapshot() == {'date:Iniziata il': {'count': 1, 'samples': ['32/01/2025']}}
+
+
+def test_decimal_comma_point_and_thousands():
+    parsed = parse_decimal_series(pd.Series(['5,1', '5.1', '1.234,5', '1.234', '1.234.567', '7', 'x']), report=False)
+    assert values(parsed) == [5.1, 5.1, 1234.5, 1.234, 1234567.0, 7.0, None]
+
+
+def test_hours_decimal_clock_and_excel_epoch():
+    parsed = parse_hours_series(pd.Series(['7,5', '8', '07:30', '1:15:36', '12/31/1899 5:01:00 AM',
+                                           '12/30/1899 12:00:00 PM', '']))
+    assert np.allclose(values(parsed)[:6], [7.5, 8.0, 7.5, 1.26, 5 + 1 / 60, 12.0])
+    assert values(parsed)[6] is None
+    assert not PARSE_FAILURES.snapshot()
+
+
+def test_hours_numeric_series_unchanged():
+    parsed = parse_hours_series(pd.Series([7, 8.5]))
+    assert values(parsed) == [7.0, 8.5]
+
+
+def test_excel_time_epoch_and_serial():
+    parsed = parse_excel_time_series(pd.Series(['12/31/1899 5:01:00 AM', '1/1/1900 2:00:00 AM', '0,25']))
+    assert values(parsed) == [pd.Timedelta(hours=5, minutes=1), pd.Timedelta(days=1, hours=2),
+                              pd.Timedelta(hours=6)]
+
+
+def test_duration_units_clock_and_plain_minutes():
+    parsed = parse_duration_minutes_series(pd.Series(['8m', '1h 5m', '2h', '1h 05m 30s', '90 min',
+                                                      '01:05', '0:02:30', '12,5', '45', '']))
+    assert values(parsed) == [8.0, 65.0, 120.0, 65.5, 90.0, 65.0, 2.5, 12.5, 45.0, None]
+    assert not PARSE_FAILURES.snapshot()
+
+
+def test_duration_invalid_cells_reported():
+    parsed = parse_duration_minutes_series(pd.Series(['5m', 'circa un ora', 'h'], name='Durata'))
+    assert values(parsed) == [5.0, None, None]
+    assert PARSE_FAILURES.snapshot()['durata:Durata']['count'] == 2
@@ -0,0 +1,108 @@
+"""
+Test cache dei risultati delle regole: RuleResultCache.run confrontato con una
+valutazione senza cache dopo la modifica di un solo giorno e di una soglia
+"""
+
+import copy
+import json
+from datetime import timedelta
+
+import pytest
+
+from business_rules import BusinessRulesEngine
+from business_rules_advanced import AdvancedBusinessRulesEngine
+from config import CONFIG
+from incremental_rules import IncrementalRuleEngine
+from rule_cache import RuleResultCache
+from test_incremental_rules import BASE, TARGET, RandomData
+
+
+def evaluate(data, cache_dir=None):
+    """Valutazione completa con motori nuovi, con o senza cache dei risultati"""
+    result_cache = RuleResultCache(str(cache_dir)) if cache_dir is not None else None
+    engine = IncrementalRuleEngine(BusinessRulesEngine(), AdvancedBusinessRulesEngine(), TARGET, result_cache)
+    return engine.evaluate(data)
+
+
+def alerts(results):
+    """ID e contenuto degli alert per regola, nell'ordine di creazione"""
+    return {
+        result.rule_id: [(alert.id_alert, json.dumps([alert.severity.name, alert.tecnico, alert.messaggio,
+                                                      alert.categoria, alert.dettagli], sort_keys=True, default=str))
+                         for alert in result.alerts]
+        for result in results
+    }
+
+
+def stats(results):
+    """Stats per regola senza i conteggi delle partizioni della cache"""
+    return {
+        result.rule_id: {name: value for name, value in result.stats.items()
+                         if name not in ('cached_partitions', 'computed_partitions')}
+        for result in results
+    }
+
+
+def partitions(results, key):
+    return {result.rule_id: result.stats[key] for result in results}
+
+
+def copied(data):
+    return {source: [copy.copy(record) for record in records] for source, records in data.items()}
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / 'rules'
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_unchanged_data_reuses_all_partitions(seed, cache_dir):
+    data = RandomData(seed).dataset()
+    evaluate(data, cache_dir)
+
+    results = evaluate(copied(data), cache_dir)
+    assert alerts(results) == alerts(evaluate(data))
+    assert stats(results) == stats(evaluate(data))
+    assert not any(partitions(results, 'computed_partitions').values())
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_one_day_change_matches_uncached_run(seed, cache_dir):
+    generator = RandomData(seed)
+    data = generator.dataset()
+    evaluate(data, cache_dir)
+
+    # Attività corrette sul posto in un solo giorno, spostate a un altro orario dello stesso giorno
+    day = BASE + timedelta(days=2)
+    data = copied(data)
+    changed = 0
+    for record in data['attivita']:
+        if record.iniziata_il is not None and record.iniziata_il.date() == day.date() and changed < 3:
+            record.iniziata_il += timedelta(minutes=generator.rng.randint(-60, 60))
+            record.conclusa_il = record.iniziata_il + timedelta(minutes=generator.rng.randint(10, 240))
+            changed += 1
+    assert changed
+
+    results = evaluate(data, cache_dir)
+    assert alerts(results) == alerts(evaluate(data))
+    assert stats(results) == stats(evaluate(data))
+    assert any(partitions(results, 'cached_partitions').values())
+    assert any(partitions(results, 'computed_partitions').values())
+
+
+@pytest.mark.parametrize('minutes', [15, 30, 90])
+def test_threshold_change_matches_uncached_run(minutes, cache_dir, monkeypatch):
+    data = RandomData(0).dataset()
+    evaluate(data, cache_dir)
+
+    monkeypatch.setattr(CONFIG, 'MAX_TRAVEL_TIME_MINUTES', minutes)
+    results = evaluate(data, cache_dir)
+    assert alerts(results) == alerts(evaluate(data))
+    assert stats(results) == stats(evaluate(data))
+
+    # Solo la regola con la soglia cambiata è ricalcolata per intero
+    computed = partitions(results, 'computed_partitions')
+    assert computed.pop('BR003') > 0
+    assert not any(computed.values())
+    assert not partitions(results, 'cached_partitions')['BR003']
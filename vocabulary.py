@@ -0,0 +1,85 @@
+"""
+BAIT Activity Controller - Shared Vocabulary
+Vocabolario condiviso tra le fonti (tecnici, clienti, categorie) per colonne categoriche e codici interi
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+
+class SharedVocabulary:
+    """
+    Vocabolario append-only per dominio ('tecnico', 'cliente', 'categoria').
+    Il codice di un valore non cambia per tutta la vita del processo: colonne
+    categoriche di fonti diverse e alert condividono gli stessi codici interi.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, List[str]] = {}
+        self._codes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def code(self, domain: str, value: Optional[str]) -> Optional[int]:
+        """Codice intero del valore, registrandolo se nuovo (None per valori mancanti)"""
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+
+        value = str(value)
+        code = self._codes.get(domain, {}).get(value)
+        if code is None:
+            self.extend(domain, [value])
+            code = self._codes[domain][value]
+        return code
+
+    def value(self, domain: str, code: Optional[int]) -> Optional[str]:
+        """Valore corrispondente al codice"""
+        if code is None:
+            return None
+        return self._values.get(domain, [])[code]
+
+    def extend(self, domain: str, values: Iterable[str]):
+        """Registra i valori nuovi in ordine alfabetico; i codici esistenti restano invariati"""
+        with self._lock:
+            codes = self._codes.setdefault(domain, {})
+            domain_values = self._values.setdefault(domain, [])
+            for value in sorted(set(values) - codes.keys()):
+                codes[value] = len(domain_values)
+                domain_values.append(value)
+
+    def dtype(self, domain: str) -> CategoricalDtype:
+        """Dtype categorico con le categorie correnti del dominio"""
+        with self._lock:
+            return CategoricalDtype(categories=list(self._values.get(domain, [])))
+
+    def categorize(self, data: Dict[str, pd.DataFrame],
+                   columns: Dict[str, Dict[str, str]]) -> Dict[str, pd.DataFrame]:
+        """
+        Converte le colonne indicate (file_type -> {colonna: dominio}) in categoriche
+        con un unico vocabolario per dominio su tutte le fonti.
+        """
+        # Prima passata: registra tutti i valori, così ogni fonte riceve lo stesso dtype
+        for file_type, df in data.items():
+            for column, domain in columns.get(file_type, {}).items():
+                if column in df.columns:
+                    self.extend(domain, df[column].dropna().astype(str).unique())
+
+        dtypes = {
+            domain: self.dtype(domain)
+            for file_columns in columns.values() for domain in file_columns.values()
+        }
+
+        categorized = {}
+        for file_type, df in data.items():
+            targets = {
+                column: dtypes[domain]
+                for column, domain in columns.get(file_type, {}).items() if column in df.columns
+            }
+            categorized[file_type] = df.astype(targets) if targets else df
+        return categorized
+
+
+# Istanza globale condivisa da ingestion e regole
+VOCABULARY = SharedVocabulary()